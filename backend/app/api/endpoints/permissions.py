@@ -8,7 +8,6 @@ from pydantic import ValidationError
 from redis.exceptions import RedisError
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.constants import REDIS_KEY_CHAT_STREAM_LIVE
 from app.core.config import get_settings
 from app.core.deps import get_chat_service
 from app.core.security import validate_chat_scoped_token
@@ -19,6 +18,8 @@ from app.models.schemas import (
 )
 from app.services.chat import ChatService
 from app.services.permission_manager import PermissionManager
+from app.services.streaming.live import LiveEntry, LiveEventStream
+from app.services.streaming.runtime import ChatStreamRuntime
 from app.services.streaming.types import StreamEnvelope
 from app.utils.redis import redis_connection
 
@@ -72,6 +73,17 @@ async def create_permission_request(
                 "tool_name": request.tool_name,
                 "tool_input": request.tool_input,
             }
+            runtime = ChatStreamRuntime.get_active_runtime(chat_id_str)
+            if runtime and runtime.assistant_message_id == str(latest_assistant.id):
+                # The running stream owns the chat's seq range; writing through it
+                # keeps this event ordered with the ones it is still flushing.
+                await runtime.emit_event(
+                    "permission_request", render_payload, apply_snapshot=False
+                )
+                return PermissionRequestResponse(request_id=request_id)
+
+            # Only ordered with the stream's own events when no other worker is
+            # streaming this chat; see append_event_with_next_seq.
             seq = await message_service.append_event_with_next_seq(
                 chat_id=chat_id,
                 message_id=latest_assistant.id,
@@ -91,9 +103,16 @@ async def create_permission_request(
                 payload=render_payload,
             )
             async with redis_connection() as redis:
-                await redis.publish(
-                    REDIS_KEY_CHAT_STREAM_LIVE.format(chat_id=chat_id_str),
-                    json.dumps(envelope, ensure_ascii=False),
+                await LiveEventStream.publish(
+                    redis,
+                    chat_id,
+                    [
+                        LiveEntry(
+                            seq=seq,
+                            kind="permission_request",
+                            data=json.dumps(envelope, ensure_ascii=False),
+                        )
+                    ],
                 )
     except (RedisError, SQLAlchemyError) as exc:
         PermissionManager.remove(request_id)
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
 from app.core.deps import get_sandbox_service, validate_sandbox_ownership
 from app.models.schemas import (
@@ -99,11 +102,27 @@ async def get_browser_status(
     response_model=SandboxFilesMetadataResponse,
 )
 async def get_files_metadata(
+    path: str | None = Query(None, description="Directory to list"),
+    depth: int | None = Query(None, ge=1, description="Levels below path"),
+    since: str | None = Query(None, description="Token of a previous listing"),
     sandbox_id: str = Depends(validate_sandbox_ownership),
     sandbox_service: SandboxService = Depends(get_sandbox_service),
 ) -> SandboxFilesMetadataResponse:
-    files = await sandbox_service.get_files_metadata(sandbox_id)
-    return SandboxFilesMetadataResponse(files=[FileMetadata(**f) for f in files])
+    try:
+        listing = await sandbox_service.get_files_metadata(
+            sandbox_id, path=path, depth=depth, since=since
+        )
+    except SandboxException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return SandboxFilesMetadataResponse(
+        files=[FileMetadata(**f) for f in listing["files"]],
+        removed=listing["removed"],
+        token=listing["token"],
+        incremental=listing["incremental"],
+    )
 
 
 @router.get(
@@ -226,18 +245,27 @@ async def update_ide_theme(
 async def download_sandbox_files(
     sandbox_id: str = Depends(validate_sandbox_ownership),
     sandbox_service: SandboxService = Depends(get_sandbox_service),
-) -> Response:
+) -> StreamingResponse:
+    chunks = sandbox_service.stream_zip_download(sandbox_id)
+    # Pull the first chunk here so a sandbox that cannot be reached is still
+    # reported as an error status rather than a truncated download.
     try:
-        zip_bytes = await sandbox_service.generate_zip_download(sandbox_id)
-        return Response(
-            content=zip_bytes,
-            media_type="application/zip",
-            headers={
-                "Content-Disposition": f'attachment; filename="sandbox_{sandbox_id}.zip"'
-            },
-        )
+        first_chunk = await anext(chunks)
     except SandboxException as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
+
+    async def body() -> AsyncIterator[bytes]:
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="sandbox_{sandbox_id}.zip"'
+        },
+    )
@@ -6,6 +6,8 @@ MIN_RESOURCE_NAME_LENGTH: Final[int] = 2
 MAX_RESOURCES_PER_USER: Final[int] = 10
 MAX_RESOURCE_SIZE_BYTES: Final[int] = 100 * 1024
 
+MESSAGE_EVENT_PARTITION_SCHEMA: Final[str] = "message_event_partitions"
+
 REDIS_KEY_CHAT_STREAM_LIVE: Final[str] = "chat:{chat_id}:stream:live"
 REDIS_KEY_USER_SETTINGS: Final[str] = "user_settings:{user_id}"
 REDIS_KEY_CHAT_CONTEXT_USAGE: Final[str] = "chat:{chat_id}:context_usage"
@@ -13,6 +15,20 @@ REDIS_KEY_CHAT_QUEUE: Final[str] = "chat:{chat_id}:queue"
 
 QUEUE_MESSAGE_TTL_SECONDS: Final[int] = 3600
 
+# Event kinds that make up an assistant message's content_render snapshot
+STREAM_SNAPSHOT_EVENT_KINDS: Final[frozenset[str]] = frozenset(
+    {
+        "assistant_text",
+        "assistant_thinking",
+        "tool_started",
+        "tool_completed",
+        "tool_failed",
+        "prompt_suggestions",
+        "system",
+        "permission_request",
+    }
+)
+
 SANDBOX_AUTO_PAUSE_TIMEOUT: Final[int] = 3000
 SANDBOX_DEFAULT_COMMAND_TIMEOUT: Final[int] = 120
 SANDBOX_DEFAULT_TIMEOUT: Final[int] = 3600
@@ -77,6 +93,7 @@ SANDBOX_SYSTEM_VARIABLES: Final[list[str]] = [
 
 SANDBOX_RESTORE_EXCLUDE_PATTERNS: Final[list[str]] = [
     ".checkpoints",
+    ".claude/launch",
     ".cache",
     "__pycache__",
     "*.pyc",
@@ -2,7 +2,7 @@ import logging
 import sys
 from datetime import datetime, timezone
 from functools import lru_cache
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import ValidationInfo, field_validator
 from pydantic_settings import BaseSettings
@@ -135,6 +135,11 @@ class Settings(BaseSettings):
     # Use when host.docker.internal doesn't work (Linux VPS, Coolify, etc.)
     # Example: DOCKER_PERMISSION_API_URL=http://api:8080
     DOCKER_PERMISSION_API_URL: str = ""
+    # Bytes requested per read from a CLI exec socket in the Docker transport
+    DOCKER_TRANSPORT_READ_SIZE: int = 256 * 1024
+    # Pooled Docker Engine API connections of the worker-wide Docker provider,
+    # shared by every request and background task
+    DOCKER_API_MAX_CONNECTIONS: int = 64
 
     # Host Sandbox configuration
     HOST_SANDBOX_BASE_DIR: str | None = None
@@ -142,6 +147,9 @@ class Settings(BaseSettings):
     # Override URL for host provider permission-server callbacks.
     # Example (docker-compose web): HOST_PERMISSION_API_URL=http://api:8080
     HOST_PERMISSION_API_URL: str = ""
+    # Terminal and CLI output arriving within this window is delivered as one chunk
+    HOST_OUTPUT_COALESCE_MS: int = 5
+    HOST_OUTPUT_BUFFER_SIZE: int = 64 * 1024
 
     @field_validator("HOST_SANDBOX_BASE_DIR", mode="before")
     @classmethod
@@ -182,6 +190,63 @@ class Settings(BaseSettings):
     CONTEXT_USAGE_POLL_INTERVAL_SECONDS: float = 5.0
     CANCEL_PENDING_TTL_SECONDS: float = 10.0
 
+    # Warm Claude CLI processes: keep one CLI per active chat running between
+    # turns instead of spawning it with --resume every time. Processes are
+    # evicted after IDLE_SECONDS without a turn, retired after MAX_AGE_SECONDS,
+    # and each worker keeps at most CLAUDE_WARM_PROCESSES_MAX of them.
+    CLAUDE_WARM_PROCESS_ENABLED: bool = False
+    CLAUDE_WARM_PROCESS_IDLE_SECONDS: int = 300
+    CLAUDE_WARM_PROCESS_MAX_AGE_SECONDS: int = 1800
+    CLAUDE_WARM_PROCESSES_MAX: int = 8
+    # Queued follow-ups are written to the CLI that ran the previous turn, while
+    # it is younger than this and the model, permission mode, thinking mode and
+    # system prompt still match; otherwise they start a new chat run. 0 disables.
+    CLAUDE_FOLLOW_UP_WINDOW_SECONDS: int = 600
+    # Write the system prompt and MCP config into the sandbox as content-hashed
+    # files under ~/.claude/launch and pass their paths to the CLI.
+    CLAUDE_LAUNCH_ARTIFACTS_ENABLED: bool = True
+    # Benchmarks only: replay this recorded stream-json session for every turn
+    # instead of running the CLI in a sandbox. CLAUDE_REPLAY_SPEED scales the
+    # recorded line offsets; 0 replays without delays.
+    CLAUDE_REPLAY_TRANSCRIPT: str = ""
+    CLAUDE_REPLAY_SPEED: float = 0.0
+
+    # Event seqs reserved per chats-row update by a streaming run
+    CHAT_EVENT_SEQ_BLOCK_SIZE: int = 64
+
+    # Snapshot flush policy for streaming runs ("fixed" or "adaptive"). Adaptive
+    # widens the window up to MAX_INTERVAL_MS as commit latency or the event rate
+    # rises, and flushes after MIN_INTERVAL_MS once the stream goes quiet.
+    CHAT_SNAPSHOT_FLUSH_POLICY: Literal["fixed", "adaptive"] = "fixed"
+    CHAT_SNAPSHOT_FLUSH_INTERVAL_MS: int = 200
+    CHAT_SNAPSHOT_FLUSH_MAX_EVENTS: int = 24
+    CHAT_SNAPSHOT_FLUSH_MIN_INTERVAL_MS: int = 50
+    CHAT_SNAPSHOT_FLUSH_MAX_INTERVAL_MS: int = 1000
+    CHAT_SNAPSHOT_FLUSH_MAX_BATCH_EVENTS: int = 256
+    CHAT_SNAPSHOT_FLUSH_LATENCY_FACTOR: float = 4.0
+    CHAT_SNAPSHOT_FLUSH_BURST_RATE: float = 100.0
+
+    # Write-behind event journal: one flusher per worker group-commits all streams
+    CHAT_EVENT_WRITE_BEHIND: bool = False
+    CHAT_EVENT_JOURNAL_FLUSH_INTERVAL_MS: int = 50
+    CHAT_EVENT_JOURNAL_MAX_BATCH: int = 2000
+    CHAT_EVENT_JOURNAL_MAX_PENDING: int = 20000
+
+    # message_events retention: completed streams are compacted into one archive
+    # row per message, then monthly partitions past retention are dropped
+    CHAT_EVENT_COMPACT_AFTER_HOURS: int = 24
+    CHAT_EVENT_COMPACT_BATCH_SIZE: int = 200
+    CHAT_EVENT_PARTITION_RETENTION_DAYS: int = 90
+    CHAT_EVENT_PARTITIONS_AHEAD: int = 2
+
+    # Live chat stream delivery (Redis Stream per chat, entry IDs are event seqs)
+    CHAT_STREAM_LIVE_MAXLEN: int = 2000
+    CHAT_STREAM_LIVE_TTL_SECONDS: int = 3600
+    CHAT_STREAM_LIVE_BLOCK_MS: int = 15000
+    CHAT_STREAM_HUB_QUEUE_SIZE: int = 1024
+    # Idle subscribers re-check the persisted event log after this long
+    CHAT_STREAM_LIVE_IDLE_CHECK_SECONDS: float = 30.0
+
     # GitHub Copilot OAuth (default ID from https://github.com/anomalyco/opencode)
     GITHUB_CLIENT_ID: str = "Ov23li8tweQw6odWQebz"
 
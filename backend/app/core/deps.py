@@ -15,7 +15,7 @@ from app.services.command import CommandService
 from app.services.exceptions import UserException
 from app.services.refresh_token import RefreshTokenService
 from app.services.sandbox import SandboxService
-from app.services.sandbox_providers import SandboxProviderType, create_sandbox_provider
+from app.services.sandbox_providers import SandboxProviderRegistry, SandboxProviderType
 from app.services.scheduler import SchedulerService
 from app.services.marketplace import MarketplaceService
 from app.services.plugin_installer import PluginInstallerService
@@ -152,14 +152,14 @@ async def get_sandbox_service(
     elif provider_type == SandboxProviderType.MODAL:
         api_key = modal_api_key
 
-    provider = create_sandbox_provider(
+    provider = SandboxProviderRegistry.acquire(
         provider_type=provider_type,
         api_key=api_key,
     )
     try:
         yield SandboxService(provider)
     finally:
-        await provider.cleanup()
+        await SandboxProviderRegistry.release(provider)
 
 
 async def get_storage_service(
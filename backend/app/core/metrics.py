@@ -0,0 +1,45 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Exposed on /metrics through the default registry the instrumentator serves.
+
+STREAM_SNAPSHOT_FLUSHES = Counter(
+    "claudex_stream_snapshot_flushes_total",
+    "Snapshot flushes performed by streaming runs, by trigger.",
+    ["reason"],
+)
+STREAM_SNAPSHOT_FLUSH_LATENCY = Histogram(
+    "claudex_stream_snapshot_flush_latency_seconds",
+    "Time spent persisting one snapshot flush.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+STREAM_SNAPSHOT_FLUSH_EVENTS = Histogram(
+    "claudex_stream_snapshot_flush_events",
+    "Events written by one snapshot flush.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+STREAM_SNAPSHOT_FLUSH_WINDOW = Gauge(
+    "claudex_stream_snapshot_flush_window_ms",
+    "Batch window most recently chosen by the snapshot flush policy.",
+)
+
+TRANSPORT_STDOUT_BYTES = Counter(
+    "claudex_transport_stdout_bytes_total",
+    "Claude CLI stdout bytes handed from a transport reader to the parser.",
+    ["transport"],
+)
+TRANSPORT_STDOUT_BYTES_IN_FLIGHT = Gauge(
+    "claudex_transport_stdout_bytes_in_flight",
+    "Claude CLI stdout bytes read from sandboxes but not yet parsed.",
+    ["transport"],
+)
+TRANSPORT_STDOUT_DEPTH = Gauge(
+    "claudex_transport_stdout_queue_depth",
+    "Claude CLI stdout chunks waiting for the parser.",
+    ["transport"],
+)
+TRANSPORT_STDOUT_READER_STALL = Histogram(
+    "claudex_transport_stdout_reader_stall_seconds",
+    "Time a transport reader waited for the parser to drain its stdout budget.",
+    ["transport"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
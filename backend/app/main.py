@@ -32,7 +32,9 @@ from app.core.middleware import (
 )
 from app.db.session import engine, SessionLocal
 from app.services.maintenance import MaintenanceService
+from app.services.sandbox_providers import SandboxProviderRegistry
 from app.services.streaming.runtime import ChatStreamRuntime
+from app.services.warm_agent import WarmAgentPool
 from app.utils.redis import redis_connection
 from app.admin.config import create_admin
 from app.admin.views import (
@@ -59,6 +61,8 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     finally:
         await maintenance_service.stop()
         await ChatStreamRuntime.stop_background_chats()
+        await WarmAgentPool.shutdown()
+        await SandboxProviderRegistry.shutdown()
         await engine.dispose()
 
 
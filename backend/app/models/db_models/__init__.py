@@ -10,7 +10,7 @@ from .enums import (
     TaskStatus,
     ToolStatus,
 )
-from .chat import Chat, Message, MessageAttachment, MessageEvent
+from .chat import Chat, Message, MessageAttachment, MessageEvent, MessageEventArchive
 from .refresh_token import RefreshToken
 from .scheduled_tasks import ScheduledTask, TaskExecution
 from .user import User, UserSettings
@@ -30,6 +30,7 @@ __all__ = [
     "Message",
     "MessageAttachment",
     "MessageEvent",
+    "MessageEventArchive",
     "RefreshToken",
     "ScheduledTask",
     "TaskExecution",
@@ -3,20 +3,26 @@ from datetime import datetime
 from uuid import UUID
 
 from sqlalchemy import (
+    DDL,
     BigInteger,
+    Boolean,
     DateTime,
     Float,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
+    PrimaryKeyConstraint,
     String,
     Text,
+    event,
     text,
 )
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy import JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.constants import MESSAGE_EVENT_PARTITION_SCHEMA
 from app.db.base_class import Base
 from app.db.types import GUID
 
@@ -180,9 +186,10 @@ class MessageAttachment(Base):
 class MessageEvent(Base):
     __tablename__ = "message_events"
 
+    # Range-partitioned by created_at; the primary key has to include the
+    # partition key, and per-stream seq uniqueness comes from seq allocation.
     id: Mapped[UUID] = mapped_column(
         GUID(),
-        primary_key=True,
         default=uuid.uuid4,
         server_default=text("gen_random_uuid()"),
     )
@@ -201,15 +208,74 @@ class MessageEvent(Base):
     event_type: Mapped[str] = mapped_column(String(64), nullable=False)
     render_payload: Mapped[dict] = mapped_column(JSON, nullable=False)
     audit_payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Pre-serialized SSE envelope, written once at append time
+    envelope: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Set on events that were applied to the message's content_render snapshot
+    in_snapshot: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default="false", nullable=False
+    )
 
     message = relationship("Message", back_populates="events")
     chat = relationship("Chat")
 
     __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
         Index("idx_message_events_message_id_seq", "message_id", "seq"),
-        Index("idx_message_events_chat_id_created_at", "chat_id", "created_at"),
+        Index("idx_message_events_chat_id_seq", "chat_id", "seq"),
         Index(
             "idx_message_events_chat_id_stream_id_seq", "chat_id", "stream_id", "seq"
         ),
-        Index("uq_message_events_stream_seq", "stream_id", "seq", unique=True),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class MessageEventArchive(Base):
+    __tablename__ = "message_event_archives"
+
+    id: Mapped[UUID] = mapped_column(
+        GUID(),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
+    message_id: Mapped[UUID] = mapped_column(
+        GUID(),
+        ForeignKey("messages.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    chat_id: Mapped[UUID] = mapped_column(
+        GUID(),
+        ForeignKey("chats.id", ondelete="CASCADE"),
+        nullable=False,
     )
+    first_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    event_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # zlib-compressed JSON array of the message's events in seq order
+    events: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("uq_message_event_archives_message_id", "message_id", unique=True),
+        Index("idx_message_event_archives_chat_id_last_seq", "chat_id", "last_seq"),
+    )
+
+
+# Schemas built with create_all (tests, fresh dev databases) get a catch-all
+# partition so inserts work before the retention job creates monthly ones.
+# Partitions live in their own schema to keep them out of the public table list.
+event.listen(
+    MessageEvent.__table__,
+    "after_create",
+    DDL(f"CREATE SCHEMA IF NOT EXISTS {MESSAGE_EVENT_PARTITION_SCHEMA}").execute_if(
+        dialect="postgresql"
+    ),
+)
+event.listen(
+    MessageEvent.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS "
+        f"{MESSAGE_EVENT_PARTITION_SCHEMA}.message_events_default "
+        "PARTITION OF message_events DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
@@ -30,6 +30,11 @@ class FileMetadata(BaseModel):
 
 class SandboxFilesMetadataResponse(BaseModel):
     files: list[FileMetadata]
+    # With incremental set, files holds only entries added or changed since
+    # the requested token and removed the paths that are gone.
+    removed: list[str] = Field(default_factory=list)
+    token: str | None = None
+    incremental: bool = False
 
 
 class FileContentResponse(BaseModel):
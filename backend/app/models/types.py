@@ -1,4 +1,4 @@
-from typing import Literal, TypedDict
+from typing import Any, Literal, TypedDict
 
 
 class BaseResourceDict(TypedDict, total=False):
@@ -68,6 +68,17 @@ class ChatCompletionResult(TypedDict):
     last_seq: int
 
 
+class ArchivedEventDict(TypedDict):
+    id: str
+    stream_id: str
+    seq: int
+    event_type: str
+    render_payload: dict[str, Any]
+    audit_payload: dict[str, Any] | None
+    envelope: str | None
+    created_at: str
+
+
 class YamlFrontmatterResult(TypedDict):
     metadata: "YamlMetadata"
     markdown_content: str
@@ -2,22 +2,21 @@ import asyncio
 import json
 import logging
 import math
-from collections.abc import AsyncIterator
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import aclosing
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING, Any
+from typing import Any
 from uuid import UUID, uuid4
 
 from sqlalchemy import exists, func, select, update
 from sqlalchemy.orm import selectinload
 
-from app.constants import REDIS_KEY_CHAT_STREAM_LIVE
 from app.models.db_models import StreamEventKind
 from app.core.config import get_settings
 from app.models.db_models import (
     Chat,
     Message,
     MessageAttachment,
-    MessageEvent,
     MessageRole,
     MessageStreamStatus,
     User,
@@ -37,23 +36,19 @@ from app.prompts.system_prompt import build_system_prompt_for_chat
 from app.services.db import BaseDbService, SessionFactoryType
 from app.services.provider import ProviderService
 from app.services.exceptions import ChatException, ErrorCode
-from app.services.message import MessageService
+from app.services.message import EventReplayRow, MessageService
 from app.services.sandbox import SandboxService
 from app.services.sandbox_providers import (
-    LocalDockerProvider,
+    SandboxProviderRegistry,
     SandboxProviderType,
-    create_docker_config,
 )
+from app.services.streaming.hub import LiveEventHub, LiveSubscription
 from app.services.streaming.runtime import ChatStreamRuntime
-from app.services.streaming.types import ChatStreamRequest
+from app.services.streaming.types import ChatStreamRequest, StreamEnvelope
 from app.services.storage import StorageService
 from app.services.user import UserService
 
-if TYPE_CHECKING:
-    from redis.asyncio.client import PubSub
-
 from app.utils.message_events import extract_user_prompt
-from app.utils.redis import redis_connection, redis_pubsub
 from app.utils.attachment_urls import build_attachment_preview_url
 from app.utils.validators import APIKeyValidationError, validate_model_api_keys
 
@@ -356,60 +351,65 @@ class ChatService(BaseDbService[Chat]):
         self,
         chat_id: UUID,
         after_seq: int,
-    ) -> AsyncIterator[dict[str, Any]]:
+        before_seq: int | None = None,
+    ) -> AsyncGenerator[tuple[str, dict[str, Any]], None]:
         page_size = 5000
         cursor = after_seq
 
         while True:
-            backlog = await self.message_service.get_chat_events_after_seq(
-                chat_id=chat_id,
-                after_seq=cursor,
-                limit=page_size,
-            )
-            if not backlog:
-                return
-
-            for event in backlog:
-                envelope = {
-                    "chatId": str(event.chat_id),
-                    "messageId": str(event.message_id),
-                    "streamId": str(event.stream_id),
-                    "seq": event.seq,
-                    "kind": event.event_type,
-                    "payload": event.render_payload,
-                    "ts": event.created_at.isoformat() if event.created_at else None,
-                }
-                yield {
-                    "id": str(event.seq),
-                    "event": StreamEventKind.STREAM.value,
-                    "data": json.dumps(envelope, ensure_ascii=False),
-                }
-
-            next_cursor = int(backlog[-1].seq)
-            if next_cursor <= cursor:
-                logger.warning(
-                    "Non-increasing backlog seq for chat %s (cursor=%s, next=%s)",
-                    chat_id,
-                    cursor,
-                    next_cursor,
+            count = 0
+            async with aclosing(
+                self.message_service.stream_chat_events_after_seq(
+                    chat_id=chat_id,
+                    after_seq=cursor,
+                    limit=page_size,
+                    before_seq=before_seq,
                 )
-                return
-            cursor = next_cursor
+            ) as backlog:
+                async for row in backlog:
+                    if row.seq <= cursor:
+                        logger.warning(
+                            "Non-increasing backlog seq for chat %s "
+                            "(cursor=%s, next=%s)",
+                            chat_id,
+                            cursor,
+                            row.seq,
+                        )
+                        return
+                    count += 1
+                    cursor = row.seq
+                    yield row.event_type, self._build_replay_sse_event(row)
 
-            if len(backlog) < page_size:
+            if count < page_size:
                 return
 
     @staticmethod
-    def _to_stream_sse_event(event: MessageEvent) -> dict[str, Any]:
-        return ChatService._build_stream_sse_event(
-            chat_id=event.chat_id,
-            message_id=event.message_id,
-            stream_id=event.stream_id,
-            seq=int(event.seq),
-            kind=event.event_type,
-            payload=event.render_payload,
-            ts=event.created_at.isoformat() if event.created_at else None,
+    def _build_replay_sse_event(row: EventReplayRow) -> dict[str, Any]:
+        if row.envelope is not None:
+            return {
+                "id": str(row.seq),
+                "event": StreamEventKind.STREAM.value,
+                "data": row.envelope,
+            }
+        # Events written without a stored envelope: same envelope as
+        # _build_stream_sse_event, with the payload spliced in as the JSON text
+        # read from Postgres instead of being re-serialized.
+        head = json.dumps(
+            {
+                "chatId": str(row.chat_id),
+                "messageId": str(row.message_id),
+                "streamId": str(row.stream_id),
+                "seq": row.seq,
+                "kind": row.event_type,
+            },
+            ensure_ascii=False,
         )
+        ts = json.dumps(row.created_at.isoformat() if row.created_at else None)
+        return {
+            "id": str(row.seq),
+            "event": StreamEventKind.STREAM.value,
+            "data": f'{head[:-1]}, "payload": {row.payload_json}, "ts": {ts}}}',
+        }
 
     @staticmethod
     def _build_stream_sse_event(
@@ -434,7 +434,7 @@ class ChatService(BaseDbService[Chat]):
         return {
             "id": str(seq),
             "event": StreamEventKind.STREAM.value,
-            "data": json.dumps(envelope, ensure_ascii=False),
+            "data": StreamEnvelope.dumps(envelope),
         }
 
     async def _build_stream_error_event(
@@ -475,15 +475,24 @@ class ChatService(BaseDbService[Chat]):
         if resolved_stream_id is None:
             resolved_stream_id = uuid4()
 
+        runtime = ChatStreamRuntime.get_active_runtime(str(chat_id))
         try:
-            error_seq = await self.message_service.append_event_with_next_seq(
-                chat_id=chat_id,
-                message_id=resolved_message_id,
-                stream_id=resolved_stream_id,
-                event_type="error",
-                render_payload=payload,
-                audit_payload={"payload": payload},
-            )
+            if runtime and runtime.assistant_message_id == str(resolved_message_id):
+                resolved_stream_id = runtime.stream_id
+                error_seq = await runtime.emit_event(
+                    "error", payload, apply_snapshot=False
+                )
+            else:
+                # Only ordered with the stream's own events when no other worker
+                # is streaming this chat; see append_event_with_next_seq.
+                error_seq = await self.message_service.append_event_with_next_seq(
+                    chat_id=chat_id,
+                    message_id=resolved_message_id,
+                    stream_id=resolved_stream_id,
+                    event_type="error",
+                    render_payload=payload,
+                    audit_payload={"payload": payload},
+                )
         except Exception as exc:
             logger.warning(
                 "Failed to persist stream error event for chat %s: %s",
@@ -505,30 +514,68 @@ class ChatService(BaseDbService[Chat]):
         self,
         chat_id: UUID,
         last_seq: int,
-        live_pubsub: "PubSub",
+        subscription: LiveSubscription,
     ) -> AsyncIterator[dict[str, Any]]:
         while True:
-            message = await live_pubsub.get_message(
-                ignore_subscribe_messages=True, timeout=1.0
-            )
-            if not message:
+            catch_up_seq = subscription.take_resync_seq()
+            if catch_up_seq is not None and catch_up_seq > last_seq:
+                async with aclosing(
+                    self._replay_stream_backlog(
+                        chat_id, last_seq, before_seq=catch_up_seq + 1
+                    )
+                ) as backlog:
+                    async for kind, item in backlog:
+                        yield item
+                        last_seq = int(item["id"])
+                        if kind in TERMINAL_STREAM_EVENT_TYPES:
+                            return
+
+            try:
+                entry = await asyncio.wait_for(
+                    subscription.get(),
+                    timeout=settings.CHAT_STREAM_LIVE_IDLE_CHECK_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                # A live append can be rejected (a producer lost the seq race) or
+                # lost with Redis, and nothing may follow a terminal event. Finish
+                # from the persisted log instead of waiting for the next entry.
+                async with aclosing(
+                    self._replay_stream_backlog(chat_id, last_seq)
+                ) as backlog:
+                    async for kind, item in backlog:
+                        yield item
+                        last_seq = int(item["id"])
+                        if kind in TERMINAL_STREAM_EVENT_TYPES:
+                            return
+                _, active_message_id = await self._get_active_stream_targets(chat_id)
+                if active_message_id is None:
+                    return
                 continue
-            if message.get("type") != "message":
+
+            if entry.seq <= last_seq:
                 continue
 
-            # Always read from persisted event log so delivery stays sequence-ordered
-            # even when multiple producers publish out of order on Redis Pub/Sub.
-            live_events = await self.message_service.get_chat_events_after_seq(
-                chat_id=chat_id,
-                after_seq=last_seq,
-                limit=5000,
-            )
-            for event in live_events:
-                yield self._to_stream_sse_event(event)
-                last_seq = int(event.seq)
+            if entry.seq > last_seq + 1:
+                # The live stream was trimmed or a producer lost an append race;
+                # fill the hole from the persisted event log to keep seq order.
+                async with aclosing(
+                    self._replay_stream_backlog(chat_id, last_seq, before_seq=entry.seq)
+                ) as backlog:
+                    async for kind, item in backlog:
+                        yield item
+                        last_seq = int(item["id"])
+                        if kind in TERMINAL_STREAM_EVENT_TYPES:
+                            return
 
-                if event.event_type in TERMINAL_STREAM_EVENT_TYPES:
-                    return
+            yield {
+                "id": str(entry.seq),
+                "event": StreamEventKind.STREAM.value,
+                "data": entry.data,
+            }
+            last_seq = entry.seq
+
+            if entry.kind in TERMINAL_STREAM_EVENT_TYPES:
+                return
 
     async def _get_active_stream_targets(
         self, chat_id: UUID
@@ -556,37 +603,23 @@ class ChatService(BaseDbService[Chat]):
         last_seq = after_seq
 
         try:
-            async with redis_connection() as redis:
-                channel = REDIS_KEY_CHAT_STREAM_LIVE.format(chat_id=chat_id)
-                async with redis_pubsub(redis, channel) as live_pubsub:
-                    async for item in self._replay_stream_backlog(chat_id, after_seq):
-                        yield item
-                        try:
-                            last_seq = int(item["id"])
-                        except Exception:
-                            pass
-                        try:
-                            envelope = json.loads(item.get("data", "{}"))
-                        except Exception:
-                            envelope = {}
-                        if envelope.get("kind") in TERMINAL_STREAM_EVENT_TYPES:
-                            return
-
-                    async for event in self._stream_live_redis_events(
-                        chat_id,
-                        last_seq,
-                        live_pubsub,
-                    ):
-                        yield event
-                        try:
-                            event_seq = int(event.get("id", last_seq))
-                            if event_seq > last_seq:
-                                last_seq = event_seq
-                        except Exception:
-                            pass
-                        envelope = json.loads(event.get("data", "{}"))
-                        if envelope.get("kind") in TERMINAL_STREAM_EVENT_TYPES:
-                            return
+            async with aclosing(
+                self._replay_stream_backlog(chat_id, after_seq)
+            ) as backlog:
+                async for kind, item in backlog:
+                    yield item
+                    last_seq = int(item["id"])
+                    if kind in TERMINAL_STREAM_EVENT_TYPES:
+                        return
+
+            async with LiveEventHub.subscribe(chat_id, last_seq) as subscription:
+                async for event in self._stream_live_redis_events(
+                    chat_id,
+                    last_seq,
+                    subscription,
+                ):
+                    yield event
+                    last_seq = int(event["id"])
 
         except Exception as exc:
             logger.error(
@@ -769,7 +802,7 @@ class ChatService(BaseDbService[Chat]):
                 status_code=400,
             )
 
-        provider = LocalDockerProvider(config=create_docker_config())
+        provider = SandboxProviderRegistry.acquire(SandboxProviderType.DOCKER)
         fork_sandbox_service = SandboxService(provider)
 
         try:
@@ -850,7 +883,7 @@ class ChatService(BaseDbService[Chat]):
                     pass
                 raise
         finally:
-            await provider.cleanup()
+            await SandboxProviderRegistry.release(provider)
 
     async def _verify_chat_access(self, chat_id: UUID, user_id: UUID) -> bool:
         async with self.session_factory() as db:
@@ -1,6 +1,11 @@
+import hashlib
+import json
 import logging
+import math
 import re
-from collections.abc import AsyncIterator, Callable
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from dataclasses import dataclass, replace
 from types import TracebackType
 from typing import Any, Literal, Self
 
@@ -27,11 +32,14 @@ from app.services.transports import (
     E2BSandboxTransport,
     HostSandboxTransport,
     ModalSandboxTransport,
+    ReplaySandboxTransport,
 )
+from app.services.transports.base import BaseSandboxTransport
 from app.services.streaming.types import StreamEvent
 from app.services.streaming.processor import StreamProcessor
 from app.services.tool_handler import ToolHandlerRegistry
 from app.services.user import UserService
+from app.services.warm_agent import WarmAgentPool, WarmAgentProcess
 
 SDKPermissionMode = Literal["default", "acceptEdits", "plan", "bypassPermissions"]
 
@@ -91,18 +99,30 @@ class SessionHandler:
             self.session_callback(new_session_id)
 
 
+@dataclass(frozen=True)
+class SessionTurn:
+    prompt_message: dict[str, Any]
+    session_callback: Callable[[str], None] | None
+
+
+# Yields a turn's events followed by None at the turn boundary, where it waits
+# for the next SessionTurn to be sent in.
+SessionStream = AsyncGenerator[StreamEvent | None, SessionTurn | None]
+
+
 class ClaudeAgentService:
     def __init__(self, session_factory: Callable[..., Any] | None = None) -> None:
         self.tool_registry = ToolHandlerRegistry()
         self.session_factory = session_factory or SessionLocal
         self._total_cost_usd = 0.0
-        self._active_transport: (
-            E2BSandboxTransport
-            | DockerSandboxTransport
-            | HostSandboxTransport
-            | ModalSandboxTransport
-            | None
-        ) = None
+        self._active_transport: BaseSandboxTransport | None = None
+        self._active_warm_process: WarmAgentProcess | None = None
+        self._stream_processor: StreamProcessor | None = None
+        self._session: SessionStream | None = None
+        self._session_waiting = False
+        self._session_key: tuple[Any, ...] | None = None
+        self._session_prompt_session_id: str | None = None
+        self._session_expires_at = 0.0
         self._provider_service = ProviderService()
 
     async def __aenter__(self) -> Self:
@@ -132,12 +152,24 @@ class ClaudeAgentService:
         prompt_iterable: AsyncIterator[dict[str, Any]],
         options: ClaudeAgentOptions,
         user_settings: UserSettings,
+        persistent: bool = False,
     ) -> (
         E2BSandboxTransport
         | DockerSandboxTransport
         | HostSandboxTransport
         | ModalSandboxTransport
+        | ReplaySandboxTransport
     ):
+        if settings.CLAUDE_REPLAY_TRANSCRIPT:
+            return ReplaySandboxTransport(
+                sandbox_id=sandbox_id,
+                transcript_path=settings.CLAUDE_REPLAY_TRANSCRIPT,
+                prompt=prompt_iterable,
+                options=options,
+                speed=settings.CLAUDE_REPLAY_SPEED,
+                persistent=persistent,
+            )
+
         if (
             sandbox_provider == SandboxProviderType.DOCKER
             or sandbox_provider == SandboxProviderType.DOCKER.value
@@ -149,6 +181,7 @@ class ClaudeAgentService:
                 docker_config=docker_config,
                 prompt=prompt_iterable,
                 options=options,
+                persistent=persistent,
             )
 
         if sandbox_provider == SandboxProviderType.HOST.value:
@@ -156,6 +189,7 @@ class ClaudeAgentService:
                 sandbox_id=sandbox_id,
                 prompt=prompt_iterable,
                 options=options,
+                persistent=persistent,
             )
 
         if sandbox_provider == SandboxProviderType.MODAL.value:
@@ -169,6 +203,7 @@ class ClaudeAgentService:
                 api_key=user_settings.modal_api_key,
                 prompt=prompt_iterable,
                 options=options,
+                persistent=persistent,
             )
 
         if not user_settings.e2b_api_key:
@@ -181,6 +216,7 @@ class ClaudeAgentService:
             api_key=user_settings.e2b_api_key,
             prompt=prompt_iterable,
             options=options,
+            persistent=persistent,
         )
 
     async def get_ai_stream(
@@ -203,9 +239,13 @@ class ClaudeAgentService:
             session_factory=self.session_factory
         ).get_user_settings(user.id)
 
+        await self.end_session()
         self._total_cost_usd = 0.0
+        self._stream_processor = None
 
         sandbox_provider = user_settings.sandbox_provider
+        warm_enabled = WarmAgentPool.enabled()
+        follow_up_window = max(settings.CLAUDE_FOLLOW_UP_WINDOW_SECONDS, 0)
 
         options = await self._build_claude_options(
             user=user,
@@ -227,43 +267,184 @@ class ClaudeAgentService:
             )
         sandbox_id_str = str(sandbox_id)
 
-        prompt_message = {
-            "type": "user",
-            "message": {"role": MessageRole.USER.value, "content": user_prompt},
-            "parent_tool_use_id": None,
-            "session_id": session_id,
-        }
-        prompt_iterable = self._create_prompt_iterable(prompt_message)
-
-        transport = self._create_sandbox_transport(
-            sandbox_provider=sandbox_provider,
-            sandbox_id=sandbox_id_str,
-            prompt_iterable=prompt_iterable,
-            options=options,
-            user_settings=user_settings,
+        prompt_message = self._build_prompt_message(user_prompt, session_id)
+        turn = SessionTurn(
+            prompt_message=prompt_message, session_callback=session_callback
         )
+        started_at = time.monotonic()
+        expires_at = started_at + follow_up_window
+
+        session: SessionStream | None = None
+        if warm_enabled:
+            warm_process = await self._get_warm_process(
+                chat_id=chat_id,
+                session_id=session_id,
+                sandbox_provider=sandbox_provider,
+                sandbox_id=sandbox_id_str,
+                options=options,
+                user_settings=user_settings,
+                permission_mode=permission_mode,
+            )
+            if warm_process is not None:
+                session = self._run_warm_session(warm_process, turn)
+                expires_at = min(
+                    expires_at,
+                    warm_process.started_at
+                    + max(settings.CLAUDE_WARM_PROCESS_MAX_AGE_SECONDS, 0),
+                )
 
-        async with transport:
-            self._active_transport = transport
+        if session is None:
+            if follow_up_window:
+                # This CLI stays open for follow-ups during the whole window.
+                options = self._with_chat_token_lifetime(
+                    options,
+                    permission_mode=permission_mode,
+                    chat_id=chat_id,
+                    sandbox_provider=sandbox_provider,
+                    lifetime_seconds=follow_up_window,
+                )
+            transport = self._create_sandbox_transport(
+                sandbox_provider=sandbox_provider,
+                sandbox_id=sandbox_id_str,
+                prompt_iterable=self._create_prompt_iterable(prompt_message),
+                options=options,
+                user_settings=user_settings,
+                persistent=bool(follow_up_window),
+            )
+            session = self._run_cli_session(transport, options, turn)
+
+        self._session = session
+        self._session_key = (
+            model_id,
+            permission_mode,
+            thinking_mode,
+            system_prompt,
+            is_custom_prompt,
+        )
+        self._session_prompt_session_id = session_id
+        self._session_expires_at = expires_at
+        async for event in self._stream_session_turn(None):
+            yield event
 
-            processor = StreamProcessor(
-                tool_registry=self.tool_registry,
-                session_handler=self._create_session_handler(session_callback),
+    def can_continue_session(
+        self,
+        *,
+        model_id: str,
+        permission_mode: str,
+        thinking_mode: str | None,
+        system_prompt: str,
+        is_custom_prompt: bool = False,
+    ) -> bool:
+        # True when the CLI of the last turn is idle at its turn boundary and was
+        # started with exactly the options the next turn would need.
+        return (
+            self._session is not None
+            and self._session_waiting
+            and self._session_key
+            == (
+                model_id,
+                permission_mode,
+                thinking_mode,
+                system_prompt,
+                is_custom_prompt,
             )
+            and time.monotonic() < self._session_expires_at
+        )
+
+    async def get_follow_up_stream(
+        self,
+        prompt: str,
+        custom_instructions: str | None,
+        session_callback: Callable[[str], None] | None = None,
+        attachments: list[dict[str, Any]] | None = None,
+    ) -> AsyncIterator[StreamEvent]:
+        if self._session is None or not self._session_waiting:
+            raise ClaudeAgentException("No Claude session is waiting for a follow-up")
 
+        self._total_cost_usd = 0.0
+        self._stream_processor = None
+        user_prompt = self.prepare_user_prompt(prompt, custom_instructions, attachments)
+        turn = SessionTurn(
+            prompt_message=self._build_prompt_message(
+                user_prompt, self._session_prompt_session_id
+            ),
+            session_callback=session_callback,
+        )
+        async for event in self._stream_session_turn(turn):
+            yield event
+
+    async def end_session(self) -> None:
+        session = self._session
+        waiting = self._session_waiting
+        self._session = None
+        self._session_waiting = False
+        self._session_key = None
+        # A session that is not parked at a turn boundary is still streaming,
+        # and its generator cannot be closed from outside while it runs.
+        if session is None or not waiting:
+            return
+        await session.aclose()
+
+    async def _stream_session_turn(
+        self, turn: SessionTurn | None
+    ) -> AsyncIterator[StreamEvent]:
+        session = self._session
+        if session is None:
+            return
+        self._session_waiting = False
+        try:
+            event = await (anext(session) if turn is None else session.asend(turn))
+            while event is not None:
+                yield event
+                event = await anext(session)
+        except StopAsyncIteration:
+            self._session = None
+            return
+        self._session_waiting = True
+
+    def _start_turn(self, turn: SessionTurn) -> StreamProcessor:
+        processor = StreamProcessor(
+            tool_registry=self.tool_registry,
+            session_handler=self._create_session_handler(turn.session_callback),
+        )
+        self._stream_processor = processor
+        return processor
+
+    async def _run_cli_session(
+        self,
+        transport: BaseSandboxTransport,
+        options: ClaudeAgentOptions,
+        turn: SessionTurn,
+    ) -> SessionStream:
+        # One CLI process for this service's turns. Each turn is written to the
+        # still-open stdin; after its result the generator yields None and waits
+        # for the next turn to be sent, and closing it ends the process.
+        async with transport:
+            self._active_transport = transport
             try:
                 async with ClaudeSDKClient(
                     options=options, transport=transport
                 ) as client:
-                    await client.query(prompt_iterable)
-                    async for message in client.receive_response():
-                        for event in processor.emit_events_for_message(message):
-                            if event:
-                                yield event
-                                if event.get("tool", {}).get("name") == "ExitPlanMode":
-                                    await client.set_permission_mode("auto")
-
-                self._total_cost_usd = processor.total_cost_usd
+                    next_turn: SessionTurn | None = turn
+                    while next_turn is not None:
+                        processor = self._start_turn(next_turn)
+                        transport.usage_handler = processor.record_usage
+                        await client.query(
+                            self._create_prompt_iterable(next_turn.prompt_message)
+                        )
+                        async for message in client.receive_response():
+                            for event in processor.emit_events_for_message(message):
+                                if event:
+                                    yield event
+                                    if (
+                                        event.get("tool", {}).get("name")
+                                        == "ExitPlanMode"
+                                    ):
+                                        await client.set_permission_mode("auto")
+                                        self._session_key = None
+
+                        self._total_cost_usd = processor.total_cost_usd
+                        next_turn = yield None
 
             except ClaudeSDKError as e:
                 raise ClaudeAgentException(f"Claude SDK error: {str(e)}")
@@ -271,15 +452,160 @@ class ClaudeAgentService:
             finally:
                 self._active_transport = None
 
+    def _with_chat_token_lifetime(
+        self,
+        options: ClaudeAgentOptions,
+        *,
+        permission_mode: str,
+        chat_id: str,
+        sandbox_provider: str,
+        lifetime_seconds: float,
+    ) -> ClaudeAgentOptions:
+        # A CLI that serves more than one turn keeps the permission server it
+        # started with, so its chat token has to outlive the last turn it may
+        # start by a full token lifetime. One-shot CLIs keep the default token.
+        mcp_servers = options.mcp_servers
+        if not isinstance(mcp_servers, dict) or "permission" not in mcp_servers:
+            return options
+        minutes = settings.CHAT_SCOPED_TOKEN_EXPIRE_MINUTES + math.ceil(
+            lifetime_seconds / 60
+        )
+        permission = self._build_permission_server(
+            permission_mode, chat_id, sandbox_provider, minutes
+        )
+        servers: dict[str, Any] = {**mcp_servers, "permission": permission}
+        return replace(options, mcp_servers=servers)
+
+    @staticmethod
+    def _warm_fingerprint(
+        sandbox_provider: str, sandbox_id: str, options: ClaudeAgentOptions
+    ) -> str:
+        # Everything here is fixed when the CLI starts. The permission server's
+        # chat token is minted per turn and is left out.
+        mcp_servers: object = options.mcp_servers
+        if isinstance(mcp_servers, dict) and "permission" in mcp_servers:
+            servers: dict[str, Any] = dict(mcp_servers)
+            permission: dict[str, Any] = dict(servers["permission"])
+            env: dict[str, Any] = permission.get("env", {})
+            permission["env"] = {
+                key: value for key, value in env.items() if key != "CHAT_TOKEN"
+            }
+            servers["permission"] = permission
+            mcp_servers = servers
+        payload = {
+            "sandbox": [sandbox_provider, sandbox_id],
+            "system_prompt": options.system_prompt,
+            "permission_mode": options.permission_mode,
+            "model": options.model,
+            "disallowed_tools": options.disallowed_tools,
+            "mcp_servers": mcp_servers,
+            "env": options.env,
+            "setting_sources": options.setting_sources,
+            "max_thinking_tokens": options.max_thinking_tokens,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    async def _get_warm_process(
+        self,
+        *,
+        chat_id: str,
+        session_id: str | None,
+        sandbox_provider: str,
+        sandbox_id: str,
+        options: ClaudeAgentOptions,
+        user_settings: UserSettings,
+        permission_mode: str,
+    ) -> WarmAgentProcess | None:
+        fingerprint = self._warm_fingerprint(sandbox_provider, sandbox_id, options)
+        process = await WarmAgentPool.acquire(chat_id, fingerprint, session_id)
+        if process is not None:
+            return process
+        options = self._with_chat_token_lifetime(
+            options,
+            permission_mode=permission_mode,
+            chat_id=chat_id,
+            sandbox_provider=sandbox_provider,
+            lifetime_seconds=max(
+                settings.CLAUDE_FOLLOW_UP_WINDOW_SECONDS,
+                settings.CLAUDE_WARM_PROCESS_MAX_AGE_SECONDS,
+                0,
+            ),
+        )
+        try:
+            return await WarmAgentPool.spawn(
+                chat_id=chat_id,
+                fingerprint=fingerprint,
+                transport_factory=lambda: self._create_sandbox_transport(
+                    sandbox_provider=sandbox_provider,
+                    sandbox_id=sandbox_id,
+                    prompt_iterable=self._create_prompt_iterable({}),
+                    options=options,
+                    user_settings=user_settings,
+                    persistent=True,
+                ),
+                options=options,
+            )
+        except ClaudeSDKError as e:
+            raise ClaudeAgentException(f"Claude SDK error: {str(e)}")
+
+    async def _run_warm_session(
+        self, process: WarmAgentProcess, turn: SessionTurn
+    ) -> SessionStream:
+        # Same turn protocol as _run_cli_session on a pooled warm CLI, which is
+        # handed back to the pool once the session ends.
+        self._active_warm_process = process
+        reusable = False
+        try:
+            next_turn: SessionTurn | None = turn
+            while next_turn is not None:
+                processor = self._start_turn(next_turn)
+                process.set_usage_handler(processor.record_usage)
+                reusable = False
+                async for message in process.stream_turn(next_turn.prompt_message):
+                    for event in processor.emit_events_for_message(message):
+                        if event:
+                            yield event
+                            if event.get("tool", {}).get("name") == "ExitPlanMode":
+                                await process.set_permission_mode("auto")
+                                self._session_key = None
+
+                self._total_cost_usd = processor.total_cost_usd
+                reusable = True
+                next_turn = yield None
+
+        except ClaudeSDKError as e:
+            raise ClaudeAgentException(f"Claude SDK error: {str(e)}")
+
+        finally:
+            self._active_warm_process = None
+            process.set_usage_handler(None)
+            await WarmAgentPool.release(process, reusable=reusable)
+
     def get_total_cost_usd(self) -> float:
         return self._total_cost_usd
 
+    def get_stream_context_tokens(self) -> int | None:
+        # Context size reported by the current or last stream's own usage
+        # fields; None until the CLI has reported any.
+        if self._stream_processor is None:
+            return None
+        return self._stream_processor.context_tokens
+
     def _create_session_handler(
         self, session_callback: Callable[[str], None] | None
     ) -> SessionHandler:
         return SessionHandler(session_callback)
 
     async def cancel_active_stream(self) -> None:
+        try:
+            await self.end_session()
+        except Exception as e:
+            logger.error("Error ending Claude session: %s", e)
+        if self._active_warm_process:
+            process = self._active_warm_process
+            self._active_warm_process = None
+            await WarmAgentPool.discard(process)
         if self._active_transport:
             try:
                 await self._active_transport.close()
@@ -361,9 +687,13 @@ class ClaudeAgentService:
             raise ClaudeAgentException(f"Failed to enhance prompt: {str(e)}")
 
     def _build_permission_server(
-        self, permission_mode: str, chat_id: str, sandbox_provider: str = "docker"
+        self,
+        permission_mode: str,
+        chat_id: str,
+        sandbox_provider: str = "docker",
+        chat_token_minutes: int | None = None,
     ) -> dict[str, Any]:
-        chat_token = create_chat_scoped_token(chat_id)
+        chat_token = create_chat_scoped_token(chat_id, chat_token_minutes)
 
         if sandbox_provider == SandboxProviderType.HOST.value:
             api_base_url = (
@@ -535,11 +865,7 @@ class ClaudeAgentService:
             permission_mode=sdk_permission_mode,
             model=actual_model_id,
             disallowed_tools=disallowed_tools,
-            mcp_servers=await self._get_mcp_servers(
-                user,
-                permission_mode,
-                chat_id,
-            ),
+            mcp_servers=await self._get_mcp_servers(user, permission_mode, chat_id),
             cwd=SANDBOX_HOME_DIR,
             user="user",
             resume=session_id,
@@ -581,6 +907,17 @@ class ClaudeAgentService:
         parts.append(f"<user_prompt>{prompt}</user_prompt>")
         return "".join(parts)
 
+    @staticmethod
+    def _build_prompt_message(
+        user_prompt: str, session_id: str | None
+    ) -> dict[str, Any]:
+        return {
+            "type": "user",
+            "message": {"role": MessageRole.USER.value, "content": user_prompt},
+            "parent_tool_use_id": None,
+            "session_id": session_id,
+        }
+
     @staticmethod
     async def _create_prompt_iterable(
         prompt_message: dict[str, Any],
@@ -610,12 +947,7 @@ class ClaudeAgentService:
                 env=env,
             )
 
-            prompt_message = {
-                "type": "user",
-                "message": {"role": MessageRole.USER.value, "content": "/context"},
-                "parent_tool_use_id": None,
-                "session_id": session_id,
-            }
+            prompt_message = self._build_prompt_message("/context", session_id)
 
             prompt_iterable = self._create_prompt_iterable(prompt_message)
 
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from app.services.sandbox_providers.types import FileMetadata
+
+# Listings kept per tree: the latest and a few before it, so clients that are
+# a couple of changes behind still get a diff instead of the full tree.
+MAX_SNAPSHOTS_PER_TREE = 3
+MAX_CACHED_TREES = 128
+
+# sandbox id, root path, max depth
+FileTreeKey = tuple[str, str, int | None]
+
+
+@dataclass
+class FileTreeDiff:
+    token: str | None
+    files: list[FileMetadata]
+    removed: list[str] = field(default_factory=list)
+    incremental: bool = False
+
+
+class FileTreeCache:
+    # File listings this worker fetched, keyed by tree and by the change token
+    # (see SandboxProvider.get_tree_token) they were fetched under. A listing
+    # is only reused for the exact token it was stored with, so a stale entry
+    # costs a refetch, never a wrong answer; other workers keep their own.
+
+    _trees: OrderedDict[FileTreeKey, OrderedDict[str, dict[str, FileMetadata]]] = (
+        OrderedDict()
+    )
+
+    @classmethod
+    def get(cls, key: FileTreeKey, token: str) -> dict[str, FileMetadata] | None:
+        snapshots = cls._trees.get(key)
+        if snapshots is None or token not in snapshots:
+            return None
+        cls._trees.move_to_end(key)
+        return snapshots[token]
+
+    @classmethod
+    def add(cls, key: FileTreeKey, token: str, files: list[FileMetadata]) -> None:
+        snapshots = cls._trees.setdefault(key, OrderedDict())
+        snapshots[token] = {item.path: item for item in files}
+        snapshots.move_to_end(token)
+        while len(snapshots) > MAX_SNAPSHOTS_PER_TREE:
+            snapshots.popitem(last=False)
+        cls._trees.move_to_end(key)
+        while len(cls._trees) > MAX_CACHED_TREES:
+            cls._trees.popitem(last=False)
+
+    @classmethod
+    def diff(cls, key: FileTreeKey, token: str, since: str | None) -> FileTreeDiff:
+        # The tree under token, as changes since the since token when that
+        # listing is still cached and as the full listing otherwise.
+        current = cls.get(key, token) or {}
+        previous = cls.get(key, since) if since else None
+        if previous is None:
+            return FileTreeDiff(token=token, files=list(current.values()))
+
+        return FileTreeDiff(
+            token=token,
+            files=[
+                item for path, item in current.items() if previous.get(path) != item
+            ],
+            removed=[path for path in previous if path not in current],
+            incremental=True,
+        )
+
+    @classmethod
+    def forget_sandbox(cls, sandbox_id: str) -> None:
+        for key in [key for key in cls._trees if key[0] == sandbox_id]:
+            del cls._trees[key]
@@ -7,6 +7,7 @@ from contextlib import suppress
 from dataclasses import dataclass
 from typing import Any
 
+from app.services.message_retention import MessageRetentionService
 from app.services.refresh_token import RefreshTokenService
 from app.services.sandbox import SandboxService
 from app.services.scheduler import SchedulerService
@@ -32,6 +33,7 @@ class MaintenanceService:
             asyncio.create_task(self._run_job_loop(self._scheduled_tasks_job())),
             asyncio.create_task(self._run_job_loop(self._refresh_tokens_job())),
             asyncio.create_task(self._run_job_loop(self._orphaned_sandboxes_job())),
+            asyncio.create_task(self._run_job_loop(self._message_retention_job())),
         ]
 
     async def stop(self) -> None:
@@ -65,6 +67,13 @@ class MaintenanceService:
             run=SandboxService.cleanup_orphaned_sandboxes,
         )
 
+    def _message_retention_job(self) -> MaintenanceJob:
+        return MaintenanceJob(
+            name="message_event_retention",
+            interval_seconds=3600.0,
+            run=MessageRetentionService.run_retention_job,
+        )
+
     async def _run_scheduled_tasks(self) -> dict[str, Any]:
         return await self._scheduler_service.check_due_tasks(limit=100)
 
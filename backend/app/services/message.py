@@ -1,11 +1,26 @@
 import logging
 import json
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any, cast
 from uuid import UUID, uuid4
 
-from sqlalchemy import select, delete, update, or_, and_, func, insert
+from sqlalchemy import (
+    select,
+    delete,
+    update,
+    or_,
+    and_,
+    func,
+    insert,
+    bindparam,
+    case,
+    cast as sql_cast,
+    Text,
+)
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.db_models import (
@@ -13,6 +28,7 @@ from app.models.db_models import (
     Chat,
     MessageAttachment,
     MessageEvent,
+    MessageEventArchive,
     MessageRole,
     MessageStreamStatus,
 )
@@ -22,10 +38,25 @@ from app.services.db import BaseDbService, SessionFactoryType
 from app.services.exceptions import MessageException, ErrorCode
 from app.utils.attachment_urls import build_attachment_preview_url
 from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
+from app.utils.message_events import unpack_archived_events
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class EventReplayRow:
+    chat_id: UUID
+    message_id: UUID
+    stream_id: UUID
+    seq: int
+    event_type: str
+    # render_payload as JSON text, forwarded to clients without a decode pass
+    payload_json: str
+    created_at: datetime | None
+    # SSE envelope serialized when the event was appended, if it was stored
+    envelope: str | None = None
+
+
 class MessageService(BaseDbService[Message]):
     def __init__(self, session_factory: SessionFactoryType | None = None) -> None:
         super().__init__(session_factory)
@@ -82,6 +113,59 @@ class MessageService(BaseDbService[Message]):
             for att in user_message.attachments
         ]
 
+    @staticmethod
+    async def _attach_streaming_snapshots(
+        db: AsyncSession, messages: list[Message]
+    ) -> None:
+        # While a stream is running only last_seq is persisted on the message row;
+        # the render is rebuilt from the append-only event log up to that cursor.
+        streaming = {
+            message.id: message
+            for message in messages
+            if message.stream_status == MessageStreamStatus.IN_PROGRESS
+            and message.role == MessageRole.ASSISTANT
+            and message.last_seq
+        }
+        if not streaming:
+            return
+
+        result = await db.execute(
+            select(
+                MessageEvent.message_id,
+                MessageEvent.seq,
+                MessageEvent.event_type,
+                MessageEvent.render_payload,
+            )
+            .where(
+                MessageEvent.message_id.in_(list(streaming)),
+                MessageEvent.in_snapshot.is_(True),
+            )
+            .order_by(MessageEvent.message_id, MessageEvent.seq.asc())
+        )
+
+        events_by_message: dict[UUID, list[dict[str, Any]]] = {
+            message_id: [] for message_id in streaming
+        }
+        text_by_message: dict[UUID, list[str]] = {
+            message_id: [] for message_id in streaming
+        }
+        for message_id, seq, event_type, render_payload in result.all():
+            if seq > streaming[message_id].last_seq:
+                continue
+            payload = render_payload or {}
+            events_by_message[message_id].append({"type": event_type, **payload})
+            text = payload.get("text")
+            if event_type == "assistant_text" and isinstance(text, str):
+                text_by_message[message_id].append(text)
+
+        for message_id, message in streaming.items():
+            set_committed_value(
+                message, "content_render", {"events": events_by_message[message_id]}
+            )
+            set_committed_value(
+                message, "content_text", "".join(text_by_message[message_id])
+            )
+
     async def create_message(
         self,
         chat_id: UUID,
@@ -148,28 +232,33 @@ class MessageService(BaseDbService[Message]):
                 .filter(Message.id == message_id)
             )
             result = await db.execute(query)
-            return cast(Message | None, result.scalar_one_or_none())
+            message = result.scalar_one_or_none()
+            if message is not None:
+                await self._attach_streaming_snapshots(db, [message])
+            return cast(Message | None, message)
 
     async def update_message_snapshot(
         self,
         message_id: UUID,
         *,
-        content_text: str,
-        content_render: dict[str, Any],
         last_seq: int,
         active_stream_id: UUID | None,
+        content_text: str | None = None,
+        content_render: dict[str, Any] | None = None,
         stream_status: MessageStreamStatus | None = None,
         total_cost_usd: float | None = None,
-    ) -> Message | None:
+    ) -> bool:
         async with self.session_factory() as db:
             now = datetime.now(timezone.utc)
             values: dict[str, Any] = {
-                "content_text": content_text,
-                "content_render": content_render,
                 "last_seq": func.greatest(Message.last_seq, last_seq),
                 "active_stream_id": active_stream_id,
                 "updated_at": now,
             }
+            if content_text is not None:
+                values["content_text"] = content_text
+            if content_render is not None:
+                values["content_render"] = content_render
             if stream_status is not None:
                 values["stream_status"] = stream_status
             if total_cost_usd is not None:
@@ -178,14 +267,10 @@ class MessageService(BaseDbService[Message]):
             stmt = update(Message).where(Message.id == message_id).values(**values)
             result = await db.execute(stmt)
             if int(getattr(result, "rowcount", 0)) == 0:
-                return None
+                return False
 
             await db.commit()
-
-            query = select(Message).filter(Message.id == message_id)
-            refreshed = await db.execute(query)
-            message = refreshed.scalar_one_or_none()
-            return cast(Message | None, message)
+            return True
 
     async def append_event_with_next_seq(
         self,
@@ -197,41 +282,58 @@ class MessageService(BaseDbService[Message]):
         render_payload: dict[str, Any],
         audit_payload: dict[str, Any] | None,
     ) -> int:
+        # For writers with no runtime streaming the chat in this process: the
+        # event takes a one-seq block from the same reservation path runtimes
+        # use. This is only ordered correctly while no runtime on another
+        # worker holds a block for the chat. Such a runtime keeps writing the
+        # lower seqs of its block after this one; the live stream rejects them
+        # and readers already past this seq never see them, so the fallback is
+        # only safe with a single worker per chat.
+        seq = await self.reserve_event_seqs(chat_id, 1)
+        await self.append_events_batch(
+            chat_id=chat_id,
+            message_id=message_id,
+            stream_id=stream_id,
+            events=[(event_type, render_payload, audit_payload, False)],
+            seqs=[seq],
+        )
+        return seq
+
+    async def reserve_event_seqs(self, chat_id: UUID, count: int) -> int:
+        # Committed on its own so the chats row lock is held only for the bump,
+        # not for the inserts that later consume the reserved range.
         async with self.session_factory() as db:
             seq_result = await db.execute(
                 update(Chat)
                 .where(Chat.id == chat_id)
-                .values(last_event_seq=Chat.last_event_seq + 1)
+                .values(last_event_seq=Chat.last_event_seq + count)
                 .returning(Chat.last_event_seq)
             )
-            next_seq = seq_result.scalar_one_or_none()
-            if next_seq is None:
+            end_seq = seq_result.scalar_one_or_none()
+            if end_seq is None:
                 raise MessageException(
                     "Chat not found",
                     error_code=ErrorCode.CHAT_NOT_FOUND,
                     details={"chat_id": str(chat_id)},
                     status_code=404,
                 )
-            next_seq = int(next_seq)
+            await db.commit()
+            return int(end_seq)
 
-            now = datetime.now(timezone.utc)
-            await db.execute(
-                insert(MessageEvent).values(
-                    id=uuid4(),
-                    chat_id=chat_id,
-                    message_id=message_id,
-                    stream_id=stream_id,
-                    seq=next_seq,
-                    event_type=event_type,
-                    render_payload=render_payload,
-                    audit_payload=audit_payload,
-                    created_at=now,
-                    updated_at=now,
-                )
+    async def release_event_seqs(
+        self, chat_id: UUID, *, reserved_end: int, last_used: int
+    ) -> bool:
+        # Only rewinds the chat counter if it still ends at this reservation.
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(Chat)
+                .where(Chat.id == chat_id, Chat.last_event_seq == reserved_end)
+                .values(last_event_seq=last_used)
             )
-
+            if int(getattr(result, "rowcount", 0)) == 0:
+                return False
             await db.commit()
-            return next_seq
+            return True
 
     async def append_events_batch(
         self,
@@ -239,49 +341,69 @@ class MessageService(BaseDbService[Message]):
         chat_id: UUID,
         message_id: UUID,
         stream_id: UUID,
-        events: list[tuple[str, dict[str, Any], dict[str, Any] | None]],
+        events: list[tuple[str, dict[str, Any], dict[str, Any] | None, bool]],
+        seqs: list[int],
+        envelopes: list[str | None] | None = None,
     ) -> int:
         if not events:
             return 0
 
-        count = len(events)
-        async with self.session_factory() as db:
-            seq_result = await db.execute(
-                update(Chat)
-                .where(Chat.id == chat_id)
-                .values(last_event_seq=Chat.last_event_seq + count)
-                .returning(Chat.last_event_seq)
-            )
-            end_seq = seq_result.scalar_one_or_none()
-            if end_seq is None:
-                raise MessageException(
-                    "Chat not found",
-                    error_code=ErrorCode.CHAT_NOT_FOUND,
-                    details={"chat_id": str(chat_id)},
-                    status_code=404,
-                )
-            end_seq = int(end_seq)
-            start_seq = end_seq - count + 1
-
-            now = datetime.now(timezone.utc)
-            rows = [
+        # Inserting the events and advancing the message cursor share one
+        # statement, so a flush is a single round trip and a single commit.
+        now = datetime.now(timezone.utc)
+        rows: list[dict[str, Any]] = []
+        for seq, event, envelope in zip(
+            seqs, events, envelopes or [None] * len(events), strict=True
+        ):
+            event_type, render_payload, audit_payload, in_snapshot = event
+            rows.append(
                 {
                     "id": uuid4(),
                     "chat_id": chat_id,
                     "message_id": message_id,
                     "stream_id": stream_id,
-                    "seq": start_seq + i,
+                    "seq": seq,
                     "event_type": event_type,
                     "render_payload": render_payload,
                     "audit_payload": audit_payload,
+                    "envelope": envelope,
+                    "in_snapshot": in_snapshot,
                     "created_at": now,
                     "updated_at": now,
                 }
-                for i, (event_type, render_payload, audit_payload) in enumerate(events)
-            ]
-            await db.execute(insert(MessageEvent), rows)
+            )
+        inserted = (
+            insert(MessageEvent)
+            .values(rows)
+            .returning(MessageEvent.seq)
+            .cte("inserted")
+        )
+        stmt = (
+            update(Message)
+            .where(Message.id == message_id)
+            .values(
+                last_seq=func.greatest(
+                    Message.last_seq,
+                    select(func.max(inserted.c.seq)).scalar_subquery(),
+                ),
+                # A terminal event written after the final snapshot must not
+                # re-open the stream on a message that already finished.
+                active_stream_id=case(
+                    (
+                        Message.stream_status == MessageStreamStatus.IN_PROGRESS,
+                        stream_id,
+                    ),
+                    else_=Message.active_stream_id,
+                ),
+                updated_at=now,
+            )
+            .returning(Message.last_seq)
+            .add_cte(inserted)
+        )
+        async with self.session_factory() as db:
+            last_seq = (await db.execute(stmt)).scalar_one_or_none()
             await db.commit()
-            return end_seq
+            return int(last_seq) if last_seq is not None else max(seqs)
 
     async def get_chat_messages(
         self, chat_id: UUID, cursor: str | None = None, limit: int = 20
@@ -316,6 +438,7 @@ class MessageService(BaseDbService[Message]):
 
             has_more = len(rows) > limit
             items = rows[:limit]
+            await self._attach_streaming_snapshots(db, items)
 
             next_cursor = None
             if has_more and items:
@@ -360,30 +483,141 @@ class MessageService(BaseDbService[Message]):
                     "event_type": event["event_type"],
                     "render_payload": event["render_payload"],
                     "audit_payload": event.get("audit_payload"),
+                    "envelope": event.get("envelope"),
+                    "in_snapshot": event.get("in_snapshot", False),
                     "created_at": now,
                     "updated_at": now,
                 }
             )
 
+        # Rows may span many messages (the write-behind journal group-commits
+        # every active stream), so each message cursor is advanced to the
+        # highest seq it received in this batch.
+        cursors: dict[UUID, tuple[int, UUID]] = {}
+        for row in rows:
+            current = cursors.get(row["message_id"])
+            if current is None or row["seq"] > current[0]:
+                cursors[row["message_id"]] = (row["seq"], row["stream_id"])
+
+        cursor_stmt = (
+            update(Message)
+            .where(Message.id == bindparam("b_message_id"))
+            .values(
+                last_seq=func.greatest(Message.last_seq, bindparam("b_last_seq")),
+                active_stream_id=case(
+                    (
+                        Message.stream_status == MessageStreamStatus.IN_PROGRESS,
+                        bindparam("b_stream_id"),
+                    ),
+                    else_=Message.active_stream_id,
+                ),
+                updated_at=now,
+            )
+        )
+
         async with self.session_factory() as db:
             await db.execute(insert(MessageEvent), rows)
+            # Executed on the connection: an ORM session would treat a list of
+            # parameter sets as a bulk update by primary key, which does not
+            # allow the custom WHERE clause.
+            connection = await db.connection()
+            await connection.execute(
+                cursor_stmt,
+                [
+                    {
+                        "b_message_id": message_id,
+                        "b_last_seq": last_seq,
+                        "b_stream_id": stream_id,
+                    }
+                    for message_id, (last_seq, stream_id) in cursors.items()
+                ],
+            )
             await db.commit()
 
-    async def get_chat_events_after_seq(
+    async def stream_chat_events_after_seq(
         self,
         chat_id: UUID,
         after_seq: int,
-        limit: int = 500,
-    ) -> list[MessageEvent]:
-        async with self.session_factory() as db:
-            query = (
-                select(MessageEvent)
-                .where(MessageEvent.chat_id == chat_id, MessageEvent.seq > after_seq)
-                .order_by(MessageEvent.seq.asc())
-                .limit(limit)
+        limit: int,
+        before_seq: int | None = None,
+    ) -> AsyncGenerator[EventReplayRow, None]:
+        # Backlog replay reads a narrow projection through a server-side cursor
+        # and takes the payload as the JSON text Postgres already holds, so a
+        # reconnect never materializes or re-encodes the whole page.
+        query = (
+            select(
+                MessageEvent.chat_id,
+                MessageEvent.message_id,
+                MessageEvent.stream_id,
+                MessageEvent.seq,
+                MessageEvent.event_type,
+                sql_cast(MessageEvent.render_payload, Text),
+                MessageEvent.created_at,
+                MessageEvent.envelope,
             )
-            result = await db.execute(query)
-            return list(result.scalars().all())
+            .where(MessageEvent.chat_id == chat_id, MessageEvent.seq > after_seq)
+            .order_by(MessageEvent.seq.asc())
+            .limit(limit)
+            .execution_options(yield_per=500)
+        )
+        if before_seq is not None:
+            query = query.where(MessageEvent.seq < before_seq)
+
+        async with self.session_factory() as db:
+            archived = [
+                EventReplayRow(
+                    chat_id=event.chat_id,
+                    message_id=event.message_id,
+                    stream_id=event.stream_id,
+                    seq=int(event.seq),
+                    event_type=event.event_type,
+                    payload_json=json.dumps(event.render_payload, ensure_ascii=False),
+                    created_at=event.created_at,
+                    envelope=event.envelope,
+                )
+                for event in await self._get_archived_events(
+                    db,
+                    MessageEventArchive.chat_id == chat_id,
+                    after_seq=after_seq,
+                    before_seq=before_seq,
+                    limit=limit,
+                )
+            ]
+            archived.sort(key=lambda row: row.seq)
+            pending = 0
+            yielded = 0
+
+            result = await db.stream(query)
+            try:
+                async for row in result:
+                    seq = int(row[3])
+                    while pending < len(archived) and archived[pending].seq < seq:
+                        if yielded >= limit:
+                            return
+                        yield archived[pending]
+                        pending += 1
+                        yielded += 1
+                    if yielded >= limit:
+                        return
+                    yield EventReplayRow(
+                        chat_id=row[0],
+                        message_id=row[1],
+                        stream_id=row[2],
+                        seq=seq,
+                        event_type=row[4],
+                        payload_json=row[5],
+                        created_at=row[6],
+                        envelope=row[7],
+                    )
+                    yielded += 1
+            finally:
+                await result.close()
+
+            for archived_row in archived[pending:]:
+                if yielded >= limit:
+                    return
+                yield archived_row
+                yielded += 1
 
     async def get_message_events_after_seq(
         self,
@@ -401,7 +635,73 @@ class MessageService(BaseDbService[Message]):
                 .limit(limit)
             )
             result = await db.execute(query)
-            return list(result.scalars().all())
+            events = list(result.scalars().all())
+            archived = await self._get_archived_events(
+                db,
+                MessageEventArchive.message_id == message_id,
+                after_seq=after_seq,
+                before_seq=None,
+                limit=limit,
+            )
+            return self._merge_archived_events(events, archived, limit)
+
+    @staticmethod
+    async def _get_archived_events(
+        db: AsyncSession,
+        *conditions: Any,
+        after_seq: int,
+        before_seq: int | None,
+        limit: int,
+    ) -> list[MessageEvent]:
+        # Completed streams are compacted into one archive row per message; the
+        # events are expanded here into detached MessageEvent objects so callers
+        # read both tiers the same way.
+        query = (
+            select(
+                MessageEventArchive.chat_id,
+                MessageEventArchive.message_id,
+                MessageEventArchive.events,
+            )
+            .where(*conditions, MessageEventArchive.last_seq > after_seq)
+            .order_by(MessageEventArchive.first_seq.asc())
+            .limit(limit)
+        )
+        if before_seq is not None:
+            query = query.where(MessageEventArchive.first_seq < before_seq)
+        result = await db.execute(query)
+
+        events: list[MessageEvent] = []
+        for row in result:
+            for item in unpack_archived_events(row.events):
+                seq = item["seq"]
+                if seq <= after_seq or (before_seq is not None and seq >= before_seq):
+                    continue
+                events.append(
+                    MessageEvent(
+                        id=UUID(item["id"]),
+                        chat_id=row.chat_id,
+                        message_id=row.message_id,
+                        stream_id=UUID(item["stream_id"]),
+                        seq=seq,
+                        event_type=item["event_type"],
+                        render_payload=item["render_payload"],
+                        audit_payload=item.get("audit_payload"),
+                        envelope=item.get("envelope"),
+                        created_at=datetime.fromisoformat(item["created_at"]),
+                    )
+                )
+            if len(events) >= limit:
+                break
+        return events
+
+    @staticmethod
+    def _merge_archived_events(
+        events: list[MessageEvent], archived: list[MessageEvent], limit: int
+    ) -> list[MessageEvent]:
+        if not archived:
+            return events
+        merged = sorted([*events, *archived], key=lambda event: int(event.seq))
+        return merged[:limit]
 
     async def delete_messages_after(self, chat_id: UUID, message: Message) -> int:
         async with self.session_factory() as db:
@@ -472,4 +772,6 @@ class MessageService(BaseDbService[Message]):
                 .order_by(Message.created_at.asc(), Message.id.asc())
             )
             result = await db.execute(query)
-            return list(result.scalars().all())
+            messages = list(result.scalars().all())
+            await self._attach_streaming_snapshots(db, messages)
+            return messages
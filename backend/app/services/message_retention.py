@@ -0,0 +1,270 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import delete, exists, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import MESSAGE_EVENT_PARTITION_SCHEMA
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.db_models import (
+    Message,
+    MessageEvent,
+    MessageEventArchive,
+    MessageStreamStatus,
+)
+from app.models.types import ArchivedEventDict
+from app.services.db import BaseDbService
+from app.utils.message_events import pack_archived_events, unpack_archived_events
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PARTITION_NAME_PATTERN = re.compile(r"^message_events_p(\d{4})(\d{2})$")
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def _add_month(value: datetime) -> datetime:
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+class MessageRetentionService(BaseDbService[MessageEventArchive]):
+    async def compact_completed_streams(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            hours=settings.CHAT_EVENT_COMPACT_AFTER_HOURS
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Message.id, Message.chat_id)
+                .where(
+                    Message.stream_status != MessageStreamStatus.IN_PROGRESS,
+                    Message.updated_at < cutoff,
+                    exists().where(MessageEvent.message_id == Message.id),
+                )
+                .limit(max(settings.CHAT_EVENT_COMPACT_BATCH_SIZE, 1))
+            )
+            candidates = [(row.id, row.chat_id) for row in result]
+
+        compacted = 0
+        for message_id, chat_id in candidates:
+            try:
+                if await self._compact_message(message_id, chat_id):
+                    compacted += 1
+            except Exception as exc:
+                logger.warning(
+                    "Failed to compact events of message %s: %s", message_id, exc
+                )
+        return compacted
+
+    async def _compact_message(self, message_id: UUID, chat_id: UUID) -> bool:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(MessageEvent)
+                .where(MessageEvent.message_id == message_id)
+                .order_by(MessageEvent.seq.asc())
+            )
+            events = list(result.scalars().all())
+            if not events:
+                return False
+
+            archive_result = await db.execute(
+                select(MessageEventArchive)
+                .where(MessageEventArchive.message_id == message_id)
+                .with_for_update()
+            )
+            archive = archive_result.scalar_one_or_none()
+
+            merged: dict[int, ArchivedEventDict] = {}
+            if archive is not None:
+                for item in unpack_archived_events(archive.events):
+                    merged[item["seq"]] = item
+            for event in events:
+                merged[int(event.seq)] = {
+                    "id": str(event.id),
+                    "stream_id": str(event.stream_id),
+                    "seq": int(event.seq),
+                    "event_type": event.event_type,
+                    "render_payload": event.render_payload,
+                    "audit_payload": event.audit_payload,
+                    "envelope": event.envelope,
+                    "created_at": event.created_at.isoformat(),
+                }
+            ordered = [merged[seq] for seq in sorted(merged)]
+            values = {
+                "first_seq": ordered[0]["seq"],
+                "last_seq": ordered[-1]["seq"],
+                "event_count": len(ordered),
+                "events": pack_archived_events(ordered),
+            }
+
+            if archive is None:
+                db.add(
+                    MessageEventArchive(
+                        message_id=message_id, chat_id=chat_id, **values
+                    )
+                )
+            else:
+                await db.execute(
+                    update(MessageEventArchive)
+                    .where(MessageEventArchive.id == archive.id)
+                    .values(**values, updated_at=datetime.now(timezone.utc))
+                )
+            await db.execute(
+                delete(MessageEvent).where(
+                    MessageEvent.message_id == message_id,
+                    MessageEvent.seq <= events[-1].seq,
+                )
+            )
+            await db.commit()
+            return True
+
+    async def ensure_partitions(self) -> list[str]:
+        month = _month_start(datetime.now(timezone.utc))
+        created: list[str] = []
+        async with self.session_factory() as db:
+            existing = await self._list_partitions(db)
+            for _ in range(max(settings.CHAT_EVENT_PARTITIONS_AHEAD, 0) + 1):
+                next_month = _add_month(month)
+                name = f"message_events_p{month:%Y%m}"
+                if name not in existing:
+                    try:
+                        async with db.begin_nested():
+                            await db.execute(
+                                text(
+                                    "CREATE TABLE IF NOT EXISTS "
+                                    f"{MESSAGE_EVENT_PARTITION_SCHEMA}.{name} "
+                                    "PARTITION OF message_events FOR VALUES "
+                                    f"FROM ('{month.isoformat()}') "
+                                    f"TO ('{next_month.isoformat()}')"
+                                )
+                            )
+                        created.append(name)
+                    except Exception as exc:
+                        # Rows for this range already sit in the default partition
+                        # (schemas built without the migration); keep using it.
+                        logger.warning("Could not create partition %s: %s", name, exc)
+                month = next_month
+            await db.commit()
+        return created
+
+    async def drop_expired_partitions(self) -> list[str]:
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            days=settings.CHAT_EVENT_PARTITION_RETENTION_DAYS
+        )
+        async with self.session_factory() as db:
+            partitions = sorted(await self._list_partitions(db))
+
+        dropped: list[str] = []
+        for name in partitions:
+            match = PARTITION_NAME_PATTERN.match(name)
+            if not match:
+                continue
+            month = datetime(
+                int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc
+            )
+            if _add_month(month) > cutoff:
+                continue
+            # Compaction deletes the rows it archives, so the partition can only
+            # go once every message with events in it has been compacted.
+            await self._compact_month(month)
+            async with self.session_factory() as db:
+                if await self._has_events_in_month(db, month):
+                    logger.warning(
+                        "Keeping expired partition %s: it still holds events "
+                        "that are not archived",
+                        name,
+                    )
+                    continue
+                await db.execute(
+                    text(f"DROP TABLE {MESSAGE_EVENT_PARTITION_SCHEMA}.{name}")
+                )
+                await db.commit()
+            dropped.append(name)
+        return dropped
+
+    async def _compact_month(self, month: datetime) -> None:
+        # Unlike the hourly batch, this compacts every finished message with
+        # events in the month, however recently it was updated.
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(MessageEvent.message_id, MessageEvent.chat_id)
+                .where(
+                    MessageEvent.created_at >= month,
+                    MessageEvent.created_at < _add_month(month),
+                    exists().where(
+                        Message.id == MessageEvent.message_id,
+                        Message.stream_status != MessageStreamStatus.IN_PROGRESS,
+                    ),
+                )
+                .distinct()
+            )
+            candidates = [(row.message_id, row.chat_id) for row in result]
+
+        for message_id, chat_id in candidates:
+            try:
+                await self._compact_message(message_id, chat_id)
+            except Exception as exc:
+                logger.warning(
+                    "Failed to compact events of message %s: %s", message_id, exc
+                )
+
+    @staticmethod
+    async def _has_events_in_month(db: AsyncSession, month: datetime) -> bool:
+        result = await db.execute(
+            select(
+                exists().where(
+                    MessageEvent.created_at >= month,
+                    MessageEvent.created_at < _add_month(month),
+                )
+            )
+        )
+        return bool(result.scalar())
+
+    @staticmethod
+    async def _list_partitions(db: AsyncSession) -> set[str]:
+        result = await db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "JOIN pg_namespace ns ON ns.oid = child.relnamespace "
+                "WHERE parent.relname = 'message_events' AND ns.nspname = :schema"
+            ),
+            {"schema": MESSAGE_EVENT_PARTITION_SCHEMA},
+        )
+        return {row[0] for row in result}
+
+    @classmethod
+    async def run_retention_job(cls) -> dict[str, Any]:
+        # Compaction runs first so completed streams are archived before the
+        # partitions that held their events are dropped.
+        try:
+            service = cls(session_factory=SessionLocal)
+            compacted = await service.compact_completed_streams()
+            created = await service.ensure_partitions()
+            dropped = await service.drop_expired_partitions()
+            if compacted or created or dropped:
+                logger.info(
+                    "Message event retention compacted=%s created=%s dropped=%s",
+                    compacted,
+                    created,
+                    dropped,
+                )
+            return {
+                "compacted_messages": compacted,
+                "created_partitions": created,
+                "dropped_partitions": dropped,
+            }
+        except Exception as e:
+            logger.error("Error running message event retention: %s", e)
+            return {"error": str(e)}
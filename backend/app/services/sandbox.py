@@ -10,7 +10,7 @@ import shlex
 import uuid
 import zipfile
 from pathlib import Path
-from typing import Any, Callable, Coroutine
+from typing import Any, AsyncIterator, Callable, Coroutine
 
 from fastapi import WebSocket
 from sqlalchemy import select
@@ -41,21 +41,24 @@ from app.services.agent import AgentService
 from app.services.command import CommandService
 from app.services.db import SessionFactoryType
 from app.services.exceptions import SandboxException, UserException
-from app.services.sandbox_providers import create_docker_config
+from app.services.file_tree import FileTreeCache, FileTreeDiff
 from app.services.sandbox_providers import (
+    LocalDockerProvider,
     PtySize,
     SandboxProvider,
-    create_sandbox_provider,
+    SandboxProviderRegistry,
 )
-from app.services.sandbox_providers.docker_provider import LocalDockerProvider
 from app.services.sandbox_providers.types import CommandResult
 from app.services.sandbox_providers.types import SandboxProviderType
 from app.services.skill import SkillService
+from app.services.transports.launch_artifacts import LaunchArtifactCache
 from app.utils.queue import drain_queue, put_with_overflow
 
 logger = logging.getLogger(__name__)
 
 OPENVSCODE_PORT = 8765
+# A ZIP with no members: just the end-of-central-directory record
+EMPTY_ZIP_ARCHIVE = b"PK\x05\x06" + b"\x00" * 18
 OPENVSCODE_DEFAULT_SETTINGS: dict[str, object] = {
     "workbench.colorTheme": "Default Dark Modern",
     "window.autoDetectColorScheme": True,
@@ -98,7 +101,7 @@ class SandboxService:
                         sandbox_id,
                         e,
                     )
-        await self.provider.cleanup()
+        await SandboxProviderRegistry.release(self.provider)
 
     @classmethod
     async def create_for_user(
@@ -125,7 +128,7 @@ class SandboxService:
                 key = user_settings.modal_api_key
                 api_key = key if isinstance(key, str) else None
 
-            provider = create_sandbox_provider(
+            provider = SandboxProviderRegistry.acquire(
                 provider_type=provider_type,
                 api_key=api_key,
             )
@@ -143,13 +146,15 @@ class SandboxService:
             )
             active_sandbox_ids = {row[0] for row in result.fetchall() if row[0]}
 
-        provider = LocalDockerProvider(create_docker_config())
+        provider = SandboxProviderRegistry.acquire(SandboxProviderType.DOCKER)
         orphaned_ids: list[str] = []
         deleted_ids: list[str] = []
         failed_ids: list[dict[str, str]] = []
         containers: list[tuple[str, Any]] = []
 
         try:
+            if not isinstance(provider, LocalDockerProvider):
+                raise SandboxException("The Docker sandbox provider is not available")
             containers = await provider.list_sandboxes()
             orphaned_ids = [
                 sandbox_id
@@ -167,7 +172,7 @@ class SandboxService:
             logger.error("Error cleaning up orphaned sandboxes: %s", exc, exc_info=True)
             return {"error": str(exc)}
         finally:
-            await provider.cleanup()
+            await SandboxProviderRegistry.release(provider)
 
         if deleted_ids or failed_ids:
             logger.info(
@@ -192,6 +197,8 @@ class SandboxService:
         if not sandbox_id:
             return
         self._ide_tokens.pop(sandbox_id, None)
+        LaunchArtifactCache.forget_sandbox(sandbox_id)
+        FileTreeCache.forget_sandbox(sandbox_id)
         try:
             await self.provider.delete_sandbox(sandbox_id)
         except Exception as e:
@@ -403,18 +410,47 @@ class SandboxService:
                 exc_info=True,
             )
 
-    async def get_files_metadata(self, sandbox_id: str) -> list[dict[str, Any]]:
-        metadata = await self.provider.list_files(sandbox_id)
-        return [
-            {
-                "path": m.path,
-                "type": m.type,
-                "size": m.size,
-                "modified": m.modified,
-                "is_binary": m.is_binary,
-            }
-            for m in metadata
-        ]
+    async def get_files_metadata(
+        self,
+        sandbox_id: str,
+        path: str | None = None,
+        depth: int | None = None,
+        since: str | None = None,
+    ) -> dict[str, Any]:
+        root = self.provider.normalize_path(path) if path else SANDBOX_HOME_DIR
+        if root != SANDBOX_HOME_DIR and not root.startswith(f"{SANDBOX_HOME_DIR}/"):
+            raise SandboxException(f"Path must be inside {SANDBOX_HOME_DIR}: {path}")
+
+        # One cheap exec decides whether the last listing of this tree is still
+        # current; the full find only runs when something changed.
+        key = (sandbox_id, root, depth)
+        token = await self.provider.get_tree_token(sandbox_id, root, max_depth=depth)
+        if token is None:
+            metadata = await self.provider.list_files(sandbox_id, root, max_depth=depth)
+            tree = FileTreeDiff(token=None, files=metadata)
+        else:
+            if FileTreeCache.get(key, token) is None:
+                metadata = await self.provider.list_files(
+                    sandbox_id, root, max_depth=depth
+                )
+                FileTreeCache.add(key, token, metadata)
+            tree = FileTreeCache.diff(key, token, since)
+
+        return {
+            "files": [
+                {
+                    "path": m.path,
+                    "type": m.type,
+                    "size": m.size,
+                    "modified": m.modified,
+                    "is_binary": m.is_binary,
+                }
+                for m in tree.files
+            ],
+            "removed": tree.removed,
+            "token": tree.token,
+            "incremental": tree.incremental,
+        }
 
     async def get_file_content(self, sandbox_id: str, file_path: str) -> dict[str, Any]:
         try:
@@ -486,35 +522,16 @@ class SandboxService:
         sandbox_secrets = await self.provider.get_secrets(sandbox_id)
         return [{"key": s.key, "value": s.value} for s in sandbox_secrets]
 
-    async def generate_zip_download(self, sandbox_id: str) -> bytes:
-        metadata_items = await self.provider.list_files(sandbox_id)
-
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for item in metadata_items:
-                if item.type == "file":
-                    file_path = item.path
-
-                    try:
-                        content = await self.provider.read_file(sandbox_id, file_path)
-
-                        if content.is_binary:
-                            zip_file.writestr(
-                                file_path, base64.b64decode(content.content)
-                            )
-                        else:
-                            zip_file.writestr(
-                                file_path, content.content.encode("utf-8")
-                            )
-                    except Exception as e:
-                        logger.warning(
-                            "Failed to write file %s to zip: %s", file_path, e
-                        )
-                        continue
-
-        zip_buffer.seek(0)
-        return zip_buffer.read()
+    async def stream_zip_download(self, sandbox_id: str) -> AsyncIterator[bytes]:
+        # The archive is built inside the sandbox and passed through chunk by
+        # chunk, so its size is bounded by the sandbox's disk, not API memory.
+        produced = False
+        async for chunk in self.provider.stream_zip(sandbox_id):
+            if chunk:
+                produced = True
+                yield chunk
+        if not produced:
+            yield EMPTY_ZIP_ARCHIVE
 
     async def _copy_all_resources_to_sandbox(
         self,
@@ -713,41 +730,47 @@ class SandboxService:
         if not auto_compact_disabled and not attribution_disabled:
             return
 
+        settings_path = f"{SANDBOX_CLAUDE_DIR}/settings.json"
+        paths = []
         if auto_compact_disabled:
-            config: dict[str, Any] = {}
+            paths.append(SANDBOX_CLAUDE_JSON_PATH)
+        if attribution_disabled:
+            paths.append(settings_path)
+
+        try:
+            existing = await self.provider.read_files(sandbox_id, paths)
+        except Exception:
+            existing = {}
+
+        def load_json(path: str) -> dict[str, Any]:
+            content = existing.get(path)
+            if content is None or content.is_binary or not content.content:
+                return {}
             try:
-                existing = await self.provider.read_file(
-                    sandbox_id, SANDBOX_CLAUDE_JSON_PATH
-                )
-                if not existing.is_binary and existing.content:
-                    config = json.loads(existing.content)
-            except Exception:
-                pass
+                loaded = json.loads(content.content)
+            except json.JSONDecodeError:
+                return {}
+            return loaded if isinstance(loaded, dict) else {}
+
+        updates: dict[str, str | bytes] = {}
+        if auto_compact_disabled:
+            config = load_json(SANDBOX_CLAUDE_JSON_PATH)
             config["autoCompactEnabled"] = False
-            await self.write_file(
-                sandbox_id, SANDBOX_CLAUDE_JSON_PATH, json.dumps(config, indent=2)
-            )
+            updates[SANDBOX_CLAUDE_JSON_PATH] = json.dumps(config, indent=2)
 
         if attribution_disabled:
-            settings_path = f"{SANDBOX_CLAUDE_DIR}/settings.json"
-            settings: dict[str, Any] = {}
-            await self.execute_command(sandbox_id, f"mkdir -p {SANDBOX_CLAUDE_DIR}")
-            try:
-                existing = await self.provider.read_file(sandbox_id, settings_path)
-                if not existing.is_binary and existing.content:
-                    settings = json.loads(existing.content)
-            except Exception:
-                pass
+            settings = load_json(settings_path)
             settings["attribution"] = {"commit": "", "pr": ""}
-            await self.write_file(
-                sandbox_id, settings_path, json.dumps(settings, indent=2)
-            )
+            updates[settings_path] = json.dumps(settings, indent=2)
+
+        await self.provider.write_files(sandbox_id, updates)
 
     async def _setup_openai_auth(self, sandbox_id: str, openai_auth_json: str) -> None:
-        openai_dir = f"{SANDBOX_HOME_DIR}/.codex"
-        await self.execute_command(sandbox_id, f"mkdir -p {openai_dir}")
-        await self.write_file(sandbox_id, f"{openai_dir}/auth.json", openai_auth_json)
-        await self.execute_command(sandbox_id, f"sudo chown -R user:user {openai_dir}")
+        await self.provider.write_files(
+            sandbox_id,
+            {f"{SANDBOX_HOME_DIR}/.codex/auth.json": openai_auth_json},
+            owner="user:user",
+        )
 
     async def _setup_gmail_mcp(
         self,
@@ -756,12 +779,6 @@ class SandboxService:
         gmail_oauth_tokens: dict[str, Any],
     ) -> None:
         gmail_dir = f"{SANDBOX_HOME_DIR}/.gmail-mcp"
-        await self.execute_command(sandbox_id, f"mkdir -p {gmail_dir}")
-
-        oauth_client_content = json.dumps(gmail_oauth_client, indent=2)
-        await self.write_file(
-            sandbox_id, f"{gmail_dir}/gcp-oauth.keys.json", oauth_client_content
-        )
 
         # Build credentials.json in the format Google's OAuth library expects
         client_data = gmail_oauth_client.get("installed") or gmail_oauth_client.get(
@@ -777,14 +794,18 @@ class SandboxService:
         }
         if gmail_oauth_tokens.get("expiry"):
             credentials["expiry"] = gmail_oauth_tokens["expiry"]
-        credentials_content = json.dumps(credentials, indent=2)
-        await self.write_file(
-            sandbox_id, f"{gmail_dir}/credentials.json", credentials_content
+        await self.provider.write_files(
+            sandbox_id,
+            {
+                f"{gmail_dir}/gcp-oauth.keys.json": json.dumps(
+                    gmail_oauth_client, indent=2
+                ),
+                f"{gmail_dir}/credentials.json": json.dumps(credentials, indent=2),
+            },
+            mode=0o600,
+            owner="user:user",
         )
 
-        await self.execute_command(sandbox_id, f"sudo chown -R user:user {gmail_dir}")
-        await self.execute_command(sandbox_id, f"chmod 600 {gmail_dir}/*.json")
-
     async def initialize_sandbox(
         self,
         sandbox_id: str,
@@ -5,6 +5,7 @@ from app.services.sandbox_providers.factory import (
     create_docker_config,
     create_sandbox_provider,
 )
+from app.services.sandbox_providers.registry import SandboxProviderRegistry
 from app.services.sandbox_providers.types import (
     CheckpointInfo,
     CommandResult,
@@ -25,6 +26,7 @@ __all__ = [
     "LocalHostProvider",
     "create_docker_config",
     "create_sandbox_provider",
+    "SandboxProviderRegistry",
     "SandboxProviderType",
     "CommandResult",
     "FileMetadata",
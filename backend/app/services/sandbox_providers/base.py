@@ -1,11 +1,16 @@
 import asyncio
 import base64
+import io
 import logging
+import re
 import shlex
+import tarfile
+import time
+import uuid
 from abc import ABC, abstractmethod
 from datetime import datetime
 from pathlib import Path, PurePosixPath
-from typing import Any, Awaitable, Callable, TypeVar
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
 
 import posixpath
 
@@ -19,6 +24,7 @@ from app.constants import (
     SANDBOX_RESTORE_EXCLUDE_PATTERNS,
     SANDBOX_SYSTEM_VARIABLES,
 )
+from app.services.exceptions import SandboxException
 from app.services.sandbox_providers.types import (
     CheckpointInfo,
     CommandResult,
@@ -36,6 +42,26 @@ logger = logging.getLogger(__name__)
 T = TypeVar("T")
 
 LISTENING_PORTS_COMMAND = "ss -tuln | grep LISTEN | awk '{print $5}' | sed 's/.*://g' | grep -E '^[0-9]+$' | sort -u"
+FIND_METADATA_FORMAT = "%p\t%y\t%s\t%T@\n"
+# Bytes of path arguments per batched exec, well below the kernel's 128 KiB
+# limit on a single argument (the whole `bash -c` script).
+MAX_BATCH_ARGS_BYTES = 64 * 1024
+# Reduces find's "<mtime> <size>" lines to "<newest mtime>:<entry count>:
+# <size sum>:<mtime seconds sum>:<mtime fraction sum>". Whole seconds and
+# fractions are summed apart so the mtime sum stays exact.
+TREE_TOKEN_AWK = (
+    'awk \'{ if ($1 > newest) newest = $1; split($1, t, "."); '
+    'seconds += t[1]; fraction += "0." t[2]; size += $2; count++ } '
+    'END { printf "%s:%d:%.0f:%.0f:%.6f", newest, count, size, seconds, '
+    "fraction }'"
+)
+TREE_TOKEN_PATTERN = re.compile(r"\d+(\.\d+)?:\d+:\d+:\d+:\d+\.\d+")
+ZIP_EXPORT_CHUNK_SIZE = 4 * 1024 * 1024
+ZIP_EXPORT_TIMEOUT = 1800
+# zip exits with 12 ("nothing to do") when find matched no files, which is an
+# empty export rather than a failure.
+ZIP_EXPORT_OK_EXIT_CODES = (0, 12)
+ZIP_EXPORT_ERROR_BYTES = 4096
 
 
 class SandboxProvider(ABC):
@@ -202,7 +228,59 @@ class SandboxProvider(ABC):
         sandbox_id: str,
         path: str = SANDBOX_HOME_DIR,
         excluded_patterns: list[str] | None = None,
+        max_depth: int | None = None,
     ) -> list[FileMetadata]:
+        exclude_args = self._find_exclude_args(excluded_patterns)
+        depth_args = f"-maxdepth {max_depth} " if max_depth is not None else ""
+        find_command = (
+            f"find {shlex.quote(path)} {depth_args}{exclude_args} "
+            f"-printf '{FIND_METADATA_FORMAT}'"
+        )
+
+        result = await self.execute_command(sandbox_id, find_command, timeout=30)
+
+        metadata_items = []
+        for line in result.stdout.strip().split("\n"):
+            metadata = self._parse_find_metadata(line)
+            if metadata is None or metadata.path == SANDBOX_HOME_DIR:
+                continue
+
+            home_dir_slash = f"{SANDBOX_HOME_DIR}/"
+            if metadata.path.startswith(home_dir_slash):
+                metadata.path = metadata.path[len(home_dir_slash) :]
+            elif metadata.path.startswith(SANDBOX_HOME_DIR):
+                metadata.path = metadata.path[len(SANDBOX_HOME_DIR) :]
+            metadata_items.append(metadata)
+
+        return metadata_items
+
+    async def get_tree_token(
+        self,
+        sandbox_id: str,
+        path: str = SANDBOX_HOME_DIR,
+        excluded_patterns: list[str] | None = None,
+        max_depth: int | None = None,
+    ) -> str | None:
+        # A cheap fingerprint of what list_files would return: the newest
+        # mtime, the number of entries and the sums of their sizes and mtimes,
+        # printed by one find without sending the listing itself. Adding,
+        # removing or renaming an entry changes the mtime of its directory, and
+        # an edit that keeps or rewinds a file's mtime (cp -p, touch -d, tar
+        # extraction) still changes its size or the mtime sum.
+        exclude_args = self._find_exclude_args(excluded_patterns)
+        depth_args = f"-maxdepth {max_depth} " if max_depth is not None else ""
+        result = await self.execute_command(
+            sandbox_id,
+            f"find {shlex.quote(path)} {depth_args}{exclude_args} "
+            "\\( -type f -o -type d \\) -printf '%T@ %s\\n' 2>/dev/null "
+            f"| {TREE_TOKEN_AWK}",
+            timeout=30,
+        )
+        token = result.stdout.strip()
+        return token if TREE_TOKEN_PATTERN.fullmatch(token) else None
+
+    @staticmethod
+    def _find_exclude_args(excluded_patterns: list[str] | None = None) -> str:
         patterns = excluded_patterns or SANDBOX_EXCLUDED_PATHS
 
         exclude_conditions = []
@@ -211,61 +289,234 @@ class SandboxProvider(ABC):
                 exclude_conditions.append(f"-not -name '{pattern}'")
             else:
                 exclude_conditions.append(f"-not -path '{pattern}'")
+        return " ".join(exclude_conditions)
 
-        exclude_args = " ".join(exclude_conditions)
-        find_command = f"find {path} {exclude_args} -printf '%p\t%y\t%s\t%T@\n'"
+    @staticmethod
+    def _parse_find_metadata(line: str) -> FileMetadata | None:
+        # One line of `find -printf FIND_METADATA_FORMAT`; only regular files
+        # and directories are reported.
+        parts = line.split("\t")
+        if len(parts) < 4 or not parts[0]:
+            return None
 
-        result = await self.execute_command(sandbox_id, find_command, timeout=30)
+        file_path, file_type, size, mtime = parts[0], parts[1], parts[2], parts[3]
+        modified = float(mtime) if mtime.replace(".", "").isdigit() else 0
+        if file_type == "f":
+            return FileMetadata(
+                path=file_path,
+                type="file",
+                is_binary=SandboxProvider._is_binary_file(file_path),
+                size=int(size) if size.isdigit() else 0,
+                modified=modified,
+            )
+        if file_type == "d":
+            return FileMetadata(
+                path=file_path, type="directory", size=0, modified=modified
+            )
+        return None
 
-        metadata_items = []
-        for line in result.stdout.strip().split("\n"):
-            if not line:
-                continue
+    @staticmethod
+    def _batch_paths(paths: list[str]) -> list[list[str]]:
+        # Splits quoted path arguments across as few execs as the argument
+        # limit allows.
+        batches: list[list[str]] = []
+        current: list[str] = []
+        current_bytes = 0
+        for path in paths:
+            size = len(shlex.quote(path)) + 1
+            if current and current_bytes + size > MAX_BATCH_ARGS_BYTES:
+                batches.append(current)
+                current, current_bytes = [], 0
+            current.append(path)
+            current_bytes += size
+        if current:
+            batches.append(current)
+        return batches
 
-            parts = line.split("\t")
-            if len(parts) < 4:
-                continue
+    @staticmethod
+    def _build_tar(files: dict[str, bytes], mode: int | None = None) -> bytes:
+        # Members are named relative to /, ready to be extracted there.
+        buffer = io.BytesIO()
+        now = time.time()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for path, content in files.items():
+                info = tarfile.TarInfo(name=path.lstrip("/"))
+                info.size = len(content)
+                info.mtime = int(now)
+                info.mode = mode if mode is not None else 0o644
+                tar.addfile(info, io.BytesIO(content))
+        return buffer.getvalue()
+
+    def _read_tar(
+        self, archive: bytes, requested: dict[str, str]
+    ) -> dict[str, FileContent]:
+        # requested maps each normalized path to the path the caller used.
+        files: dict[str, FileContent] = {}
+        if not archive:
+            return files
+        with tarfile.open(fileobj=io.BytesIO(archive), mode="r") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                path = requested.get(posixpath.normpath(f"/{member.name}"))
+                extracted = tar.extractfile(member) if path is not None else None
+                if path is None or extracted is None:
+                    continue
+                content, is_binary = self._encode_file_content(path, extracted.read())
+                files[path] = FileContent(
+                    path=path, content=content, type="file", is_binary=is_binary
+                )
+        return files
 
-            file_path, file_type, size, mtime = parts[0], parts[1], parts[2], parts[3]
+    async def read_files(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+    ) -> dict[str, FileContent]:
+        # Reads many files with one tar exec per batch instead of one round
+        # trip per file. Paths that are missing or not regular files are left
+        # out of the result.
+        requested = {self.normalize_path(path): path for path in paths}
+        files: dict[str, FileContent] = {}
+        for batch in self._batch_paths(list(requested)):
+            members = " ".join(shlex.quote(path.lstrip("/")) for path in batch)
+            result = await self.execute_command(
+                sandbox_id,
+                f"tar -chf - --ignore-failed-read -C / -- {members} 2>/dev/null"
+                " | base64 -w0",
+            )
+            archive = base64.b64decode(result.stdout.strip())
+            files.update(self._read_tar(archive, requested))
+        return files
 
-            if not file_path or file_path == SANDBOX_HOME_DIR or file_path == "":
-                continue
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+        mode: int | None = None,
+        owner: str | None = None,
+    ) -> None:
+        # Writes many files, creating parent directories, by uploading one tar
+        # and extracting it with one exec. mode and owner ("user:group") apply
+        # to every written file.
+        if not files:
+            return
+        payload = {
+            self.normalize_path(path): (
+                content.encode("utf-8") if isinstance(content, str) else content
+            )
+            for path, content in files.items()
+        }
+        archive_path = f"{SANDBOX_HOME_DIR}/.write_files_{uuid.uuid4().hex[:8]}.b64"
+        await self.write_file(
+            sandbox_id,
+            archive_path,
+            base64.b64encode(self._build_tar(payload, mode)).decode("ascii"),
+        )
 
-            home_dir_slash = f"{SANDBOX_HOME_DIR}/"
-            if file_path.startswith(home_dir_slash):
-                file_path = file_path[len(home_dir_slash) :]
-            elif file_path.startswith(SANDBOX_HOME_DIR):
-                file_path = file_path[len(SANDBOX_HOME_DIR) :]
-
-            if file_type == "f":
-                is_binary = (
-                    Path(file_path).suffix.lstrip(".").lower()
-                    in SANDBOX_BINARY_EXTENSIONS
-                )
-                metadata_items.append(
-                    FileMetadata(
-                        path=file_path,
-                        type="file",
-                        is_binary=is_binary,
-                        size=int(size) if size.isdigit() else 0,
-                        modified=float(mtime)
-                        if mtime.replace(".", "").isdigit()
-                        else 0,
-                    )
+        quoted_archive = shlex.quote(archive_path)
+        commands = [
+            f"trap 'rm -f {quoted_archive}' EXIT",
+            f"base64 -d {quoted_archive} | tar -xf - -C /",
+        ]
+        targets = " ".join(shlex.quote(path) for path in payload)
+        if mode is not None:
+            commands.append(f"chmod {mode:o} -- {targets}")
+        if owner:
+            commands.append(f"sudo chown {shlex.quote(owner)} -- {targets}")
+        result = await self.execute_command(sandbox_id, " && ".join(commands))
+        if result.exit_code != 0:
+            raise SandboxException(
+                f"Failed to write files: {(result.stderr or result.stdout).strip()}"
+            )
+
+    async def stat_many(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+    ) -> dict[str, FileMetadata]:
+        # Metadata for many paths with one find exec per batch, keyed by the
+        # requested path. Missing paths are left out of the result.
+        requested = {self.normalize_path(path): path for path in paths}
+        stats: dict[str, FileMetadata] = {}
+        for batch in self._batch_paths(list(requested)):
+            targets = " ".join(shlex.quote(path) for path in batch)
+            result = await self.execute_command(
+                sandbox_id,
+                f"find {targets} -maxdepth 0 -printf '{FIND_METADATA_FORMAT}'"
+                " 2>/dev/null",
+            )
+            for line in result.stdout.splitlines():
+                metadata = self._parse_find_metadata(line)
+                if metadata is None:
+                    continue
+                path = requested.get(posixpath.normpath(metadata.path))
+                if path is not None:
+                    metadata.path = path
+                    stats[path] = metadata
+        return stats
+
+    def _zip_export_command(self, excluded_patterns: list[str] | None = None) -> str:
+        # Zips the workspace to stdout, skipping what list_files skips. Member
+        # names are relative to SANDBOX_HOME_DIR. pipefail makes a failed find
+        # fail the export instead of leaving a partial archive.
+        exclude_args = self._find_exclude_args(excluded_patterns)
+        return (
+            f"set -o pipefail; cd {SANDBOX_HOME_DIR} && "
+            f"find . {exclude_args} -type f -print | zip -q -@ -"
+        )
+
+    @staticmethod
+    def _check_zip_export(exit_code: int, errors: str) -> None:
+        if exit_code in ZIP_EXPORT_OK_EXIT_CODES:
+            return
+        detail = errors.strip() or f"exit code {exit_code}"
+        raise SandboxException(f"Failed to export the workspace: {detail}")
+
+    async def stream_zip(
+        self,
+        sandbox_id: str,
+        excluded_patterns: list[str] | None = None,
+    ) -> AsyncIterator[bytes]:
+        # Yields a ZIP of the workspace, which is empty (no bytes) when there
+        # is nothing to archive. Without a streaming exec the archive is built
+        # on the sandbox's disk and fetched in ZIP_EXPORT_CHUNK_SIZE pieces, so
+        # only one chunk is held in memory at a time. The command itself always
+        # succeeds and reports zip's stderr, then its exit code and the archive
+        # size on the last line, since some providers raise on a failed command.
+        archive_path = f"/tmp/export_{uuid.uuid4().hex[:8]}.zip"
+        quoted_archive = shlex.quote(archive_path)
+        quoted_errors = shlex.quote(f"{archive_path}.err")
+        try:
+            result = await self.execute_command(
+                sandbox_id,
+                f"({self._zip_export_command(excluded_patterns)}) > {quoted_archive}"
+                f" 2> {quoted_errors}; status=$?;"
+                f" tail -c {ZIP_EXPORT_ERROR_BYTES} {quoted_errors}; echo;"
+                f' echo "$status $(stat -c %s {quoted_archive})"',
+                timeout=ZIP_EXPORT_TIMEOUT,
+            )
+            lines = result.stdout.strip().splitlines()
+            status = lines[-1].split() if lines else []
+            if len(status) != 2 or not all(part.isdigit() for part in status):
+                detail = (result.stdout or result.stderr).strip()
+                raise SandboxException(f"Failed to export the workspace: {detail}")
+            self._check_zip_export(int(status[0]), "\n".join(lines[:-1]))
+            size = int(status[1])
+            for offset in range(0, size, ZIP_EXPORT_CHUNK_SIZE):
+                chunk = await self.execute_command(
+                    sandbox_id,
+                    f"tail -c +{offset + 1} {quoted_archive}"
+                    f" | head -c {ZIP_EXPORT_CHUNK_SIZE} | base64 -w0",
                 )
-            elif file_type == "d":
-                metadata_items.append(
-                    FileMetadata(
-                        path=file_path,
-                        type="directory",
-                        size=0,
-                        modified=float(mtime)
-                        if mtime.replace(".", "").isdigit()
-                        else 0,
-                    )
+                yield base64.b64decode(chunk.stdout.strip())
+        finally:
+            try:
+                await self.execute_command(
+                    sandbox_id, f"rm -f {quoted_archive} {quoted_errors}"
                 )
-
-        return metadata_items
+            except Exception:
+                pass
 
     @abstractmethod
     async def create_pty(
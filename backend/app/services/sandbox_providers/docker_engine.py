@@ -0,0 +1,420 @@
+import asyncio
+import json
+import os
+import ssl
+import struct
+from collections.abc import AsyncIterator, Collection
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import quote, urlparse
+
+import httpx
+
+DEFAULT_DOCKER_SOCKET = "/var/run/docker.sock"
+# Header of each frame of a non-TTY exec stream: stream id, 3 padding bytes and
+# the big-endian payload size.
+STREAM_HEADER = struct.Struct(">BxxxI")
+STREAM_STDOUT = 1
+STREAM_STDERR = 2
+EXEC_STREAM_STDERR_BYTES = 4096
+
+
+class DockerEngineError(Exception):
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+@dataclass
+class DockerExecStream:
+    # Both directions of an exec whose connection was upgraded to a raw stream.
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    async def read(self, size: int) -> bytes:
+        return await self.reader.read(size)
+
+    async def write(self, data: bytes) -> None:
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+@dataclass(frozen=True)
+class _Endpoint:
+    base_url: str
+    socket_path: str | None = None
+    host: str | None = None
+    port: int | None = None
+    ssl_context: ssl.SSLContext | None = None
+
+
+def _resolve_endpoint(host: str | None) -> _Endpoint:
+    # Same sources as docker.from_env: an explicit host, else DOCKER_HOST with
+    # DOCKER_TLS_VERIFY/DOCKER_CERT_PATH, else the local socket.
+    url = host or os.environ.get("DOCKER_HOST") or f"unix://{DEFAULT_DOCKER_SOCKET}"
+    parsed = urlparse(url)
+    if parsed.scheme in ("unix", "http+unix"):
+        return _Endpoint(base_url="http://docker", socket_path=parsed.path)
+    if parsed.scheme not in ("tcp", "http", "https"):
+        raise DockerEngineError(0, f"Unsupported Docker host: {url}")
+
+    ssl_context: ssl.SSLContext | None = None
+    if parsed.scheme == "https" or os.environ.get("DOCKER_TLS_VERIFY"):
+        cert_path = os.environ.get("DOCKER_CERT_PATH") or os.path.expanduser(
+            "~/.docker"
+        )
+        ssl_context = ssl.create_default_context(
+            cafile=os.path.join(cert_path, "ca.pem")
+        )
+        ssl_context.load_cert_chain(
+            os.path.join(cert_path, "cert.pem"), os.path.join(cert_path, "key.pem")
+        )
+    scheme = "https" if ssl_context else "http"
+    port = parsed.port or (2376 if ssl_context else 2375)
+    return _Endpoint(
+        base_url=f"{scheme}://{parsed.hostname}:{port}",
+        host=parsed.hostname,
+        port=port,
+        ssl_context=ssl_context,
+    )
+
+
+def _filters(filters: dict[str, Any]) -> str:
+    return json.dumps(
+        {
+            key: value if isinstance(value, list) else [str(value)]
+            for key, value in filters.items()
+        }
+    )
+
+
+def _split_image(image: str) -> tuple[str, str]:
+    repository, _, tag = image.rpartition(":")
+    if not repository or "/" in tag:
+        return image, "latest"
+    return repository, tag
+
+
+class DockerEngineClient:
+    # asyncio client for the subset of the Docker Engine API the sandbox
+    # provider uses. Requests share one keep-alive connection pool; execs that
+    # need stdin get their own connection, upgraded to a raw stream.
+
+    def __init__(
+        self,
+        host: str | None = None,
+        *,
+        max_connections: int = 64,
+        timeout: float = 60.0,
+    ) -> None:
+        self._endpoint = _resolve_endpoint(host)
+        limits = httpx.Limits(
+            max_connections=max(max_connections, 1),
+            max_keepalive_connections=max(max_connections, 1),
+        )
+        transport = httpx.AsyncHTTPTransport(
+            uds=self._endpoint.socket_path,
+            verify=self._endpoint.ssl_context or True,
+            limits=limits,
+        )
+        # Waiting for a free connection is bounded by the caller, not httpx.
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            base_url=self._endpoint.base_url,
+            timeout=httpx.Timeout(timeout, pool=None),
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json_body: Any = None,
+        content: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float | None | httpx.Timeout = httpx.USE_CLIENT_DEFAULT,  # type: ignore[assignment]
+    ) -> httpx.Response:
+        response = await self._client.request(
+            method,
+            path,
+            params=params,
+            json=json_body,
+            content=content,
+            headers=headers,
+            timeout=timeout,
+        )
+        if response.status_code >= 400:
+            raise self._error(response.status_code, response.content)
+        return response
+
+    @staticmethod
+    def _error(status_code: int, body: bytes) -> DockerEngineError:
+        try:
+            message = str(json.loads(body).get("message") or "")
+        except (ValueError, AttributeError):
+            message = body.decode("utf-8", errors="replace")
+        return DockerEngineError(
+            status_code, message or f"Docker API error {status_code}"
+        )
+
+    async def inspect_container(self, container: str) -> dict[str, Any]:
+        response = await self._request("GET", f"/containers/{quote(container)}/json")
+        return dict(response.json())
+
+    async def list_containers(
+        self, *, all: bool = False, filters: dict[str, Any] | None = None
+    ) -> list[dict[str, Any]]:
+        params: dict[str, Any] = {"all": "1" if all else "0"}
+        if filters:
+            params["filters"] = _filters(filters)
+        response = await self._request("GET", "/containers/json", params=params)
+        return list(response.json())
+
+    async def create_container(self, name: str, config: dict[str, Any]) -> str:
+        params = {"name": name}
+        try:
+            response = await self._request(
+                "POST", "/containers/create", params=params, json_body=config
+            )
+        except DockerEngineError as exc:
+            if exc.status_code != 404 or "image" not in exc.message.lower():
+                raise
+            await self.pull_image(config["Image"])
+            response = await self._request(
+                "POST", "/containers/create", params=params, json_body=config
+            )
+        return str(response.json()["Id"])
+
+    async def pull_image(self, image: str) -> None:
+        repository, tag = _split_image(image)
+        async with self._client.stream(
+            "POST",
+            "/images/create",
+            params={"fromImage": repository, "tag": tag},
+            timeout=None,
+        ) as response:
+            if response.status_code >= 400:
+                raise self._error(response.status_code, await response.aread())
+            # Progress is streamed as JSON lines; errors arrive the same way.
+            async for line in response.aiter_lines():
+                if line.strip() and '"error"' in line:
+                    raise DockerEngineError(
+                        500, str(json.loads(line).get("error") or line)
+                    )
+
+    async def start_container(self, container: str) -> None:
+        await self._request("POST", f"/containers/{quote(container)}/start")
+
+    async def stop_container(self, container: str, *, timeout: int = 10) -> None:
+        await self._request(
+            "POST",
+            f"/containers/{quote(container)}/stop",
+            params={"t": timeout},
+            timeout=timeout + 30,
+        )
+
+    async def remove_container(self, container: str, *, force: bool = False) -> None:
+        await self._request(
+            "DELETE",
+            f"/containers/{quote(container)}",
+            params={"force": "1" if force else "0"},
+        )
+
+    async def commit_container(self, container: str) -> str:
+        response = await self._request(
+            "POST", "/commit", params={"container": container}, timeout=None
+        )
+        return str(response.json()["Id"])
+
+    async def remove_image(self, image: str, *, force: bool = False) -> None:
+        await self._request(
+            "DELETE",
+            f"/images/{quote(image)}",
+            params={"force": "1" if force else "0"},
+        )
+
+    async def prune_images(self, filters: dict[str, Any] | None = None) -> None:
+        params = {"filters": _filters(filters)} if filters else None
+        await self._request("POST", "/images/prune", params=params, timeout=None)
+
+    async def prune_volumes(self) -> None:
+        await self._request("POST", "/volumes/prune", timeout=None)
+
+    async def get_archive(self, container: str, path: str) -> bytes:
+        response = await self._request(
+            "GET",
+            f"/containers/{quote(container)}/archive",
+            params={"path": path},
+            timeout=None,
+        )
+        return response.content
+
+    async def put_archive(self, container: str, path: str, data: bytes) -> None:
+        await self._request(
+            "PUT",
+            f"/containers/{quote(container)}/archive",
+            params={"path": path},
+            content=data,
+            headers={"Content-Type": "application/x-tar"},
+            timeout=None,
+        )
+
+    async def exec_create(
+        self,
+        container: str,
+        cmd: list[str],
+        *,
+        env: list[str] | None = None,
+        workdir: str | None = None,
+        user: str | None = None,
+        tty: bool = False,
+        stdin: bool = False,
+    ) -> str:
+        config: dict[str, Any] = {
+            "Cmd": cmd,
+            "AttachStdin": stdin,
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "Tty": tty,
+        }
+        if env:
+            config["Env"] = env
+        if workdir:
+            config["WorkingDir"] = workdir
+        if user:
+            config["User"] = user
+        response = await self._request(
+            "POST", f"/containers/{quote(container)}/exec", json_body=config
+        )
+        return str(response.json()["Id"])
+
+    async def exec_inspect(self, exec_id: str) -> dict[str, Any]:
+        response = await self._request("GET", f"/exec/{exec_id}/json")
+        return dict(response.json())
+
+    async def exec_resize(self, exec_id: str, *, height: int, width: int) -> None:
+        await self._request(
+            "POST", f"/exec/{exec_id}/resize", params={"h": height, "w": width}
+        )
+
+    async def exec_run(
+        self,
+        container: str,
+        cmd: list[str],
+        *,
+        env: list[str] | None = None,
+        workdir: str | None = None,
+        user: str | None = None,
+        detach: bool = False,
+    ) -> tuple[int | None, bytes, bytes]:
+        # Runs a command without stdin and returns its exit code, stdout and
+        # stderr. Detached execs return right away with no exit code.
+        exec_id = await self.exec_create(
+            container, cmd, env=env, workdir=workdir, user=user
+        )
+        if detach:
+            await self._request(
+                "POST", f"/exec/{exec_id}/start", json_body={"Detach": True}
+            )
+            return None, b"", b""
+
+        stdout = bytearray()
+        stderr = bytearray()
+        async for stream_id, payload in self._exec_output(exec_id):
+            (stderr if stream_id == STREAM_STDERR else stdout).extend(payload)
+        info = await self.exec_inspect(exec_id)
+        return info.get("ExitCode"), bytes(stdout), bytes(stderr)
+
+    async def exec_stream(
+        self,
+        container: str,
+        cmd: list[str],
+        *,
+        workdir: str | None = None,
+        user: str | None = None,
+        ok_exit_codes: Collection[int] = (0,),
+    ) -> AsyncIterator[bytes]:
+        # Yields a command's stdout as the daemon sends it, then raises with the
+        # tail of its stderr if it exited with a code outside ok_exit_codes.
+        # Closing the iterator early closes the exec's connection.
+        exec_id = await self.exec_create(container, cmd, workdir=workdir, user=user)
+        stderr = bytearray()
+        async for stream_id, payload in self._exec_output(exec_id):
+            if stream_id == STREAM_STDOUT:
+                yield payload
+            elif stream_id == STREAM_STDERR:
+                stderr.extend(payload)
+                del stderr[:-EXEC_STREAM_STDERR_BYTES]
+        exit_code = (await self.exec_inspect(exec_id)).get("ExitCode")
+        if exit_code is not None and exit_code not in ok_exit_codes:
+            message = stderr.decode("utf-8", errors="replace").strip()
+            raise DockerEngineError(
+                0, message or f"Command exited with code {exit_code}"
+            )
+
+    async def _exec_output(self, exec_id: str) -> AsyncIterator[tuple[int, bytes]]:
+        # Without an Upgrade header the daemon answers with the multiplexed
+        # output as a body that ends when the command exits.
+        async with self._client.stream(
+            "POST",
+            f"/exec/{exec_id}/start",
+            json={"Detach": False, "Tty": False},
+            timeout=httpx.Timeout(None),
+        ) as response:
+            if response.status_code >= 400:
+                raise self._error(response.status_code, await response.aread())
+            buffer = bytearray()
+            async for chunk in response.aiter_raw():
+                buffer.extend(chunk)
+                offset = 0
+                while len(buffer) - offset >= STREAM_HEADER.size:
+                    stream_id, size = STREAM_HEADER.unpack_from(buffer, offset)
+                    end = offset + STREAM_HEADER.size + size
+                    if len(buffer) < end:
+                        break
+                    yield stream_id, bytes(buffer[offset + STREAM_HEADER.size : end])
+                    offset = end
+                del buffer[:offset]
+
+    async def exec_attach(self, exec_id: str, *, tty: bool = True) -> DockerExecStream:
+        # Starts an exec on a dedicated connection and upgrades it, so stdin
+        # and output flow as raw bytes for the life of the exec.
+        endpoint = self._endpoint
+        if endpoint.socket_path:
+            reader, writer = await asyncio.open_unix_connection(endpoint.socket_path)
+        else:
+            reader, writer = await asyncio.open_connection(
+                endpoint.host, endpoint.port, ssl=endpoint.ssl_context
+            )
+        body = json.dumps({"Detach": False, "Tty": tty}).encode()
+        host = urlparse(endpoint.base_url).netloc
+        request = (
+            f"POST /exec/{exec_id}/start HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Content-Type: application/json\r\n"
+            "Connection: Upgrade\r\n"
+            "Upgrade: tcp\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode() + body
+        try:
+            writer.write(request)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+        except BaseException:
+            writer.close()
+            raise
+        status_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+        parts = status_line.split(" ", 2)
+        status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+        if status not in (101, 200):
+            writer.close()
+            raise DockerEngineError(status, f"Exec attach failed: {status_line}")
+        return DockerExecStream(reader=reader, writer=writer)
@@ -1,10 +1,9 @@
 import asyncio
 import io
 import logging
-import shlex
 import tarfile
 import uuid
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any
 from urllib.parse import urlparse
@@ -20,7 +19,16 @@ from app.constants import (
     VNC_WEBSOCKET_PORT,
 )
 from app.services.exceptions import SandboxException
-from app.services.sandbox_providers.base import LISTENING_PORTS_COMMAND, SandboxProvider
+from app.services.sandbox_providers.base import (
+    LISTENING_PORTS_COMMAND,
+    ZIP_EXPORT_OK_EXIT_CODES,
+    SandboxProvider,
+)
+from app.services.sandbox_providers.docker_engine import (
+    DockerEngineClient,
+    DockerEngineError,
+    DockerExecStream,
+)
 from app.services.sandbox_providers.types import (
     CommandResult,
     DockerConfig,
@@ -36,37 +44,56 @@ logger = logging.getLogger(__name__)
 DOCKER_SANDBOX_CONTAINER_PREFIX = "claudex-sandbox-"
 
 
+def _is_missing_container(exc: Exception) -> bool:
+    return getattr(exc, "status_code", None) == 404
+
+
+def _extract_port_mappings(attrs: dict[str, Any]) -> dict[int, int]:
+    ports = (attrs.get("NetworkSettings") or {}).get("Ports") or {}
+    port_map: dict[int, int] = {}
+    for container_port, host_bindings in ports.items():
+        if host_bindings and isinstance(host_bindings, list):
+            host_port = host_bindings[0].get("HostPort")
+            if host_port:
+                internal_port = int(container_port.split("/")[0])
+                port_map[internal_port] = int(host_port)
+    return port_map
+
+
+def _is_container_running(attrs: dict[str, Any]) -> bool:
+    return bool((attrs.get("State") or {}).get("Status") == DOCKER_STATUS_RUNNING)
+
+
 class LocalDockerProvider(SandboxProvider):
+    # Usually one instance per worker (see SandboxProviderRegistry), so the
+    # Docker Engine API client's connection pool and the container and port
+    # caches are shared by all callers. Cache entries are dropped when their
+    # container turns out to be gone, e.g. after another worker deleted it.
+
     def __init__(self, config: DockerConfig) -> None:
         self.config = config
-        self._executor = ThreadPoolExecutor(max_workers=10)
-        self._containers: dict[str, Any] = {}
+        # sandbox_id -> container id
+        self._containers: dict[str, str] = {}
         self._pty_sessions: dict[str, dict[str, Any]] = {}
         self._port_mappings: dict[str, dict[int, int]] = {}
-        self._docker_client: Any = None
+        self._docker_client: DockerEngineClient | None = None
 
-    def _get_docker_client(self) -> Any:
+    def _get_docker_client(self) -> DockerEngineClient:
         if self._docker_client is None:
             try:
-                import docker
-
-                if self.config.host:
-                    self._docker_client = docker.DockerClient(
-                        base_url=self.config.host,
-                        timeout=SANDBOX_DEFAULT_TIMEOUT,
-                    )
-                else:
-                    self._docker_client = docker.from_env(
-                        timeout=SANDBOX_DEFAULT_TIMEOUT
-                    )
-            except ImportError:
-                raise SandboxException(
-                    "Docker SDK not installed. Run: pip install docker"
+                self._docker_client = DockerEngineClient(
+                    self.config.host,
+                    max_connections=self.config.api_max_connections,
+                    timeout=SANDBOX_DEFAULT_TIMEOUT,
                 )
-            except Exception as e:
+            except (DockerEngineError, OSError) as e:
                 raise SandboxException(f"Failed to connect to Docker: {e}")
         return self._docker_client
 
+    def invalidate(self, sandbox_id: str) -> None:
+        self._containers.pop(sandbox_id, None)
+        self._port_mappings.pop(sandbox_id, None)
+
     def _build_traefik_labels(self, sandbox_id: str) -> dict[str, str]:
         """
         Generate Traefik labels so sandbox containers can be accessed on one host via path routing.
@@ -122,180 +149,156 @@ class LocalDockerProvider(SandboxProvider):
 
         return labels
 
-    def _create_container(self, sandbox_id: str) -> Any:
-        client = self._get_docker_client()
-        labels = self._build_traefik_labels(sandbox_id)
+    def _container_config(self, image: str, sandbox_id: str) -> dict[str, Any]:
         network = self.config.traefik_network or self.config.network
-
-        container = client.containers.run(
-            self.config.image,
-            command="/bin/bash",
-            name=f"{DOCKER_SANDBOX_CONTAINER_PREFIX}{sandbox_id}",
-            hostname="sandbox",
-            user="user",
-            working_dir=self.config.user_home,
-            stdin_open=True,
-            tty=True,
-            detach=True,
-            remove=False,
-            privileged=True,
-            security_opt=["no-new-privileges=false"],
-            network=network,
-            labels=labels,
-            ports={f"{port}/tcp": None for port in DOCKER_AVAILABLE_PORTS},
-            environment={
-                "TERM": TERMINAL_TYPE,
-                "HOME": self.config.user_home,
-                "USER": "user",
-                "OPENVSCODE_PORT": str(self.config.openvscode_port),
+        ports = [f"{port}/tcp" for port in DOCKER_AVAILABLE_PORTS]
+        return {
+            "Image": image,
+            "Cmd": ["/bin/bash"],
+            "Hostname": "sandbox",
+            "User": "user",
+            "WorkingDir": self.config.user_home,
+            "OpenStdin": True,
+            "Tty": True,
+            "Env": [
+                f"TERM={TERMINAL_TYPE}",
+                f"HOME={self.config.user_home}",
+                "USER=user",
+                f"OPENVSCODE_PORT={self.config.openvscode_port}",
+            ],
+            "Labels": self._build_traefik_labels(sandbox_id),
+            "ExposedPorts": {port: {} for port in ports},
+            "HostConfig": {
+                "Privileged": True,
+                "SecurityOpt": ["no-new-privileges=false"],
+                "NetworkMode": network,
+                # An empty HostPort lets Docker pick a free host port.
+                "PortBindings": {
+                    port: [{"HostIp": "", "HostPort": ""}] for port in ports
+                },
             },
+            "NetworkingConfig": {"EndpointsConfig": {network: {}}},
+        }
+
+    async def _run_container(self, sandbox_id: str, image: str) -> str:
+        client = self._get_docker_client()
+        container_id = await client.create_container(
+            f"{DOCKER_SANDBOX_CONTAINER_PREFIX}{sandbox_id}",
+            self._container_config(image, sandbox_id),
         )
-        return container
+        try:
+            await client.start_container(container_id)
+            attrs = await client.inspect_container(container_id)
+        except Exception:
+            try:
+                await client.remove_container(container_id, force=True)
+            except Exception:
+                pass
+            raise
+        self._containers[sandbox_id] = container_id
+        self._port_mappings[sandbox_id] = _extract_port_mappings(attrs)
+        return container_id
 
     async def create_sandbox(self) -> str:
-        loop = asyncio.get_running_loop()
         sandbox_id = str(uuid.uuid4())[:12]
 
         try:
-            container = await loop.run_in_executor(
-                self._executor, lambda: self._create_container(sandbox_id)
-            )
-            self._containers[sandbox_id] = container
-
-            port_map = await loop.run_in_executor(
-                self._executor, lambda: self._extract_port_mappings(container)
-            )
-            self._port_mappings[sandbox_id] = port_map
-
+            await self._run_container(sandbox_id, self.config.image)
             return sandbox_id
         except Exception as e:
             raise SandboxException(f"Failed to create Docker sandbox: {e}")
 
-    @staticmethod
-    def _extract_port_mappings(container: Any) -> dict[int, int]:
-        container.reload()
-        ports = container.attrs.get("NetworkSettings", {}).get("Ports", {})
-        port_map: dict[int, int] = {}
-        for container_port, host_bindings in ports.items():
-            if (
-                host_bindings
-                and isinstance(host_bindings, list)
-                and len(host_bindings) > 0
-            ):
-                host_port = host_bindings[0].get("HostPort")
-                if host_port:
-                    internal_port = int(container_port.split("/")[0])
-                    port_map[internal_port] = int(host_port)
-        return port_map
-
-    def _is_container_running(self, container: Any) -> bool:
-        container.reload()
-        return bool(container.status == DOCKER_STATUS_RUNNING)
-
     async def list_sandboxes(self) -> list[tuple[str, Any]]:
-        client = self._get_docker_client()
-        loop = asyncio.get_running_loop()
-
-        containers = await loop.run_in_executor(
-            self._executor,
-            lambda: client.containers.list(
-                all=True,
-                filters={"name": DOCKER_SANDBOX_CONTAINER_PREFIX},
-            ),
+        containers = await self._get_docker_client().list_containers(
+            all=True,
+            filters={"name": DOCKER_SANDBOX_CONTAINER_PREFIX},
         )
 
         sandboxes: list[tuple[str, Any]] = []
         for container in containers:
-            name = getattr(container, "name", "")
-            if name.startswith(DOCKER_SANDBOX_CONTAINER_PREFIX):
-                sandbox_id = name[len(DOCKER_SANDBOX_CONTAINER_PREFIX) :]
-                sandboxes.append((sandbox_id, container))
+            for name in container.get("Names") or []:
+                name = name.lstrip("/")
+                if name.startswith(DOCKER_SANDBOX_CONTAINER_PREFIX):
+                    sandbox_id = name[len(DOCKER_SANDBOX_CONTAINER_PREFIX) :]
+                    sandboxes.append((sandbox_id, container))
+                    break
         return sandboxes
 
-    def _get_container_by_id(self, sandbox_id: str) -> Any | None:
-        client = self._get_docker_client()
+    async def _inspect_by_name(self, sandbox_id: str) -> dict[str, Any] | None:
         try:
-            return client.containers.get(
+            return await self._get_docker_client().inspect_container(
                 f"{DOCKER_SANDBOX_CONTAINER_PREFIX}{sandbox_id}"
             )
         except Exception:
             return None
 
     async def connect_sandbox(self, sandbox_id: str) -> bool:
-        if sandbox_id in self._containers:
-            container = self._containers[sandbox_id]
-            loop = asyncio.get_running_loop()
-
-            is_running = await loop.run_in_executor(
-                self._executor, lambda: self._is_container_running(container)
-            )
-            if is_running:
+        container_id = self._containers.get(sandbox_id)
+        if container_id is not None:
+            try:
+                attrs = await self._get_docker_client().inspect_container(container_id)
+            except Exception as exc:
+                if not _is_missing_container(exc):
+                    raise
+                attrs = None
+            if attrs is not None and _is_container_running(attrs):
                 return True
-            del self._containers[sandbox_id]
+            self.invalidate(sandbox_id)
 
-        loop = asyncio.get_running_loop()
-
-        container = await loop.run_in_executor(
-            self._executor, lambda: self._get_container_by_id(sandbox_id)
-        )
-        if container:
-            self._containers[sandbox_id] = container
-            port_mappings = await loop.run_in_executor(
-                self._executor, lambda: self._extract_port_mappings(container)
-            )
-            self._port_mappings[sandbox_id] = port_mappings
+        attrs = await self._inspect_by_name(sandbox_id)
+        if attrs:
+            self._containers[sandbox_id] = str(attrs["Id"])
+            self._port_mappings[sandbox_id] = _extract_port_mappings(attrs)
             return True
 
         return False
 
     async def delete_sandbox(self, sandbox_id: str) -> None:
-        container = self._containers.get(sandbox_id)
+        container_id = self._containers.get(sandbox_id)
 
-        if not container:
+        if not container_id:
             try:
-                container = await self._find_container_by_name(sandbox_id)
+                container_id = await self._find_container_by_name(sandbox_id)
             except Exception:
                 return
 
-        await self._destroy_container(container)
+        await self._destroy_container(container_id)
         await self._cleanup_docker_resources()
-
-        if sandbox_id in self._containers:
-            del self._containers[sandbox_id]
-        if sandbox_id in self._port_mappings:
-            del self._port_mappings[sandbox_id]
+        self.invalidate(sandbox_id)
 
         logger.info("Successfully deleted Docker sandbox %s", sandbox_id)
 
     async def is_running(self, sandbox_id: str) -> bool:
-        container = self._containers.get(sandbox_id)
-        if not container:
+        container_id = self._containers.get(sandbox_id)
+        if not container_id:
             return False
 
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            self._executor, lambda: self._is_container_running(container)
-        )
+        try:
+            attrs = await self._get_docker_client().inspect_container(container_id)
+        except Exception as exc:
+            if not _is_missing_container(exc):
+                raise
+            self.invalidate(sandbox_id)
+            return False
+        return _is_container_running(attrs)
 
-    def _run_command(
+    async def _run_command(
         self,
-        container: Any,
+        container_id: str,
         command: str,
         env_list: list[str],
         background: bool,
     ) -> tuple[int, bytes]:
-        result = container.exec_run(
-            cmd=["bash", "-c", command],
-            environment=env_list,
+        exit_code, stdout, stderr = await self._get_docker_client().exec_run(
+            container_id,
+            ["bash", "-c", command],
+            env=env_list,
             workdir=self.config.user_home,
-            demux=True,
             detach=background,
         )
         if background:
             return 0, b"Background process started"
-        exit_code = result.exit_code
-        stdout, stderr = result.output or (b"", b"")
-        return exit_code, (stdout or b"") + (stderr or b"")
+        return exit_code if exit_code is not None else -1, stdout + stderr
 
     async def execute_command(
         self,
@@ -305,17 +308,13 @@ class LocalDockerProvider(SandboxProvider):
         envs: dict[str, str] | None = None,
         timeout: int | None = None,
     ) -> CommandResult:
-        container = await self._get_container(sandbox_id)
-        loop = asyncio.get_running_loop()
+        container_id = await self._get_container(sandbox_id)
         env_list = [f"{k}={v}" for k, v in (envs or {}).items()]
 
         effective_timeout = timeout or SANDBOX_DEFAULT_COMMAND_TIMEOUT
 
         exit_code, output = await self._execute_with_timeout(
-            loop.run_in_executor(
-                self._executor,
-                lambda: self._run_command(container, command, env_list, background),
-            ),
+            self._run_command(container_id, command, env_list, background),
             effective_timeout,
             f"Command execution timed out after {effective_timeout}s",
         )
@@ -323,54 +322,34 @@ class LocalDockerProvider(SandboxProvider):
         output_str = output.decode("utf-8", errors="replace")
         return CommandResult(stdout=output_str, stderr="", exit_code=exit_code)
 
-    def _write_container_file(
-        self,
-        container: Any,
-        normalized_path: str,
-        content_bytes: bytes,
-    ) -> None:
-        tar_stream = io.BytesIO()
-        with tarfile.open(fileobj=tar_stream, mode="w") as tar:
-            file_data = io.BytesIO(content_bytes)
-            info = tarfile.TarInfo(name=Path(normalized_path).name)
-            info.size = len(content_bytes)
-            tar.addfile(info, file_data)
-        tar_stream.seek(0)
-
-        parent_dir = str(Path(normalized_path).parent)
-        container.exec_run(f"mkdir -p {shlex.quote(parent_dir)}")
-        container.put_archive(parent_dir, tar_stream.read())
-
     async def write_file(
         self,
         sandbox_id: str,
         path: str,
         content: str | bytes,
     ) -> None:
-        container = await self._get_container(sandbox_id)
+        container_id = await self._get_container(sandbox_id)
         normalized_path = self.normalize_path(path)
-        loop = asyncio.get_running_loop()
 
         if isinstance(content, str):
             content_bytes = content.encode("utf-8")
         else:
             content_bytes = content
 
-        await loop.run_in_executor(
-            self._executor,
-            lambda: self._write_container_file(
-                container, normalized_path, content_bytes
-            ),
-        )
+        tar_stream = io.BytesIO()
+        with tarfile.open(fileobj=tar_stream, mode="w") as tar:
+            info = tarfile.TarInfo(name=Path(normalized_path).name)
+            info.size = len(content_bytes)
+            tar.addfile(info, io.BytesIO(content_bytes))
 
-    def _read_container_file(self, container: Any, normalized_path: str) -> bytes:
-        bits, _ = container.get_archive(normalized_path)
-        stream = io.BytesIO()
-        for chunk in bits:
-            stream.write(chunk)
-        stream.seek(0)
+        client = self._get_docker_client()
+        parent_dir = str(Path(normalized_path).parent)
+        await client.exec_run(container_id, ["mkdir", "-p", parent_dir])
+        await client.put_archive(container_id, parent_dir, tar_stream.getvalue())
 
-        with tarfile.open(fileobj=stream, mode="r") as tar:
+    @staticmethod
+    def _extract_archive_file(archive: bytes) -> bytes:
+        with tarfile.open(fileobj=io.BytesIO(archive), mode="r") as tar:
             members = tar.getmembers()
             if not members:
                 return b""
@@ -384,14 +363,13 @@ class LocalDockerProvider(SandboxProvider):
         sandbox_id: str,
         path: str,
     ) -> FileContent:
-        container = await self._get_container(sandbox_id)
+        container_id = await self._get_container(sandbox_id)
         normalized_path = self.normalize_path(path)
-        loop = asyncio.get_running_loop()
 
-        content_bytes = await loop.run_in_executor(
-            self._executor,
-            lambda: self._read_container_file(container, normalized_path),
+        archive = await self._get_docker_client().get_archive(
+            container_id, normalized_path
         )
+        content_bytes = self._extract_archive_file(archive)
 
         content, is_binary = self._encode_file_content(path, content_bytes)
 
@@ -402,29 +380,75 @@ class LocalDockerProvider(SandboxProvider):
             is_binary=is_binary,
         )
 
-    def _create_pty_exec(
-        self, container: Any, tmux_session: str
-    ) -> tuple[dict[str, Any], Any]:
-        cmd = [
-            "bash",
-            "-c",
-            f"command -v tmux >/dev/null && tmux new -A -s {tmux_session} \\; set -g status off || exec bash",
-        ]
-
-        exec_id = container.client.api.exec_create(
-            container.id,
-            cmd=cmd,
-            stdin=True,
-            tty=True,
-            environment={"TERM": TERMINAL_TYPE},
-            workdir=self.config.user_home,
-        )
-        socket = container.client.api.exec_start(
-            exec_id["Id"],
-            socket=True,
-            tty=True,
-        )
-        return exec_id, socket
+    async def read_files(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+    ) -> dict[str, FileContent]:
+        # The exec's stdout is the raw tar stream, so nothing is base64-encoded.
+        container_id = await self._get_container(sandbox_id)
+        client = self._get_docker_client()
+        requested = {self.normalize_path(path): path for path in paths}
+        files: dict[str, FileContent] = {}
+        for batch in self._batch_paths(list(requested)):
+            _, archive, _ = await client.exec_run(
+                container_id,
+                ["tar", "-chf", "-", "--ignore-failed-read", "-C", "/", "--"]
+                + [path.lstrip("/") for path in batch],
+            )
+            files.update(self._read_tar(archive, requested))
+        return files
+
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+        mode: int | None = None,
+        owner: str | None = None,
+    ) -> None:
+        # One archive upload; the daemon applies each member's mode itself.
+        if not files:
+            return
+        container_id = await self._get_container(sandbox_id)
+        client = self._get_docker_client()
+        payload = {
+            self.normalize_path(path): (
+                content.encode("utf-8") if isinstance(content, str) else content
+            )
+            for path, content in files.items()
+        }
+
+        # Created as the sandbox user; the daemon would create them as root.
+        parent_dirs = sorted({str(Path(path).parent) for path in payload})
+        await client.exec_run(container_id, ["mkdir", "-p", "--", *parent_dirs])
+        await client.put_archive(container_id, "/", self._build_tar(payload, mode))
+
+        if owner:
+            exit_code, stdout, stderr = await client.exec_run(
+                container_id, ["sudo", "chown", owner, "--", *payload]
+            )
+            if exit_code != 0:
+                raise SandboxException(
+                    f"Failed to write files: {(stderr or stdout).decode().strip()}"
+                )
+
+    async def stream_zip(
+        self,
+        sandbox_id: str,
+        excluded_patterns: list[str] | None = None,
+    ) -> AsyncIterator[bytes]:
+        container_id = await self._get_container(sandbox_id)
+        try:
+            async for chunk in self._get_docker_client().exec_stream(
+                container_id,
+                ["bash", "-c", self._zip_export_command(excluded_patterns)],
+                ok_exit_codes=ZIP_EXPORT_OK_EXIT_CODES,
+            ):
+                yield chunk
+        except DockerEngineError as e:
+            raise SandboxException(
+                f"Failed to export the workspace: {e.message}"
+            ) from e
 
     async def create_pty(
         self,
@@ -434,21 +458,30 @@ class LocalDockerProvider(SandboxProvider):
         tmux_session: str,
         on_data: PtyDataCallbackType | None = None,
     ) -> PtySession:
-        container = await self._get_container(sandbox_id)
+        container_id = await self._get_container(sandbox_id)
         session_id = str(uuid.uuid4())
-        loop = asyncio.get_running_loop()
+        client = self._get_docker_client()
 
-        exec_info, socket = await loop.run_in_executor(
-            self._executor, lambda: self._create_pty_exec(container, tmux_session)
+        exec_id = await client.exec_create(
+            container_id,
+            [
+                "bash",
+                "-c",
+                f"command -v tmux >/dev/null && tmux new -A -s {tmux_session} \\; set -g status off || exec bash",
+            ],
+            env=[f"TERM={TERMINAL_TYPE}"],
+            workdir=self.config.user_home,
+            tty=True,
+            stdin=True,
         )
+        stream = await client.exec_attach(exec_id, tty=True)
 
         self._register_pty_session(
             sandbox_id,
             session_id,
             {
-                "exec_id": exec_info["Id"],
-                "socket": socket,
-                "container": container,
+                "exec_id": exec_id,
+                "stream": stream,
                 "on_data": on_data,
                 "reader_task": None,
             },
@@ -456,7 +489,7 @@ class LocalDockerProvider(SandboxProvider):
 
         if on_data:
             reader_task = asyncio.create_task(
-                self._pty_reader(sandbox_id, session_id, socket, on_data)
+                self._pty_reader(sandbox_id, session_id, stream, on_data)
             )
             self._pty_sessions[sandbox_id][session_id]["reader_task"] = reader_task
 
@@ -474,21 +507,13 @@ class LocalDockerProvider(SandboxProvider):
         self,
         sandbox_id: str,
         session_id: str,
-        socket: Any,
+        stream: DockerExecStream,
         on_data: PtyDataCallbackType,
     ) -> None:
-        loop = asyncio.get_running_loop()
-
-        def read_socket() -> bytes | None:
-            try:
-                return bytes(socket._sock.recv(4096))
-            except Exception:
-                return None
-
         try:
             while True:
-                data = await loop.run_in_executor(self._executor, read_socket)
-                if data is None or len(data) == 0:
+                data = await stream.read(4096)
+                if not data:
                     break
                 await on_data(data)
         except asyncio.CancelledError:
@@ -506,21 +531,11 @@ class LocalDockerProvider(SandboxProvider):
         if not session:
             return
 
-        socket = session.get("socket")
-        if not socket:
+        stream = session.get("stream")
+        if not stream:
             return
 
-        loop = asyncio.get_running_loop()
-
-        await loop.run_in_executor(self._executor, lambda: socket._sock.send(data))
-
-    @staticmethod
-    def _resize_pty(container: Any, exec_id: str, rows: int, cols: int) -> None:
-        container.client.api.exec_resize(
-            exec_id,
-            height=max(rows, 1),
-            width=max(cols, 1),
-        )
+        await stream.write(data)
 
     async def resize_pty(
         self,
@@ -532,16 +547,14 @@ class LocalDockerProvider(SandboxProvider):
         if not session:
             return
 
-        container = session.get("container")
         exec_id = session.get("exec_id")
-        if not container or not exec_id:
+        if not exec_id:
             return
 
-        loop = asyncio.get_running_loop()
-
-        await loop.run_in_executor(
-            self._executor,
-            lambda: self._resize_pty(container, exec_id, size.rows, size.cols),
+        await self._get_docker_client().exec_resize(
+            exec_id,
+            height=max(size.rows, 1),
+            width=max(size.cols, 1),
         )
 
     async def kill_pty(
@@ -561,10 +574,10 @@ class LocalDockerProvider(SandboxProvider):
             except asyncio.CancelledError:
                 pass
 
-        socket = session.get("socket")
-        if socket:
+        stream = session.get("stream")
+        if stream:
             try:
-                socket.close()
+                stream.close()
             except Exception:
                 pass
 
@@ -601,65 +614,61 @@ class LocalDockerProvider(SandboxProvider):
             excluded_ports=EXCLUDED_PREVIEW_PORTS,
         )
 
-    async def _find_container_by_name(self, sandbox_id: str) -> Any:
-        client = self._get_docker_client()
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            self._executor,
-            lambda: client.containers.get(
-                f"{DOCKER_SANDBOX_CONTAINER_PREFIX}{sandbox_id}"
-            ),
+    async def _find_container_by_name(self, sandbox_id: str) -> str:
+        attrs = await self._get_docker_client().inspect_container(
+            f"{DOCKER_SANDBOX_CONTAINER_PREFIX}{sandbox_id}"
         )
+        return str(attrs["Id"])
 
-    async def _destroy_container(self, container: Any) -> None:
+    async def _destroy_container(self, container_id: str) -> None:
+        client = self._get_docker_client()
         try:
-            await asyncio.to_thread(container.stop, timeout=5)
+            await client.stop_container(container_id, timeout=5)
         except Exception:
             pass
         try:
-            await asyncio.to_thread(container.remove, force=True)
+            await client.remove_container(container_id, force=True)
         except Exception:
             pass
 
     async def _cleanup_docker_resources(self) -> None:
-        loop = asyncio.get_running_loop()
         client = self._get_docker_client()
 
         try:
-            await loop.run_in_executor(
-                self._executor,
-                lambda: client.images.prune(filters={"dangling": True}),
-            )
+            await client.prune_images(filters={"dangling": True})
         except Exception:
             pass
 
         try:
-            await loop.run_in_executor(
-                self._executor,
-                lambda: client.volumes.prune(),
-            )
+            await client.prune_volumes()
         except Exception:
             pass
 
-    @staticmethod
-    def _ensure_running(container: Any) -> None:
-        container.reload()
-        if container.status != DOCKER_STATUS_RUNNING:
-            container.start()
-
-    async def _get_container(self, sandbox_id: str) -> Any:
-        if sandbox_id not in self._containers:
-            connected = await self.connect_sandbox(sandbox_id)
-            if not connected:
-                raise SandboxException(f"Container {sandbox_id} not found")
-
-        container = self._containers[sandbox_id]
-        loop = asyncio.get_running_loop()
-
-        await loop.run_in_executor(
-            self._executor, lambda: self._ensure_running(container)
-        )
-        return container
+    async def _ensure_running(self, container_id: str) -> None:
+        client = self._get_docker_client()
+        attrs = await client.inspect_container(container_id)
+        if not _is_container_running(attrs):
+            await client.start_container(container_id)
+
+    async def _get_container(self, sandbox_id: str) -> str:
+        for _ in range(2):
+            if sandbox_id not in self._containers:
+                connected = await self.connect_sandbox(sandbox_id)
+                if not connected:
+                    break
+
+            container_id = self._containers[sandbox_id]
+            try:
+                await self._ensure_running(container_id)
+            except Exception as exc:
+                if not _is_missing_container(exc):
+                    raise
+                # Cached by this worker but removed since; look it up again.
+                self.invalidate(sandbox_id)
+                continue
+            return container_id
+
+        raise SandboxException(f"Container {sandbox_id} not found")
 
     async def get_ide_url(self, sandbox_id: str) -> str | None:
         has_path_routing = bool(
@@ -700,87 +709,40 @@ class LocalDockerProvider(SandboxProvider):
         )
         return f"{base_url}:{host_port}"
 
-    def _create_container_from_image(self, sandbox_id: str, image: Any) -> Any:
-        client = self._get_docker_client()
-        labels = self._build_traefik_labels(sandbox_id)
-        network = self.config.traefik_network or self.config.network
-
-        container = client.containers.run(
-            image,
-            command="/bin/bash",
-            name=f"{DOCKER_SANDBOX_CONTAINER_PREFIX}{sandbox_id}",
-            hostname="sandbox",
-            user="user",
-            working_dir=self.config.user_home,
-            stdin_open=True,
-            tty=True,
-            detach=True,
-            remove=False,
-            privileged=True,
-            security_opt=["no-new-privileges=false"],
-            network=network,
-            labels=labels,
-            ports={f"{port}/tcp": None for port in DOCKER_AVAILABLE_PORTS},
-            environment={
-                "TERM": TERMINAL_TYPE,
-                "HOME": self.config.user_home,
-                "USER": "user",
-                "OPENVSCODE_PORT": str(self.config.openvscode_port),
-            },
-        )
-        return container
-
     async def clone_sandbox(
         self, source_sandbox_id: str, checkpoint_id: str | None = None
     ) -> str:
-        loop = asyncio.get_running_loop()
-        source_container = await self._get_container(source_sandbox_id)
+        client = self._get_docker_client()
+        source_container_id = await self._get_container(source_sandbox_id)
 
-        temp_image = await loop.run_in_executor(self._executor, source_container.commit)
+        temp_image = await client.commit_container(source_container_id)
 
         new_sandbox_id = str(uuid.uuid4())[:12]
-        new_container: Any = None
 
         try:
-            new_container = await loop.run_in_executor(
-                self._executor,
-                lambda: self._create_container_from_image(new_sandbox_id, temp_image),
-            )
-            self._containers[new_sandbox_id] = new_container
-
-            port_map = await loop.run_in_executor(
-                self._executor, lambda: self._extract_port_mappings(new_container)
-            )
-            self._port_mappings[new_sandbox_id] = port_map
+            await self._run_container(new_sandbox_id, temp_image)
 
             if checkpoint_id:
                 await self.restore_checkpoint(new_sandbox_id, checkpoint_id)
 
             return new_sandbox_id
         except Exception:
-            if new_sandbox_id in self._containers:
-                del self._containers[new_sandbox_id]
-            if new_sandbox_id in self._port_mappings:
-                del self._port_mappings[new_sandbox_id]
-            if new_container is not None:
+            new_container_id = self._containers.get(new_sandbox_id)
+            self.invalidate(new_sandbox_id)
+            if new_container_id is not None:
                 try:
-                    await loop.run_in_executor(
-                        self._executor, lambda: new_container.remove(force=True)
-                    )
+                    await client.remove_container(new_container_id, force=True)
                 except Exception:
                     pass
             raise
         finally:
             try:
-                await loop.run_in_executor(
-                    self._executor, lambda: temp_image.remove(force=True)
-                )
+                await client.remove_image(temp_image, force=True)
             except Exception:
                 pass
 
     async def cleanup(self) -> None:
         await super().cleanup()
-        self._executor.shutdown(wait=False)
         if self._docker_client:
-            self._docker_client.close()
+            await self._docker_client.aclose()
             self._docker_client = None
@@ -14,6 +14,8 @@ def create_docker_config() -> DockerConfig:
         preview_base_url=settings.DOCKER_PREVIEW_BASE_URL,
         traefik_network=settings.DOCKER_TRAEFIK_NETWORK,
         traefik_entrypoint=settings.DOCKER_TRAEFIK_ENTRYPOINT,
+        transport_read_size=settings.DOCKER_TRANSPORT_READ_SIZE,
+        api_max_connections=settings.DOCKER_API_MAX_CONNECTIONS,
     )
 
 
@@ -52,6 +54,8 @@ def create_sandbox_provider(
         return LocalHostProvider(
             base_dir=host_base_dir,
             preview_base_url=settings.HOST_PREVIEW_BASE_URL,
+            output_coalesce_ms=settings.HOST_OUTPUT_COALESCE_MS,
+            output_buffer_size=settings.HOST_OUTPUT_BUFFER_SIZE,
         )
 
     raise ValueError(f"Unknown provider type: {provider_type}")
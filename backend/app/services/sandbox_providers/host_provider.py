@@ -10,6 +10,7 @@ import signal
 import subprocess
 import termios
 import uuid
+from collections.abc import AsyncIterator
 from pathlib import Path
 from urllib.parse import quote
 from typing import Any
@@ -23,24 +24,36 @@ from app.constants import (
     VNC_WEBSOCKET_PORT,
 )
 from app.services.exceptions import SandboxException
-from app.services.sandbox_providers.base import LISTENING_PORTS_COMMAND, SandboxProvider
+from app.services.sandbox_providers.base import (
+    LISTENING_PORTS_COMMAND,
+    ZIP_EXPORT_ERROR_BYTES,
+    SandboxProvider,
+)
 from app.services.sandbox_providers.types import (
     CommandResult,
     FileContent,
+    FileMetadata,
     PreviewLink,
     PtyDataCallbackType,
     PtySession,
     PtySize,
 )
+from app.utils.fd_reader import DEFAULT_READ_BUFFER_SIZE, FdReader, write_fd
 
 
 class LocalHostProvider(SandboxProvider):
     def __init__(
-        self, base_dir: str, preview_base_url: str = "http://localhost"
+        self,
+        base_dir: str,
+        preview_base_url: str = "http://localhost",
+        output_coalesce_ms: float = 0.0,
+        output_buffer_size: int = DEFAULT_READ_BUFFER_SIZE,
     ) -> None:
         self._base_dir = Path(base_dir).expanduser().resolve()
         self._base_dir.mkdir(parents=True, exist_ok=True)
         self._preview_base_url = preview_base_url.rstrip("/")
+        self._output_coalesce_ms = output_coalesce_ms
+        self._output_buffer_size = output_buffer_size
         self._sandboxes: dict[str, Path] = {}
         self._pty_sessions: dict[str, dict[str, Any]] = {}
 
@@ -218,6 +231,117 @@ class LocalHostProvider(SandboxProvider):
         content, is_binary = self._encode_file_content(path, content_bytes)
         return FileContent(path=path, content=content, type="file", is_binary=is_binary)
 
+    @staticmethod
+    def _read_paths(resolved: dict[str, Path]) -> dict[str, bytes]:
+        return {
+            path: target.read_bytes()
+            for path, target in resolved.items()
+            if target.is_file()
+        }
+
+    async def read_files(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+    ) -> dict[str, FileContent]:
+        resolved = {path: self._resolve_path(sandbox_id, path) for path in paths}
+        contents = await asyncio.to_thread(self._read_paths, resolved)
+        files: dict[str, FileContent] = {}
+        for path, content_bytes in contents.items():
+            content, is_binary = self._encode_file_content(path, content_bytes)
+            files[path] = FileContent(
+                path=path, content=content, type="file", is_binary=is_binary
+            )
+        return files
+
+    @staticmethod
+    def _write_paths(payload: dict[Path, bytes], mode: int | None) -> None:
+        for target, content in payload.items():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            if mode is not None:
+                target.chmod(mode)
+
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+        mode: int | None = None,
+        owner: str | None = None,
+    ) -> None:
+        # Host sandboxes belong to the API process's user, so owner is ignored.
+        payload = {
+            self._resolve_path(sandbox_id, path): (
+                content.encode("utf-8") if isinstance(content, str) else content
+            )
+            for path, content in files.items()
+        }
+        await asyncio.to_thread(self._write_paths, payload, mode)
+
+    @staticmethod
+    def _stat_paths(resolved: dict[str, Path]) -> dict[str, FileMetadata]:
+        stats: dict[str, FileMetadata] = {}
+        for path, target in resolved.items():
+            try:
+                stat = target.stat()
+            except OSError:
+                continue
+            if target.is_dir():
+                stats[path] = FileMetadata(
+                    path=path, type="directory", size=0, modified=stat.st_mtime
+                )
+            elif target.is_file():
+                stats[path] = FileMetadata(
+                    path=path,
+                    type="file",
+                    size=stat.st_size,
+                    modified=stat.st_mtime,
+                    is_binary=SandboxProvider._is_binary_file(path),
+                )
+        return stats
+
+    async def stat_many(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+    ) -> dict[str, FileMetadata]:
+        resolved = {path: self._resolve_path(sandbox_id, path) for path in paths}
+        return await asyncio.to_thread(self._stat_paths, resolved)
+
+    async def stream_zip(
+        self,
+        sandbox_id: str,
+        excluded_patterns: list[str] | None = None,
+    ) -> AsyncIterator[bytes]:
+        sandbox_dir = self._resolve_sandbox_dir(sandbox_id)
+        command = self._map_virtual_paths(
+            sandbox_id, self._zip_export_command(excluded_patterns)
+        )
+        process = await asyncio.create_subprocess_exec(
+            "bash",
+            "-c",
+            command,
+            cwd=str(sandbox_dir),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = process.stdout, process.stderr
+        if stdout is None or stderr is None:
+            raise SandboxException("Failed to start the workspace export")
+        stderr_task = asyncio.create_task(stderr.read())
+        try:
+            while chunk := await stdout.read(self._output_buffer_size):
+                yield chunk
+            exit_code = await process.wait()
+            errors = (await stderr_task)[-ZIP_EXPORT_ERROR_BYTES:]
+            self._check_zip_export(exit_code, errors.decode("utf-8", errors="replace"))
+        finally:
+            stderr_task.cancel()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
     def _resize_fd(self, fd: int, rows: int, cols: int) -> None:
         size = rows.to_bytes(2, "little") + cols.to_bytes(2, "little") + b"\x00" * 4
         fcntl.ioctl(fd, termios.TIOCSWINSZ, size)
@@ -257,6 +381,7 @@ class LocalHostProvider(SandboxProvider):
             close_fds=True,
         )
         os.close(slave_fd)
+        os.set_blocking(master_fd, False)
 
         self._register_pty_session(
             sandbox_id,
@@ -284,12 +409,14 @@ class LocalHostProvider(SandboxProvider):
         master_fd: int,
         on_data: PtyDataCallbackType,
     ) -> None:
+        reader = FdReader(
+            master_fd,
+            on_data,
+            coalesce_ms=self._output_coalesce_ms,
+            buffer_size=self._output_buffer_size,
+        )
         try:
-            while True:
-                chunk = await asyncio.to_thread(os.read, master_fd, 4096)
-                if not chunk:
-                    break
-                await on_data(chunk)
+            await reader.run()
         except asyncio.CancelledError:
             pass
         except OSError:
@@ -313,7 +440,7 @@ class LocalHostProvider(SandboxProvider):
         master_fd = session.get("master_fd")
         if master_fd is None:
             return
-        await asyncio.to_thread(os.write, master_fd, data)
+        await write_fd(master_fd, data)
 
     async def resize_pty(
         self,
@@ -0,0 +1,65 @@
+import logging
+
+from app.services.sandbox_providers.base import SandboxProvider
+from app.services.sandbox_providers.factory import create_sandbox_provider
+from app.services.sandbox_providers.types import SandboxProviderType
+
+logger = logging.getLogger(__name__)
+
+# Providers built only from process settings. E2B and Modal providers carry a
+# user's API key and remote client state, so they are still created per use.
+SHARED_PROVIDER_TYPES = frozenset(
+    {SandboxProviderType.DOCKER, SandboxProviderType.HOST}
+)
+
+
+class SandboxProviderRegistry:
+    # Sandbox providers shared by every request and background task of this
+    # worker, one per shared provider type. A shared Docker provider keeps one
+    # pooled Docker Engine API client and one container/port cache for all
+    # callers; the providers are cleaned up once, at application shutdown.
+    #
+    # Callers release what they acquire: release is a no-op for shared
+    # providers and cleans up the per-use ones.
+
+    _providers: dict[SandboxProviderType, SandboxProvider] = {}
+
+    @classmethod
+    def acquire(
+        cls,
+        provider_type: SandboxProviderType | str,
+        api_key: str | None = None,
+    ) -> SandboxProvider:
+        if isinstance(provider_type, str):
+            provider_type = SandboxProviderType(provider_type)
+        if provider_type not in SHARED_PROVIDER_TYPES:
+            return create_sandbox_provider(provider_type, api_key)
+
+        provider = cls._providers.get(provider_type)
+        if provider is None:
+            provider = create_sandbox_provider(provider_type, api_key)
+            cls._providers[provider_type] = provider
+        return provider
+
+    @classmethod
+    def is_shared(cls, provider: SandboxProvider) -> bool:
+        return any(shared is provider for shared in cls._providers.values())
+
+    @classmethod
+    async def release(cls, provider: SandboxProvider) -> None:
+        if not cls.is_shared(provider):
+            await provider.cleanup()
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        providers = list(cls._providers.items())
+        cls._providers.clear()
+        for provider_type, provider in providers:
+            try:
+                await provider.cleanup()
+            except Exception as exc:
+                logger.warning(
+                    "Failed to clean up shared %s sandbox provider: %s",
+                    provider_type.value,
+                    exc,
+                )
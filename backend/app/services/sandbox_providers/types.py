@@ -76,6 +76,8 @@ class DockerConfig:
     openvscode_port: int = 8765
     traefik_network: str = ""
     traefik_entrypoint: str = "https"
+    transport_read_size: int = 256 * 1024
+    api_max_connections: int = 64
 
 
 PtyDataCallbackType = Callable[[bytes], Coroutine[Any, Any, None]]
@@ -40,7 +40,7 @@ from app.prompts.system_prompt import build_system_prompt_for_chat
 from app.services.db import BaseDbService, SessionFactoryType
 from app.services.exceptions import SchedulerException
 from app.services.sandbox import SandboxService
-from app.services.sandbox_providers import SandboxProviderType, create_sandbox_provider
+from app.services.sandbox_providers import SandboxProviderRegistry, SandboxProviderType
 from app.services.streaming.runtime import ChatStreamRuntime
 from app.services.streaming.types import ChatStreamRequest
 from app.services.user import UserService
@@ -559,7 +559,7 @@ class SchedulerService(BaseDbService[ScheduledTask]):
         elif user_settings.sandbox_provider == SandboxProviderType.MODAL.value:
             api_key = user_settings.modal_api_key
 
-        provider = create_sandbox_provider(
+        provider = SandboxProviderRegistry.acquire(
             provider_type=user_settings.sandbox_provider,
             api_key=api_key,
         )
@@ -23,6 +23,12 @@ settings = get_settings()
 
 
 class ContextUsagePoller:
+    # Publishes the chat's context usage while a stream runs. The figure comes
+    # from the usage fields the CLI already streams, so polling is free; the
+    # /context round trip through a second CLI process is only used for the
+    # final refresh of a stream that reported no usage at all (e.g. a bare
+    # slash command).
+
     def __init__(self, *, runtime: ChatStreamRuntime) -> None:
         self._runtime = runtime
 
@@ -30,7 +36,7 @@ class ContextUsagePoller:
         self, ai_service: ClaudeAgentService
     ) -> tuple[asyncio.Task[None] | None, asyncio.Event | None]:
         rt = self._runtime
-        if not rt.redis or not rt.sandbox_id:
+        if not rt.redis:
             return None, None
 
         stop_event = asyncio.Event()
@@ -41,37 +47,45 @@ class ContextUsagePoller:
         self,
         *,
         ai_service: ClaudeAgentService,
-        session_id: str,
+        session_id: str | None,
     ) -> dict[str, Any] | None:
         rt = self._runtime
-        redis_client = rt.redis
-        if not redis_client:
+        if not rt.redis:
             return None
         try:
-            user_settings = await UserService(
-                session_factory=rt.session_factory
-            ).get_user_settings(UUID(rt.user_id))
-            token_usage = await ai_service.get_context_token_usage(
-                session_id=session_id,
-                sandbox_id=rt.sandbox_id,
-                model_id=rt.model_id,
-                user_settings=user_settings,
-            )
+            token_usage = ai_service.get_stream_context_tokens()
+            if token_usage is None and session_id:
+                token_usage = await self._query_cli(ai_service, session_id)
             if token_usage is None:
                 return None
-
-            context_window = settings.CONTEXT_WINDOW_TOKENS
-            percentage = (
-                min((token_usage / context_window) * 100, 100.0)
-                if context_window > 0
-                else 0.0
+            return await self.publish(token_usage, persist=True)
+        except Exception as exc:
+            logger.debug(
+                "Context usage refresh failed for chat %s: %s", rt.chat_id, exc
             )
-            context_data: dict[str, Any] = {
-                "tokens_used": token_usage,
-                "context_window": context_window,
-                "percentage": percentage,
-            }
+            return None
 
+    async def publish(
+        self, token_usage: int, *, persist: bool
+    ) -> dict[str, Any] | None:
+        rt = self._runtime
+        redis_client = rt.redis
+        if not redis_client:
+            return None
+
+        context_window = settings.CONTEXT_WINDOW_TOKENS
+        percentage = (
+            min((token_usage / context_window) * 100, 100.0)
+            if context_window > 0
+            else 0.0
+        )
+        context_data: dict[str, Any] = {
+            "tokens_used": token_usage,
+            "context_window": context_window,
+            "percentage": percentage,
+        }
+
+        if persist:
             async with rt.session_factory() as db:
                 result = await db.execute(select(Chat).filter(Chat.id == rt.chat.id))
                 chat = result.scalar_one_or_none()
@@ -80,25 +94,36 @@ class ContextUsagePoller:
                     db.add(chat)
                     await db.commit()
 
-            await redis_client.setex(
-                REDIS_KEY_CHAT_CONTEXT_USAGE.format(chat_id=rt.chat_id),
-                settings.CONTEXT_USAGE_CACHE_TTL_SECONDS,
-                json.dumps(context_data),
-            )
+        await redis_client.setex(
+            REDIS_KEY_CHAT_CONTEXT_USAGE.format(chat_id=rt.chat_id),
+            settings.CONTEXT_USAGE_CACHE_TTL_SECONDS,
+            json.dumps(context_data),
+        )
 
-            if rt.assistant_message_id:
-                payload: dict[str, Any] = {
-                    "context_usage": context_data,
-                    "chat_id": rt.chat_id,
-                }
-                await rt.emit_event("system", payload, apply_snapshot=False)
+        if rt.assistant_message_id:
+            payload: dict[str, Any] = {
+                "context_usage": context_data,
+                "chat_id": rt.chat_id,
+            }
+            await rt.emit_event("system", payload, apply_snapshot=False)
 
-            return context_data
-        except Exception as exc:
-            logger.debug(
-                "Context usage refresh failed for chat %s: %s", rt.chat_id, exc
-            )
+        return context_data
+
+    async def _query_cli(
+        self, ai_service: ClaudeAgentService, session_id: str
+    ) -> int | None:
+        rt = self._runtime
+        if not rt.sandbox_id or not rt.user_id or not rt.model_id:
             return None
+        user_settings = await UserService(
+            session_factory=rt.session_factory
+        ).get_user_settings(UUID(rt.user_id))
+        return await ai_service.get_context_token_usage(
+            session_id=session_id,
+            sandbox_id=rt.sandbox_id,
+            model_id=rt.model_id,
+            user_settings=user_settings,
+        )
 
     @staticmethod
     async def stop(
@@ -122,17 +147,18 @@ class ContextUsagePoller:
         if not rt.redis:
             return
 
+        # Mid-stream updates only go to Redis and the live stream; the final
+        # refresh writes the chat row.
+        published: int | None = None
         while not stop_event.is_set():
-            session_id = rt.session_container.get("session_id")
-            if session_id:
+            token_usage = ai_service.get_stream_context_tokens()
+            if token_usage is not None and token_usage != published:
                 try:
-                    await self.refresh(
-                        ai_service=ai_service,
-                        session_id=str(session_id),
-                    )
+                    await self.publish(token_usage, persist=False)
+                    published = token_usage
                 except Exception as exc:
                     logger.debug(
-                        "Mid-stream context usage polling failed for chat %s: %s",
+                        "Mid-stream context usage update failed for chat %s: %s",
                         rt.chat_id,
                         exc,
                     )
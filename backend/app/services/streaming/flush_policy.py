@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+from app.core.config import get_settings
+from app.core.metrics import STREAM_SNAPSHOT_FLUSH_WINDOW
+
+settings = get_settings()
+
+
+class SnapshotFlushPolicy(ABC):
+    # Decides when a streaming run writes its buffered snapshot events. The
+    # runtime asks should_flush after every event and flushes on its own once no
+    # event arrived for idle_delay_ms, so a run waiting on a slow tool never
+    # holds events back until the next one shows up.
+
+    @abstractmethod
+    def should_flush(self, pending: int, elapsed_ms: float) -> bool: ...
+
+    @abstractmethod
+    def idle_delay_ms(self) -> float: ...
+
+    def observe_event(self, now: float) -> None:
+        return None
+
+    def observe_flush(self, events: int, latency_ms: float) -> None:
+        return None
+
+
+class FixedFlushPolicy(SnapshotFlushPolicy):
+    def __init__(self, *, interval_ms: float, max_events: int) -> None:
+        self.interval_ms = max(interval_ms, 1.0)
+        self.max_events = max(max_events, 1)
+
+    def should_flush(self, pending: int, elapsed_ms: float) -> bool:
+        if pending == 0:
+            return False
+        return elapsed_ms >= self.interval_ms or pending >= self.max_events
+
+    def idle_delay_ms(self) -> float:
+        return self.interval_ms
+
+
+class AdaptiveFlushPolicy(SnapshotFlushPolicy):
+    # Widens the batch window while commits get slower or events arrive in
+    # bursts (token-level assistant_text), and falls back to the minimum window
+    # when the stream goes quiet so the client is not left waiting.
+
+    _SMOOTHING = 0.2
+
+    def __init__(
+        self,
+        *,
+        base_interval_ms: float,
+        base_events: int,
+        min_interval_ms: float,
+        max_interval_ms: float,
+        max_events: int,
+        latency_factor: float,
+        burst_rate: float,
+    ) -> None:
+        self.base_interval_ms = max(base_interval_ms, 1.0)
+        self.base_events = max(base_events, 1)
+        self.min_interval_ms = max(min_interval_ms, 1.0)
+        self.max_interval_ms = max(max_interval_ms, self.min_interval_ms)
+        self.max_events = max(max_events, self.base_events)
+        self.latency_factor = max(latency_factor, 0.0)
+        self.burst_rate = max(burst_rate, 1.0)
+        self.latency_ms = 0.0
+        self.event_rate = 0.0
+        self._last_event_at: float | None = None
+        self.window_ms = self.base_interval_ms
+
+    def observe_event(self, now: float) -> None:
+        if self._last_event_at is not None:
+            gap = max(now - self._last_event_at, 1e-4)
+            self.event_rate += self._SMOOTHING * (1.0 / gap - self.event_rate)
+        self._last_event_at = now
+        self._update_window()
+
+    def observe_flush(self, events: int, latency_ms: float) -> None:
+        self.latency_ms += self._SMOOTHING * (latency_ms - self.latency_ms)
+        self._update_window()
+
+    def _update_window(self) -> None:
+        burst = max(self.event_rate / self.burst_rate, 1.0)
+        window = max(
+            self.base_interval_ms * burst, self.latency_ms * self.latency_factor
+        )
+        self.window_ms = min(max(window, self.min_interval_ms), self.max_interval_ms)
+        STREAM_SNAPSHOT_FLUSH_WINDOW.set(self.window_ms)
+
+    def _event_budget(self) -> int:
+        scaled = self.base_events * self.window_ms / self.base_interval_ms
+        return int(min(max(scaled, self.base_events), self.max_events))
+
+    def should_flush(self, pending: int, elapsed_ms: float) -> bool:
+        if pending == 0:
+            return False
+        return elapsed_ms >= self.window_ms or pending >= self._event_budget()
+
+    def idle_delay_ms(self) -> float:
+        return min(self.min_interval_ms, self.window_ms)
+
+
+def create_flush_policy() -> SnapshotFlushPolicy:
+    if settings.CHAT_SNAPSHOT_FLUSH_POLICY == "adaptive":
+        return AdaptiveFlushPolicy(
+            base_interval_ms=settings.CHAT_SNAPSHOT_FLUSH_INTERVAL_MS,
+            base_events=settings.CHAT_SNAPSHOT_FLUSH_MAX_EVENTS,
+            min_interval_ms=settings.CHAT_SNAPSHOT_FLUSH_MIN_INTERVAL_MS,
+            max_interval_ms=settings.CHAT_SNAPSHOT_FLUSH_MAX_INTERVAL_MS,
+            max_events=settings.CHAT_SNAPSHOT_FLUSH_MAX_BATCH_EVENTS,
+            latency_factor=settings.CHAT_SNAPSHOT_FLUSH_LATENCY_FACTOR,
+            burst_rate=settings.CHAT_SNAPSHOT_FLUSH_BURST_RATE,
+        )
+    return FixedFlushPolicy(
+        interval_ms=settings.CHAT_SNAPSHOT_FLUSH_INTERVAL_MS,
+        max_events=settings.CHAT_SNAPSHOT_FLUSH_MAX_EVENTS,
+    )
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+from app.core.config import get_settings
+from app.services.streaming.live import LiveEntry, LiveEventStream
+from app.utils.queue import put_with_overflow
+from app.utils.redis import redis_connection
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class LiveSubscription:
+    __slots__ = ("_channel", "_queue", "_needs_resync")
+
+    def __init__(self, channel: _ChatChannel, maxsize: int) -> None:
+        self._channel = channel
+        self._queue: asyncio.Queue[LiveEntry | None] = asyncio.Queue(maxsize=maxsize)
+        # A fresh subscriber may have replayed less than the shared reader has
+        # already dispatched, so it starts by catching up to the channel cursor.
+        self._needs_resync = True
+
+    def offer(self, entry: LiveEntry | None) -> None:
+        if entry is None:
+            put_with_overflow(self._queue, None)
+            return
+        if self._needs_resync:
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            # Slow consumer: stop buffering for it and let it resync from the
+            # persisted log once it has drained what it already holds.
+            self._needs_resync = True
+            logger.warning(
+                "Live subscriber for chat %s fell behind at seq %s; resyncing",
+                self._channel.chat_id,
+                entry.seq,
+            )
+
+    def take_resync_seq(self) -> int | None:
+        if not self._needs_resync or not self._queue.empty():
+            return None
+        self._needs_resync = False
+        return self._channel.last_seq
+
+    async def get(self) -> LiveEntry:
+        entry = await self._queue.get()
+        if entry is None:
+            raise self._channel.error or RuntimeError("Live event reader stopped")
+        return entry
+
+
+class _ChatChannel:
+    def __init__(self, chat_id: str, start_seq: int) -> None:
+        self.chat_id = chat_id
+        self.last_seq = start_seq
+        self.subscribers: set[LiveSubscription] = set()
+        self.error: Exception | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    async def run(self) -> None:
+        try:
+            async with redis_connection() as redis:
+                while True:
+                    entries = await LiveEventStream.read(
+                        redis, self.chat_id, self.last_seq
+                    )
+                    for entry in entries:
+                        if entry.seq <= self.last_seq:
+                            continue
+                        self.last_seq = entry.seq
+                        for subscription in self.subscribers:
+                            subscription.offer(entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(
+                "Live event reader for chat %s failed: %s", self.chat_id, exc
+            )
+            self.error = exc
+            LiveEventHub._discard(self)
+            for subscription in self.subscribers:
+                subscription.offer(None)
+
+
+class LiveEventHub:
+    # One Redis reader per chat per process, fanned out to every local SSE
+    # subscriber through bounded queues.
+    _channels: dict[str, _ChatChannel] = {}
+
+    @classmethod
+    @asynccontextmanager
+    async def subscribe(
+        cls, chat_id: UUID | str, after_seq: int
+    ) -> AsyncIterator[LiveSubscription]:
+        key = str(chat_id)
+        channel = cls._channels.get(key)
+        if channel is None:
+            channel = _ChatChannel(key, after_seq)
+            channel.task = asyncio.create_task(channel.run())
+            cls._channels[key] = channel
+
+        subscription = LiveSubscription(
+            channel, max(settings.CHAT_STREAM_HUB_QUEUE_SIZE, 1)
+        )
+        channel.subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            channel.subscribers.discard(subscription)
+            if not channel.subscribers:
+                cls._discard(channel)
+                if channel.task and not channel.task.done():
+                    channel.task.cancel()
+
+    @classmethod
+    def _discard(cls, channel: _ChatChannel) -> None:
+        if cls._channels.get(channel.chat_id) is channel:
+            cls._channels.pop(channel.chat_id, None)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Any
+
+from app.core.config import get_settings
+from app.services.db import SessionFactoryType
+from app.services.message import MessageService
+from app.services.streaming.live import LiveEntry, LiveEventStream
+from app.utils.redis import redis_connection
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class _JournalItem:
+    __slots__ = ("chat_id", "events", "entries", "committed")
+
+    def __init__(
+        self,
+        chat_id: str,
+        events: list[dict[str, Any]],
+        entries: list[LiveEntry],
+        committed: asyncio.Future[None],
+    ) -> None:
+        self.chat_id = chat_id
+        self.events = events
+        self.entries = entries
+        self.committed = committed
+
+
+class EventJournal:
+    # Write-behind buffer shared by every streaming run in the process. A single
+    # flusher group-commits the pending events of all streams with one multi-row
+    # INSERT per tick, then publishes them live, so viewers never see an event
+    # before it is durable. Items are committed in submission order, which keeps
+    # commit order equal to seq order within a chat. Streams only share a group
+    # commit when they write through the same session factory.
+
+    _instances: dict[SessionFactoryType, EventJournal] = {}
+
+    def __init__(self, session_factory: SessionFactoryType) -> None:
+        self._items: deque[_JournalItem] = deque()
+        self._pending_events = 0
+        self._max_pending = max(settings.CHAT_EVENT_JOURNAL_MAX_PENDING, 1)
+        self._max_batch = max(settings.CHAT_EVENT_JOURNAL_MAX_BATCH, 1)
+        self._interval = max(settings.CHAT_EVENT_JOURNAL_FLUSH_INTERVAL_MS, 1) / 1000
+        self._has_items = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._closing = False
+        self._task: asyncio.Task[None] | None = None
+        self._message_service = MessageService(session_factory=session_factory)
+
+    @classmethod
+    def get(cls, session_factory: SessionFactoryType) -> EventJournal:
+        journal = cls._instances.get(session_factory)
+        if journal is None:
+            journal = cls._instances[session_factory] = cls(session_factory)
+        return journal
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        journals = list(cls._instances.values())
+        cls._instances.clear()
+        for journal in journals:
+            await journal._drain()
+
+    async def submit(
+        self,
+        chat_id: str,
+        events: list[dict[str, Any]],
+        entries: list[LiveEntry],
+    ) -> asyncio.Future[None]:
+        # Backpressure: a producer waits here while the journal holds more than
+        # its budget, which in turn stalls the stream consumer feeding it.
+        while self._pending_events >= self._max_pending and not self._closing:
+            await self._has_space.wait()
+
+        committed: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        if not events:
+            committed.set_result(None)
+            return committed
+
+        self._items.append(_JournalItem(chat_id, events, entries, committed))
+        self._pending_events += len(events)
+        if self._pending_events >= self._max_pending:
+            self._has_space.clear()
+        self._has_items.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return committed
+
+    async def _run(self) -> None:
+        try:
+            async with redis_connection() as redis:
+                while self._items or not self._closing:
+                    if not self._items:
+                        self._has_items.clear()
+                        await self._has_items.wait()
+                        continue
+                    if not self._closing and self._pending_events < self._max_batch:
+                        # Let the tick collect events from other streams before
+                        # the commit instead of writing each flush on its own.
+                        await asyncio.sleep(self._interval)
+                    batch = self._take_batch()
+                    await self._commit(batch)
+                    await self._publish(redis, batch)
+        except Exception as exc:
+            logger.exception("Event journal flusher stopped")
+            self._fail_pending(exc)
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for item in self._items:
+            self._fail(item, exc)
+        self._items.clear()
+        self._pending_events = 0
+        self._has_space.set()
+
+    def _take_batch(self) -> list[_JournalItem]:
+        batch: list[_JournalItem] = []
+        taken = 0
+        while self._items and (
+            not batch or taken + len(self._items[0].events) <= self._max_batch
+        ):
+            item = self._items.popleft()
+            batch.append(item)
+            taken += len(item.events)
+        self._pending_events -= taken
+        if self._pending_events < self._max_pending:
+            self._has_space.set()
+        return batch
+
+    async def _commit(self, batch: list[_JournalItem]) -> None:
+        try:
+            await self._message_service.append_events(
+                [event for item in batch for event in item.events]
+            )
+        except Exception as exc:
+            if len(batch) == 1:
+                self._fail(batch[0], exc)
+                return
+            # Retry item by item so one broken stream does not fail the writes
+            # of every other stream that shared the group commit.
+            logger.warning("Event journal group commit failed, retrying: %s", exc)
+            for item in batch:
+                try:
+                    await self._message_service.append_events(item.events)
+                except Exception as item_exc:
+                    self._fail(item, item_exc)
+                    continue
+                self._resolve(item)
+            return
+        for item in batch:
+            self._resolve(item)
+
+    @staticmethod
+    def _resolve(item: _JournalItem) -> None:
+        if not item.committed.done():
+            item.committed.set_result(None)
+
+    @staticmethod
+    def _fail(item: _JournalItem, exc: Exception) -> None:
+        logger.error(
+            "Failed to persist %s journaled event(s) for chat %s: %s",
+            len(item.events),
+            item.chat_id,
+            exc,
+        )
+        item.entries = []
+        if not item.committed.done():
+            item.committed.set_exception(exc)
+
+    @staticmethod
+    async def _publish(redis: Redis[str], batch: list[_JournalItem]) -> None:
+        by_chat: dict[str, list[LiveEntry]] = {}
+        for item in batch:
+            by_chat.setdefault(item.chat_id, []).extend(item.entries)
+        for chat_id, entries in by_chat.items():
+            try:
+                await LiveEventStream.publish(redis, chat_id, entries)
+            except Exception as exc:
+                logger.warning(
+                    "Failed to publish live events for chat %s: %s", chat_id, exc
+                )
+
+    async def _drain(self) -> None:
+        self._closing = True
+        self._has_space.set()
+        self._has_items.set()
+        if self._task is not None:
+            await self._task
+        self._fail_pending(RuntimeError("Event journal stopped before commit"))
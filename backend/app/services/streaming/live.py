@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from app.constants import REDIS_KEY_CHAT_STREAM_LIVE
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class LiveEntry:
+    __slots__ = ("seq", "kind", "data")
+
+    def __init__(self, seq: int, kind: str, data: str) -> None:
+        self.seq = seq
+        self.kind = kind
+        self.data = data
+
+
+class LiveEventStream:
+    # Sequenced envelopes are appended to a per-chat Redis Stream whose entry IDs
+    # are "<seq>-0", so XREAD from the last delivered seq yields events in seq order
+    # without touching Postgres.
+
+    @staticmethod
+    def key(chat_id: UUID | str) -> str:
+        return REDIS_KEY_CHAT_STREAM_LIVE.format(chat_id=chat_id)
+
+    @staticmethod
+    def entry_id(seq: int) -> str:
+        return f"{seq}-0"
+
+    @classmethod
+    async def publish(
+        cls,
+        redis: Redis[str],
+        chat_id: UUID | str,
+        entries: Sequence[LiveEntry],
+    ) -> None:
+        if not entries:
+            return
+        key = cls.key(chat_id)
+        pipe = redis.pipeline(transaction=False)
+        for entry in entries:
+            pipe.xadd(
+                key,
+                {"kind": entry.kind, "data": entry.data},
+                id=cls.entry_id(entry.seq),
+                maxlen=settings.CHAT_STREAM_LIVE_MAXLEN,
+                approximate=True,
+            )
+        pipe.expire(key, settings.CHAT_STREAM_LIVE_TTL_SECONDS)
+        results = await pipe.execute(raise_on_error=False)
+        for entry, result in zip(entries, results, strict=False):
+            if isinstance(result, Exception):
+                # A concurrent producer already appended a higher seq; readers fill
+                # the hole from the persisted event log when they see the gap, or
+                # on their idle check when nothing follows (a terminal event).
+                logger.debug(
+                    "Skipped live entry seq=%s for chat %s: %s",
+                    entry.seq,
+                    chat_id,
+                    result,
+                )
+
+    @classmethod
+    async def read(
+        cls,
+        redis: Redis[str],
+        chat_id: UUID | str,
+        after_seq: int,
+        *,
+        block_ms: int | None = None,
+        count: int = 500,
+    ) -> list[LiveEntry]:
+        key = cls.key(chat_id)
+        response = await redis.xread(
+            {key: cls.entry_id(after_seq)},
+            count=count,
+            block=settings.CHAT_STREAM_LIVE_BLOCK_MS if block_ms is None else block_ms,
+        )
+        entries: list[LiveEntry] = []
+        for _, stream_entries in response or []:
+            for entry_id, fields in stream_entries:
+                entries.append(
+                    LiveEntry(
+                        seq=int(entry_id.split("-", 1)[0]),
+                        kind=fields.get("kind", ""),
+                        data=fields.get("data", "{}"),
+                    )
+                )
+        return entries
@@ -1,7 +1,7 @@
 import json
 import logging
 import re
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Mapping
 from typing import Any
 
 from claude_agent_sdk import (
@@ -20,11 +20,30 @@ from app.services.streaming.types import StreamEvent, StreamEventType
 
 logger = logging.getLogger(__name__)
 
+PROMPT_SUGGESTIONS_TAG = "<prompt_suggestions>"
 PROMPT_SUGGESTIONS_PATTERN = re.compile(
     r"<prompt_suggestions>\s*(.*?)\s*</prompt_suggestions>",
     re.DOTALL,
 )
 
+CONTEXT_USAGE_FIELDS = (
+    "input_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+    "output_tokens",
+)
+
+
+def context_tokens_from_usage(usage: Mapping[str, Any]) -> int:
+    # Everything one API call read plus what it wrote is what the next call of
+    # the session starts from.
+    total = 0
+    for field in CONTEXT_USAGE_FIELDS:
+        value = usage.get(field)
+        if isinstance(value, int):
+            total += value
+    return total
+
 
 class StreamProcessor:
     def __init__(
@@ -35,6 +54,12 @@ class StreamProcessor:
         self._tool_registry = tool_registry
         self._session_handler = session_handler
         self.total_cost_usd = 0.0
+        self.context_tokens: int | None = None
+
+    def record_usage(self, usage: Mapping[str, Any]) -> None:
+        # Called with the usage of every top-level assistant message, so the
+        # value always reflects the latest API call of the session.
+        self.context_tokens = context_tokens_from_usage(usage)
 
     def _process_session_init(self, message: SystemMessage) -> None:
         if message.subtype != "init" or not self._session_handler:
@@ -62,6 +87,10 @@ class StreamProcessor:
         if isinstance(message, ResultMessage):
             if message.total_cost_usd is not None:
                 self.total_cost_usd = message.total_cost_usd
+            # The result's usage sums every API call of the turn; it only equals
+            # the context size when the turn made a single call.
+            if self.context_tokens is None and message.usage and message.num_turns <= 1:
+                self.context_tokens = context_tokens_from_usage(message.usage)
 
     def _emit_assistant_events(
         self, message: AssistantMessage
@@ -119,7 +148,9 @@ class StreamProcessor:
 
         suggestions: list[str] | None = None
 
-        if event_type == "assistant_text":
+        # The substring test is a plain memchr-style scan; the DOTALL regex only
+        # runs on the rare block that actually carries suggestions.
+        if event_type == "assistant_text" and PROMPT_SUGGESTIONS_TAG in text:
             match = PROMPT_SUGGESTIONS_PATTERN.search(text)
             if match:
                 try:
@@ -11,8 +11,13 @@ from uuid import UUID, uuid4
 from redis.asyncio import Redis
 from sqlalchemy import select
 
-from app.constants import REDIS_KEY_CHAT_STREAM_LIVE
+from app.constants import STREAM_SNAPSHOT_EVENT_KINDS
 from app.core.config import get_settings
+from app.core.metrics import (
+    STREAM_SNAPSHOT_FLUSH_EVENTS,
+    STREAM_SNAPSHOT_FLUSH_LATENCY,
+    STREAM_SNAPSHOT_FLUSHES,
+)
 from app.db.session import SessionLocal
 from app.models.db_models import (
     Chat,
@@ -30,6 +35,10 @@ from app.services.queue import QueueService
 from app.services.sandbox import SandboxService
 from app.services.streaming.cancellation import CancellationHandler
 from app.services.streaming.context_usage import ContextUsagePoller
+from app.services.streaming.flush_policy import create_flush_policy
+from app.services.streaming.journal import EventJournal
+from app.services.streaming.live import LiveEntry, LiveEventStream
+from app.services.streaming.sequence import EventSeqAllocator
 from app.services.streaming.types import (
     ChatStreamRequest,
     StreamEnvelope,
@@ -42,19 +51,6 @@ from app.utils.redis import redis_connection
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-SNAPSHOT_EVENT_KINDS = frozenset(
-    {
-        "assistant_text",
-        "assistant_thinking",
-        "tool_started",
-        "tool_completed",
-        "tool_failed",
-        "prompt_suggestions",
-        "system",
-        "permission_request",
-    }
-)
-
 
 class SessionUpdateCallback:
     def __init__(
@@ -113,6 +109,7 @@ class SessionUpdateCallback:
 class ChatStreamRuntime:
     _background_tasks: set[asyncio.Task[str]] = set()
     _background_task_chat_ids: dict[asyncio.Task[str], str] = {}
+    _active_runtimes: dict[str, ChatStreamRuntime] = {}
 
     def __init__(
         self,
@@ -138,12 +135,56 @@ class ChatStreamRuntime:
         self.last_seq: int = 0
         self.pending_since_flush: int = 0
         self.last_flush_at: float = time.monotonic()
+        self._last_event_at: float = self.last_flush_at
+        self._flush_policy = create_flush_policy()
+        self._idle_flush_task: asyncio.Task[None] | None = None
         self.message_service = MessageService(session_factory=session_factory)
-        self._event_buffer: list[tuple[str, dict[str, Any], dict[str, Any] | None]] = []
+        # (kind, payload, audit payload, applied to the snapshot)
+        self._event_buffer: list[
+            tuple[str, dict[str, Any], dict[str, Any] | None, bool]
+        ] = []
+        # Seqs come from blocks reserved up front, so event inserts never lock the
+        # chats row. Writes are serialized here to keep commit order equal to seq
+        # order for replay readers.
+        self._seq_allocator = EventSeqAllocator(
+            self.message_service,
+            chat.id,
+            block_size=settings.CHAT_EVENT_SEQ_BLOCK_SIZE,
+        )
+        self._write_lock = asyncio.Lock()
+        # In write-behind mode batches are handed to the process-wide journal and
+        # this tracks every commit still outstanding.
+        self._write_behind = settings.CHAT_EVENT_WRITE_BEHIND
+        self._journal_commits: list[asyncio.Future[None]] = []
 
         self.redis: Redis[str] | None = None
         self._cancel_event: asyncio.Event | None = None
         self._cancelled: bool = False
+        # Set when the next queued message continues on this run's CLI session.
+        self.follow_up: ChatStreamRequest | None = None
+
+    def _create_session_callback(self) -> SessionUpdateCallback:
+        return SessionUpdateCallback(
+            chat_id=self.chat_id,
+            assistant_message_id=self.assistant_message_id,
+            session_factory=self.session_factory,
+            session_container=self.session_container,
+        )
+
+    def _hand_over(self, request: ChatStreamRequest) -> ChatStreamRuntime:
+        # Passes the chat's Redis client, cancel event and active-runtime slot
+        # to the run of a follow-up on the same CLI session.
+        runtime = ChatStreamRuntime(
+            request=request,
+            sandbox_service=self.sandbox_service,
+            session_factory=self.session_factory,
+        )
+        runtime.redis, self.redis = self.redis, None
+        runtime._cancel_event = self._cancel_event
+        self._cancel_idle_flush()
+        if self._active_runtimes.get(self.chat_id) is self:
+            self._active_runtimes[self.chat_id] = runtime
+        return runtime
 
     async def _connect_redis(self) -> None:
         try:
@@ -206,6 +247,8 @@ class ChatStreamRuntime:
             )
             await self._save_final_snapshot(ai_service, MessageStreamStatus.FAILED)
             raise
+        finally:
+            await self._release_seq_tail()
 
     async def _consume_stream(
         self,
@@ -282,74 +325,218 @@ class ChatStreamRuntime:
             return 0
 
         audit = {"payload": StreamEnvelope.sanitize_payload(payload)}
-        if apply_snapshot and kind in SNAPSHOT_EVENT_KINDS:
-            self._event_buffer.append((kind, payload, audit))
+        if apply_snapshot and kind in STREAM_SNAPSHOT_EVENT_KINDS:
+            self._event_buffer.append((kind, payload, audit, True))
             self.snapshot.add_event(kind, payload)
             self.pending_since_flush += 1
+            self._last_event_at = time.monotonic()
+            self._flush_policy.observe_event(self._last_event_at)
             return 0
 
-        await self._flush_event_buffer()
-        seq = await self.message_service.append_event_with_next_seq(
-            chat_id=self.chat.id,
-            message_id=UUID(self.assistant_message_id),
-            stream_id=self.stream_id,
-            event_type=kind,
-            render_payload=payload,
-            audit_payload=audit,
-        )
-        self.last_seq = seq
-        await self._signal_redis()
-        return seq
+        async with self._write_lock:
+            self._event_buffer.append((kind, payload, audit, False))
+            await self._write_event_buffer()
+        return self.last_seq
 
     async def _flush_event_buffer(self) -> None:
+        async with self._write_lock:
+            await self._write_event_buffer()
+
+    async def _write_event_buffer(self) -> None:
         if not self._event_buffer or not self.assistant_message_id:
             return
+        # Events buffered while this write is in flight land in a fresh list and
+        # go out with the next flush.
         batch = self._event_buffer
-        seq = await self.message_service.append_events_batch(
+        self._event_buffer = []
+        try:
+            if self._write_behind:
+                await self._journal_event_buffer(batch)
+            else:
+                await self._append_event_batch(batch)
+        except Exception:
+            # Nothing from the batch was written: put it back ahead of anything
+            # buffered since, so the next flush or the final snapshot retries it.
+            self._event_buffer[:0] = batch
+            raise
+
+    async def _append_event_batch(
+        self, batch: list[tuple[str, dict[str, Any], dict[str, Any] | None, bool]]
+    ) -> None:
+        message_id = UUID(self.assistant_message_id or "")
+        seqs = await self._seq_allocator.allocate(len(batch))
+        entries = self._build_live_entries(
+            [
+                (seq, kind, payload)
+                for seq, (kind, payload, *_) in zip(seqs, batch, strict=True)
+            ]
+        )
+        self.last_seq = await self.message_service.append_events_batch(
             chat_id=self.chat.id,
-            message_id=UUID(self.assistant_message_id),
+            message_id=message_id,
             stream_id=self.stream_id,
             events=batch,
+            seqs=seqs,
+            envelopes=[entry.data for entry in entries],
         )
-        self._event_buffer = []
-        self.last_seq = seq
+        await self._publish_live(entries)
+
+    async def _journal_event_buffer(
+        self, batch: list[tuple[str, dict[str, Any], dict[str, Any] | None, bool]]
+    ) -> None:
+        # Surface a failed earlier commit before queueing more events behind it.
+        self._raise_failed_journal_commit()
+        message_id = UUID(self.assistant_message_id or "")
+        seqs = await self._seq_allocator.allocate(len(batch))
+        entries = self._build_live_entries(
+            [
+                (seq, kind, payload)
+                for seq, (kind, payload, *_) in zip(seqs, batch, strict=True)
+            ]
+        )
+        events = [
+            {
+                "chat_id": self.chat.id,
+                "message_id": message_id,
+                "stream_id": self.stream_id,
+                "seq": seq,
+                "event_type": kind,
+                "render_payload": payload,
+                "audit_payload": audit,
+                "envelope": entry.data,
+                "in_snapshot": in_snapshot,
+            }
+            for seq, (kind, payload, audit, in_snapshot), entry in zip(
+                seqs, batch, entries, strict=True
+            )
+        ]
+        commit = await EventJournal.get(self.session_factory).submit(
+            self.chat_id, events, entries
+        )
+        self._journal_commits.append(commit)
+        self.last_seq = seqs[-1]
 
-    async def _signal_redis(self) -> None:
+    def _raise_failed_journal_commit(self) -> None:
+        done = [commit for commit in self._journal_commits if commit.done()]
+        self._journal_commits = [
+            commit for commit in self._journal_commits if not commit.done()
+        ]
+        # exception() marks every failure as retrieved, not just the one raised.
+        errors = [commit.exception() for commit in done]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    async def _wait_for_journal(self) -> None:
+        commits, self._journal_commits = self._journal_commits, []
+        results = await asyncio.gather(*commits, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _release_seq_tail(self) -> None:
+        try:
+            await self._seq_allocator.release()
+        except Exception as exc:
+            logger.warning(
+                "Failed to release unused event seqs for chat %s: %s",
+                self.chat_id,
+                exc,
+            )
+
+    def _build_live_entries(
+        self, events: list[tuple[int, str, dict[str, Any]]]
+    ) -> list[LiveEntry]:
+        # The envelope text built here is stored with the event row and sent as
+        # is on live delivery and replay, so each event is serialized once.
+        message_id = UUID(self.assistant_message_id or "")
+        return [
+            LiveEntry(
+                seq=seq,
+                kind=kind,
+                data=StreamEnvelope.dumps(
+                    StreamEnvelope.build(
+                        chat_id=self.chat.id,
+                        message_id=message_id,
+                        stream_id=self.stream_id,
+                        seq=seq,
+                        kind=kind,
+                        payload=payload,
+                    )
+                ),
+            )
+            for seq, kind, payload in events
+        ]
+
+    async def _publish_live(self, entries: list[LiveEntry]) -> None:
         if not self.redis:
             return
         try:
-            await self.redis.publish(
-                REDIS_KEY_CHAT_STREAM_LIVE.format(chat_id=self.chat_id),
-                "flush",
-            )
+            await LiveEventStream.publish(self.redis, self.chat_id, entries)
         except Exception as exc:
             logger.warning(
-                "Failed to publish Redis signal for chat %s: %s",
+                "Failed to publish live events for chat %s: %s",
                 self.chat_id,
                 exc,
             )
 
-    async def _flush_snapshot(self, *, force: bool) -> None:
+    async def _flush_snapshot(self, *, force: bool, reason: str = "threshold") -> None:
         if not self.assistant_message_id:
             return
         if not force:
             elapsed_ms = (time.monotonic() - self.last_flush_at) * 1000
-            if self.pending_since_flush == 0:
-                return
-            if elapsed_ms < 200 and self.pending_since_flush < 24:
+            if not self._flush_policy.should_flush(
+                self.pending_since_flush, elapsed_ms
+            ):
+                self._arm_idle_flush()
                 return
 
-        await self._flush_event_buffer()
-        await self.message_service.update_message_snapshot(
-            UUID(self.assistant_message_id),
-            content_text=self.snapshot.content_text,
-            content_render=self.snapshot.to_render(),
-            last_seq=self.last_seq,
-            active_stream_id=self.stream_id,
-        )
-        await self._signal_redis()
+        # Snapshot events are already persisted append-only in message_events and
+        # each batch write advances the message cursor, so intermediate flushes are
+        # just the batch write. The full render is written once by
+        # _save_final_snapshot and rebuilt from events for in-progress reads.
+        pending = self.pending_since_flush
         self.pending_since_flush = 0
+        started = time.monotonic()
+        await self._flush_event_buffer()
         self.last_flush_at = time.monotonic()
+        if pending:
+            latency_ms = (self.last_flush_at - started) * 1000
+            self._flush_policy.observe_flush(pending, latency_ms)
+            STREAM_SNAPSHOT_FLUSHES.labels(reason=reason).inc()
+            STREAM_SNAPSHOT_FLUSH_EVENTS.observe(pending)
+            STREAM_SNAPSHOT_FLUSH_LATENCY.observe(latency_ms / 1000)
+
+    def _arm_idle_flush(self) -> None:
+        if not self.pending_since_flush:
+            return
+        if self._idle_flush_task is None or self._idle_flush_task.done():
+            self._idle_flush_task = asyncio.create_task(self._idle_flush_loop())
+
+    async def _idle_flush_loop(self) -> None:
+        # Flushes whatever is pending once no event arrived for the policy's idle
+        # delay, e.g. while a slow tool runs between two events.
+        while self.pending_since_flush:
+            deadline = self._last_event_at + self._flush_policy.idle_delay_ms() / 1000
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                # Shielded so cancelling the timer never interrupts a batch write.
+                await asyncio.shield(self._flush_snapshot(force=True, reason="idle"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(
+                    "Idle snapshot flush failed for chat %s: %s", self.chat_id, exc
+                )
+                return
+
+    def _cancel_idle_flush(self) -> None:
+        if self._idle_flush_task and not self._idle_flush_task.done():
+            self._idle_flush_task.cancel()
+        self._idle_flush_task = None
 
     async def _save_final_snapshot(
         self,
@@ -358,7 +545,9 @@ class ChatStreamRuntime:
     ) -> None:
         if not self.assistant_message_id:
             return
+        self._cancel_idle_flush()
         await self._flush_event_buffer()
+        await self._wait_for_journal()
         await self.message_service.update_message_snapshot(
             UUID(self.assistant_message_id),
             content_text=self.snapshot.content_text,
@@ -379,7 +568,9 @@ class ChatStreamRuntime:
 
         if status == MessageStreamStatus.COMPLETED:
             await self._create_checkpoint()
-            queue_processed = await self._process_next_queued()
+            queue_processed = await self._process_next_queued(ai_service)
+            if self.follow_up is None:
+                await ai_service.end_session()
             if not queue_processed:
                 await self._emit_final_context_usage(ai_service)
                 await self.emit_event(
@@ -388,6 +579,7 @@ class ChatStreamRuntime:
                     apply_snapshot=False,
                 )
         else:
+            await ai_service.end_session()
             await self._emit_final_context_usage(ai_service)
             terminal_kind = (
                 "cancelled" if status == MessageStreamStatus.INTERRUPTED else "complete"
@@ -398,6 +590,7 @@ class ChatStreamRuntime:
                 apply_snapshot=False,
             )
 
+        await self._wait_for_journal()
         return final_content
 
     async def _create_checkpoint(self) -> None:
@@ -425,7 +618,7 @@ class ChatStreamRuntime:
         except Exception as exc:
             logger.warning("Failed to create checkpoint: %s", exc)
 
-    async def _process_next_queued(self) -> bool:
+    async def _process_next_queued(self, ai_service: ClaudeAgentService) -> bool:
         try:
             async with redis_connection() as redis:
                 queue_service = QueueService(redis)
@@ -471,30 +664,43 @@ class ChatStreamRuntime:
                 self.chat.sandbox_id or "",
                 user_settings,
             )
+            session_id = self.session_container.get("session_id") or (
+                self.chat.session_id
+            )
 
-            ChatStreamRuntime.start_background_chat(
-                ChatStreamRequest(
-                    prompt=next_msg["content"],
-                    system_prompt=system_prompt,
-                    custom_instructions=(
-                        user_settings.custom_instructions if user_settings else None
-                    ),
-                    chat_data={
-                        "id": self.chat_id,
-                        "user_id": str(self.chat.user_id),
-                        "title": self.chat.title,
-                        "sandbox_id": self.chat.sandbox_id,
-                        "session_id": self.chat.session_id,
-                    },
-                    permission_mode=next_msg.get("permission_mode", "auto"),
-                    model_id=next_msg["model_id"],
-                    session_id=self.chat.session_id,
-                    assistant_message_id=str(assistant_message.id),
-                    thinking_mode=next_msg.get("thinking_mode"),
-                    attachments=next_msg.get("attachments"),
-                    is_custom_prompt=False,
-                )
+            request = ChatStreamRequest(
+                prompt=next_msg["content"],
+                system_prompt=system_prompt,
+                custom_instructions=(
+                    user_settings.custom_instructions if user_settings else None
+                ),
+                chat_data={
+                    "id": self.chat_id,
+                    "user_id": str(self.chat.user_id),
+                    "title": self.chat.title,
+                    "sandbox_id": self.chat.sandbox_id,
+                    "session_id": session_id,
+                },
+                permission_mode=next_msg.get("permission_mode", "auto"),
+                model_id=next_msg["model_id"],
+                session_id=session_id,
+                assistant_message_id=str(assistant_message.id),
+                thinking_mode=next_msg.get("thinking_mode"),
+                attachments=next_msg.get("attachments"),
+                is_custom_prompt=False,
             )
+            if ai_service.can_continue_session(
+                model_id=request.model_id,
+                permission_mode=request.permission_mode,
+                thinking_mode=request.thinking_mode,
+                system_prompt=request.system_prompt,
+            ):
+                # This run's CLI is idle with stdin still open, so execute_chat
+                # writes the follow-up to it instead of spawning a new one.
+                self.follow_up = request
+            else:
+                await ai_service.end_session()
+                ChatStreamRuntime.start_background_chat(request)
 
             logger.info(
                 "Queued message %s for chat %s has been processed",
@@ -508,27 +714,30 @@ class ChatStreamRuntime:
             return False
 
     async def _emit_final_context_usage(self, ai_service: ClaudeAgentService) -> None:
+        if not self.redis:
+            return
         session_id = (
             self.session_container.get("session_id")
             if self.session_container
             else self.chat.session_id
         )
-        if (
-            not session_id
-            or not self.sandbox_id
-            or not self.user_id
-            or not self.model_id
-            or not self.redis
-        ):
-            return
 
         await ContextUsagePoller(runtime=self).refresh(
             ai_service=ai_service,
-            session_id=str(session_id),
+            session_id=str(session_id) if session_id else None,
         )
 
     @classmethod
     async def stop_background_chats(cls) -> None:
+        try:
+            await cls._wait_for_background_tasks()
+        finally:
+            # Runs still finishing above may have journaled their last events;
+            # drain them so nothing buffered is lost on shutdown.
+            await EventJournal.shutdown()
+
+    @classmethod
+    async def _wait_for_background_tasks(cls) -> None:
         if not cls._background_tasks:
             return
 
@@ -567,6 +776,10 @@ class ChatStreamRuntime:
         for task in finished_tasks:
             cls._background_task_chat_ids.pop(task, None)
 
+    @classmethod
+    def get_active_runtime(cls, chat_id: str) -> ChatStreamRuntime | None:
+        return cls._active_runtimes.get(chat_id)
+
     @classmethod
     def has_active_chat(cls, chat_id: str) -> bool:
         if CancellationHandler.get_event(chat_id) is not None:
@@ -636,6 +849,8 @@ class ChatStreamRuntime:
             message = await message_service.get_message(message_uuid)
             if not message or message.stream_status != MessageStreamStatus.IN_PROGRESS:
                 return
+            # get_message rebuilds the render of in-progress messages from their
+            # persisted events, so this materializes whatever was streamed so far.
             await message_service.update_message_snapshot(
                 message_uuid,
                 content_text=message.content_text or "",
@@ -665,6 +880,7 @@ class ChatStreamRuntime:
             session_factory=session_factory,
         )
         cancel_event = CancellationHandler.register(runtime.chat_id)
+        cls._active_runtimes[runtime.chat_id] = runtime
         try:
             await runtime._connect_redis()
             runtime._cancel_event = cancel_event
@@ -672,12 +888,6 @@ class ChatStreamRuntime:
             async with ClaudeAgentService(
                 session_factory=runtime.session_factory
             ) as ai_service:
-                session_callback = SessionUpdateCallback(
-                    chat_id=runtime.chat_id,
-                    assistant_message_id=request.assistant_message_id,
-                    session_factory=runtime.session_factory,
-                    session_container=runtime.session_container,
-                )
                 user = User(id=runtime.chat.user_id)
                 stream = ai_service.get_ai_stream(
                     prompt=request.prompt,
@@ -688,28 +898,43 @@ class ChatStreamRuntime:
                     permission_mode=request.permission_mode,
                     model_id=request.model_id,
                     session_id=request.session_id,
-                    session_callback=session_callback,
+                    session_callback=runtime._create_session_callback(),
                     thinking_mode=request.thinking_mode,
                     attachments=request.attachments,
                     is_custom_prompt=request.is_custom_prompt,
                 )
-                context_poller = ContextUsagePoller(runtime=runtime)
-                poll_task, stop_event = context_poller.start(ai_service)
-                try:
-                    return await runtime.run(ai_service, stream)
-                finally:
-                    await ContextUsagePoller.stop(poll_task, stop_event)
+                while True:
+                    context_poller = ContextUsagePoller(runtime=runtime)
+                    poll_task, stop_event = context_poller.start(ai_service)
+                    try:
+                        result = await runtime.run(ai_service, stream)
+                    finally:
+                        await ContextUsagePoller.stop(poll_task, stop_event)
+
+                    follow_up = runtime.follow_up
+                    if follow_up is None:
+                        return result
+                    runtime = runtime._hand_over(follow_up)
+                    stream = ai_service.get_follow_up_stream(
+                        prompt=follow_up.prompt,
+                        custom_instructions=follow_up.custom_instructions,
+                        session_callback=runtime._create_session_callback(),
+                        attachments=follow_up.attachments,
+                    )
             raise RuntimeError("ClaudeAgentService exited without returning")
 
         except asyncio.CancelledError:
             await cls._mark_message_failed(
-                assistant_message_id=request.assistant_message_id,
+                assistant_message_id=runtime.assistant_message_id,
                 session_factory=session_factory,
                 stream_status=MessageStreamStatus.INTERRUPTED,
             )
             raise
         finally:
+            runtime._cancel_idle_flush()
             CancellationHandler.unregister(runtime.chat_id, cancel_event)
+            if cls._active_runtimes.get(runtime.chat_id) is runtime:
+                cls._active_runtimes.pop(runtime.chat_id, None)
             await runtime._close_redis()
 
     @classmethod
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+if TYPE_CHECKING:
+    from app.services.message import MessageService
+
+
+class EventSeqAllocator:
+    def __init__(
+        self,
+        message_service: MessageService,
+        chat_id: UUID,
+        *,
+        block_size: int,
+    ) -> None:
+        self._message_service = message_service
+        self._chat_id = chat_id
+        self._block_size = max(block_size, 1)
+        self._next_seq = 1
+        self._end_seq = 0
+        self._lock = asyncio.Lock()
+
+    async def allocate(self, count: int) -> list[int]:
+        async with self._lock:
+            seqs = list(
+                range(self._next_seq, min(self._end_seq + 1, self._next_seq + count))
+            )
+            missing = count - len(seqs)
+            if missing > 0:
+                reserve = max(missing, self._block_size)
+                self._end_seq = await self._message_service.reserve_event_seqs(
+                    self._chat_id, reserve
+                )
+                block_start = self._end_seq - reserve + 1
+                seqs.extend(range(block_start, block_start + missing))
+                self._next_seq = block_start + missing
+            else:
+                self._next_seq += count
+            return seqs
+
+    async def release(self) -> None:
+        # Hands the unused tail of the current block back to the chat when nobody
+        # reserved after it. An abandoned tail is a seq gap, and live readers
+        # fill every gap they see from the persisted event log.
+        async with self._lock:
+            if self._next_seq > self._end_seq:
+                return
+            if await self._message_service.release_event_seqs(
+                self._chat_id,
+                reserved_end=self._end_seq,
+                last_used=self._next_seq - 1,
+            ):
+                self._end_seq = self._next_seq - 1
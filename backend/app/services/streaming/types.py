@@ -2,10 +2,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from functools import lru_cache
 from hashlib import sha256
 from typing import Any, Literal, TypedDict
 from uuid import UUID
 
+import orjson
+
 from app.models.types import JSONDict, JSONValue
 
 
@@ -93,6 +96,14 @@ SENSITIVE_KEY_PARTS = (
 )
 
 
+@lru_cache(maxsize=4096)
+def is_sensitive_key(key: str) -> bool:
+    # Payloads reuse a small vocabulary of keys (tool input fields, env var
+    # names), so each one is lowercased and classified once per worker.
+    lower = key.lower()
+    return any(part in lower for part in SENSITIVE_KEY_PARTS)
+
+
 @dataclass
 class StreamSnapshotAccumulator:
     events: list[dict[str, Any]] = field(default_factory=list)
@@ -135,13 +146,30 @@ class StreamEnvelope:
             "ts": datetime.now(timezone.utc).isoformat(),
         }
 
+    @staticmethod
+    def dumps(envelope: dict[str, Any]) -> str:
+        # Envelopes are serialized once per event and the text is reused for the
+        # event row, the live stream and every replay.
+        return orjson.dumps(envelope, option=orjson.OPT_NON_STR_KEYS).decode()
+
     @staticmethod
     def sanitize_payload(value: Any) -> JSONValue:
+        # Strings are by far the most common leaf, so they are checked first.
+        if isinstance(value, str):
+            if len(value) > MAX_AUDIT_STRING_LENGTH:
+                digest = sha256(value.encode("utf-8", errors="ignore")).hexdigest()
+                return {
+                    "value": value[:MAX_AUDIT_STRING_LENGTH],
+                    "truncated": True,
+                    "sha256": digest,
+                    "original_length": len(value),
+                }
+            return value
+
         if isinstance(value, dict):
             redacted: JSONDict = {}
             for key, nested in value.items():
-                lower = key.lower()
-                if any(part in lower for part in SENSITIVE_KEY_PARTS):
+                if is_sensitive_key(key if isinstance(key, str) else str(key)):
                     redacted[key] = "[REDACTED]"
                     continue
                 redacted[key] = StreamEnvelope.sanitize_payload(nested)
@@ -153,17 +181,6 @@ class StreamEnvelope:
         if isinstance(value, (bytes, bytearray, memoryview)):
             return "[BINARY_OMITTED]"
 
-        if isinstance(value, str):
-            if len(value) > MAX_AUDIT_STRING_LENGTH:
-                digest = sha256(value.encode("utf-8", errors="ignore")).hexdigest()
-                return {
-                    "value": value[:MAX_AUDIT_STRING_LENGTH],
-                    "truncated": True,
-                    "sha256": digest,
-                    "original_length": len(value),
-                }
-            return value
-
         if isinstance(value, (int, float, bool)) or value is None:
             return value
 
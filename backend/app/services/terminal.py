@@ -7,7 +7,7 @@ from fastapi import WebSocket
 
 from app.constants import PTY_INPUT_QUEUE_SIZE
 from app.services.sandbox import SandboxService
-from app.services.sandbox_providers import SandboxProviderType, create_sandbox_provider
+from app.services.sandbox_providers import SandboxProviderRegistry, SandboxProviderType
 from app.utils.queue import drain_queue, put_with_overflow
 
 logger = logging.getLogger(__name__)
@@ -176,7 +176,7 @@ class TerminalSessionRegistry:
             if existing:
                 return existing
 
-            provider = create_sandbox_provider(provider_type, api_key)
+            provider = SandboxProviderRegistry.acquire(provider_type, api_key)
             service = SandboxService(provider)
 
             record = TerminalSessionRecord(
@@ -2,10 +2,12 @@ from app.services.transports.docker import DockerSandboxTransport
 from app.services.transports.e2b import E2BSandboxTransport
 from app.services.transports.host import HostSandboxTransport
 from app.services.transports.modal import ModalSandboxTransport
+from app.services.transports.replay import ReplaySandboxTransport
 
 __all__ = [
     "DockerSandboxTransport",
     "E2BSandboxTransport",
     "HostSandboxTransport",
     "ModalSandboxTransport",
+    "ReplaySandboxTransport",
 ]
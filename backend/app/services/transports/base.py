@@ -1,22 +1,36 @@
 import asyncio
 import json
-import re
 import shlex
 from abc import ABC, abstractmethod
-from collections.abc import AsyncIterable, AsyncIterator
+from collections.abc import AsyncIterable, AsyncIterator, Callable
 from contextlib import suppress
 from dataclasses import asdict
 from types import TracebackType
 from typing import Any, Self
 
-from claude_agent_sdk._errors import CLIConnectionError, CLIJSONDecodeError
+from claude_agent_sdk._errors import CLIConnectionError
 from claude_agent_sdk._internal.transport import Transport
 from claude_agent_sdk._version import __version__ as sdk_version
 from claude_agent_sdk.types import ClaudeAgentOptions
 
+from app.core.config import get_settings
+from app.services.transports.channel import StdoutChannel, StdoutChannelStats
+from app.services.transports.framing import CliOutputFramer
+from app.services.transports.launch_artifacts import (
+    INLINE_MCP_SERVERS,
+    LAUNCH_ARTIFACT_DIR,
+    MCP_CONFIG_ARTIFACT,
+    SYSTEM_PROMPT_ARTIFACT,
+    LaunchArtifactCache,
+    build_launch_artifacts,
+    mcp_servers_for_cli,
+)
+
+settings = get_settings()
+
 DEFAULT_MAX_BUFFER_SIZE = 1024 * 1024 * 10  # 10MB
-STDOUT_QUEUE_MAXSIZE = 32
-ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+STDOUT_HIGH_WATERMARK = 1024 * 1024 * 4  # 4MB
+STDOUT_LOW_WATERMARK = 1024 * 1024  # 1MB
 
 
 class BaseSandboxTransport(Transport, ABC):
@@ -28,23 +42,34 @@ class BaseSandboxTransport(Transport, ABC):
         sandbox_id: str,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        persistent: bool = False,
     ) -> None:
         self._sandbox_id = sandbox_id
         self._prompt = prompt
         self._options = options
+        # A persistent transport serves several turns of one CLI process, so
+        # reading continues past each "result" message until the process exits.
+        self._persistent = persistent
         self._max_buffer_size = (
             options.max_buffer_size
             if options.max_buffer_size is not None
             else DEFAULT_MAX_BUFFER_SIZE
         )
-        self._json_decoder = json.JSONDecoder()
         self._monitor_task: asyncio.Task[None] | None = None
-        self._stdout_queue: asyncio.Queue[str | object] = asyncio.Queue(
-            maxsize=STDOUT_QUEUE_MAXSIZE
+        self._stdout_queue = StdoutChannel(
+            high_watermark=STDOUT_HIGH_WATERMARK,
+            low_watermark=STDOUT_LOW_WATERMARK,
+            label=self._metrics_label(),
         )
         self._ready = False
         self._exit_error: Exception | None = None
         self._stdin_closed = False
+        # Receives the usage block of each top-level assistant message. The SDK
+        # drops it when building AssistantMessage, so it is only visible here.
+        self.usage_handler: Callable[[dict[str, Any]], None] | None = None
+        # Paths of launch artifacts present in the sandbox, by artifact kind;
+        # _build_command references these instead of inlining the content.
+        self._launch_paths: dict[str, str] = {}
 
     async def __aenter__(self) -> Self:
         return self
@@ -93,15 +118,51 @@ class BaseSandboxTransport(Transport, ABC):
             raise CLIConnectionError("Cannot write after input has been closed")
 
     async def _put_sentinel(self) -> None:
-        try:
-            self._stdout_queue.put_nowait(self._SENTINEL)
-        except asyncio.QueueFull:
-            pass
+        self._stdout_queue.put_nowait(self._SENTINEL)
+
+    @classmethod
+    def _metrics_label(cls) -> str:
+        return cls.__name__.removesuffix("SandboxTransport").lower()
+
+    def stdout_stats(self) -> StdoutChannelStats:
+        return self._stdout_queue.stats()
 
     @abstractmethod
     async def connect(self) -> None:
         pass
 
+    @abstractmethod
+    async def _write_launch_artifact(self, path: str, content: bytes) -> None:
+        pass
+
+    def _launch_artifact_path(self, file_name: str) -> str:
+        return f"{LAUNCH_ARTIFACT_DIR}/{file_name}"
+
+    async def _prepare_launch_artifacts(self) -> None:
+        # Called by connect() before _build_command. An artifact that cannot be
+        # written is simply passed inline as before. Writers also remove the
+        # older files of the same kind.
+        self._launch_paths = {}
+        if not settings.CLAUDE_LAUNCH_ARTIFACTS_ENABLED:
+            return
+        label = self._metrics_label()
+        for kind, artifact in build_launch_artifacts(self._options).items():
+            path = self._launch_artifact_path(artifact.file_name)
+            key = (label, self._sandbox_id, artifact.file_name)
+            if not LaunchArtifactCache.contains(key):
+                try:
+                    await self._write_launch_artifact(path, artifact.content)
+                except Exception as exc:
+                    self._get_logger().warning(
+                        "Failed to write launch artifact %s to sandbox %s: %s",
+                        artifact.file_name,
+                        self._sandbox_id,
+                        exc,
+                    )
+                    continue
+                LaunchArtifactCache.add(key)
+            self._launch_paths[kind] = path
+
     @abstractmethod
     async def _cleanup_resources(self) -> None:
         pass
@@ -126,6 +187,19 @@ class BaseSandboxTransport(Transport, ABC):
         self._monitor_task = None
         await self._cleanup_resources()
         self._stdin_closed = False
+        stats = self._stdout_queue.stats()
+        if stats.items_total:
+            self._get_logger().debug(
+                "%s stdout: %d bytes in %d chunks, peak %d bytes queued, "
+                "reader stalled %d times for %.3fs",
+                self.__class__.__name__,
+                stats.bytes_total,
+                stats.items_total,
+                stats.peak_bytes_in_flight,
+                stats.stalls,
+                stats.stall_seconds,
+            )
+        self._stdout_queue.clear()
         await self._put_sentinel()
 
     async def write(self, data: str) -> None:
@@ -163,18 +237,28 @@ class BaseSandboxTransport(Transport, ABC):
         cli_binary = str(self._options.cli_path) if self._options.cli_path else "claude"
         cmd = [cli_binary, "--output-format", "stream-json", "--verbose"]
 
+        system_prompt_path = self._launch_paths.get(SYSTEM_PROMPT_ARTIFACT)
         if self._options.system_prompt is None:
             pass
         elif isinstance(self._options.system_prompt, str):
-            cmd.extend(["--system-prompt", self._options.system_prompt])
+            if system_prompt_path:
+                cmd.extend(["--system-prompt-file", system_prompt_path])
+            else:
+                cmd.extend(["--system-prompt", self._options.system_prompt])
         else:
             if (
                 self._options.system_prompt.get("type") == "preset"
                 and "append" in self._options.system_prompt
             ):
-                cmd.extend(
-                    ["--append-system-prompt", self._options.system_prompt["append"]]
-                )
+                if system_prompt_path:
+                    cmd.extend(["--append-system-prompt-file", system_prompt_path])
+                else:
+                    cmd.extend(
+                        [
+                            "--append-system-prompt",
+                            self._options.system_prompt["append"],
+                        ]
+                    )
 
         if self._options.allowed_tools:
             cmd.extend(["--allowedTools", ",".join(self._options.allowed_tools)])
@@ -210,17 +294,20 @@ class BaseSandboxTransport(Transport, ABC):
 
         if self._options.mcp_servers:
             if isinstance(self._options.mcp_servers, dict):
-                servers_for_cli: dict[str, Any] = {}
-                for name, config in self._options.mcp_servers.items():
-                    if isinstance(config, dict) and config.get("type") == "sdk":
-                        servers_for_cli[name] = {
-                            key: value
-                            for key, value in config.items()
-                            if key != "instance"
-                        }
-                    else:
-                        servers_for_cli[name] = config
-                if servers_for_cli:
+                servers_for_cli = mcp_servers_for_cli(self._options.mcp_servers)
+                mcp_config_path = self._launch_paths.get(MCP_CONFIG_ARTIFACT)
+                if mcp_config_path:
+                    # --mcp-config merges every file or JSON string it is given.
+                    inline = {
+                        name: config
+                        for name, config in servers_for_cli.items()
+                        if name in INLINE_MCP_SERVERS
+                    }
+                    mcp_configs = [mcp_config_path]
+                    if inline:
+                        mcp_configs.append(json.dumps({"mcpServers": inline}))
+                    cmd.extend(["--mcp-config", *mcp_configs])
+                elif servers_for_cli:
                     cmd.extend(
                         ["--mcp-config", json.dumps({"mcpServers": servers_for_cli})]
                     )
@@ -261,106 +348,52 @@ class BaseSandboxTransport(Transport, ABC):
         cmd.extend(["--input-format", "stream-json"])
         return shlex.join(cmd)
 
-    def _parse_json_buffer(self, buffer: str) -> tuple[str, list[Any]]:
-        # Parses concatenated JSON objects from a buffer, returning unparsed remainder.
-        # Uses raw_decode instead of json.loads because the buffer may contain multiple
-        # JSON objects back-to-back (e.g., '{"a":1}{"b":2}'). json.loads would fail on this,
-        # but raw_decode returns the offset where parsing stopped, allowing us to extract
-        # each object one at a time and preserve any incomplete trailing data for the next chunk.
-        messages: list[Any] = []
-        working = buffer
-
-        while working:
-            stripped = working.lstrip()
-            leading = len(working) - len(stripped)
-            if leading:
-                working = stripped
-            try:
-                data, offset = self._json_decoder.raw_decode(working)
-            except json.JSONDecodeError:
-                break
-            messages.append(data)
-            working = working[offset:]
-
-        return working, messages
+    def _report_usage(self, data: Any) -> None:
+        if self.usage_handler is None or not isinstance(data, dict):
+            return
+        if data.get("type") != "assistant" or data.get("parent_tool_use_id"):
+            return
+        message = data.get("message")
+        usage = message.get("usage") if isinstance(message, dict) else None
+        if isinstance(usage, dict):
+            self.usage_handler(usage)
 
     async def _parse_cli_output(self) -> AsyncIterator[dict[str, Any]]:
-        # Stream-based JSON parser that processes Claude CLI output incrementally.
-        # The CLI outputs newline-delimited JSON messages, but terminal output may contain
-        # ANSI escape codes (colors, cursor movement) that must be stripped before parsing.
-        # Uses a state machine: json_started tracks if we've found the first '{' or '[',
-        # allowing us to skip any non-JSON preamble from the CLI startup.
+        # The CLI writes newline-delimited JSON; chunks arrive as raw bytes or
+        # text and CliOutputFramer only decodes complete lines, so the cost stays
+        # linear in the size of the output however finely it is fragmented.
         if not self._ready and not self._monitor_task:
             raise CLIConnectionError("Transport is not connected")
 
-        json_buffer = ""
-        json_started = False
+        framer = CliOutputFramer(self._max_buffer_size)
         should_stop = False
 
-        while True:
+        while not should_stop:
             chunk = await self._stdout_queue.get()
 
             if chunk is self._SENTINEL:
+                for data in framer.finish():
+                    self._report_usage(data)
+                    yield data
                 break
-            if not isinstance(chunk, str):
+            if not isinstance(chunk, (bytes, str)):
                 continue
 
-            # Strip ANSI escape codes (e.g., \x1B[32m for colors) that terminals inject.
-            # These codes break JSON parsing if not removed.
-            clean_chunk = ANSI_ESCAPE_RE.sub("", chunk)
-            clean_chunk = clean_chunk.replace("\r", "")
-
-            json_lines = clean_chunk.split("\n")
-            for json_line in json_lines:
-                json_line = json_line.strip()
-                if not json_line:
-                    continue
-
-                if not json_started:
-                    first_brace_positions = [
-                        pos
-                        for pos in (json_line.find("{"), json_line.find("["))
-                        if pos != -1
-                    ]
-                    if not first_brace_positions:
-                        continue
-                    json_line = json_line[min(first_brace_positions) :]
-                    json_started = True
-
-                json_buffer += json_line
-                if len(json_buffer) > self._max_buffer_size:
-                    json_buffer = ""
-                    raise CLIJSONDecodeError(
-                        json_line,
-                        ValueError(
-                            f"CLI output exceeded max buffer size of {self._max_buffer_size}"
-                        ),
-                    )
-
-                json_buffer, parsed_messages = self._parse_json_buffer(json_buffer)
-                if parsed_messages:
-                    for data in parsed_messages:
-                        yield data
-                        if isinstance(data, dict) and data.get("type") == "result":
-                            json_buffer = ""
-                            should_stop = True
-                            break
-                    if not json_buffer:
-                        json_started = False
-                if should_stop:
-                    break
-            if should_stop:
-                break
-
-        if json_buffer:
-            leftover, parsed_messages = self._parse_json_buffer(json_buffer)
-            for data in parsed_messages:
+            for data in framer.feed(chunk):
+                self._report_usage(data)
                 yield data
-            if leftover.strip():
-                try:
-                    json.loads(leftover)
-                except json.JSONDecodeError as exc:
-                    raise CLIJSONDecodeError(leftover, exc) from exc
+                if (
+                    not self._persistent
+                    and isinstance(data, dict)
+                    and data.get("type") == "result"
+                ):
+                    framer.reset()
+                    should_stop = True
+                    break
 
         if self._exit_error:
+            if self._launch_paths:
+                # The CLI may have failed on a launch file that is gone from the
+                # sandbox, so the next launch writes them again.
+                LaunchArtifactCache.forget_sandbox(self._sandbox_id)
             raise self._exit_error
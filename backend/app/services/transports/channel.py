@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from app.core.metrics import (
+    TRANSPORT_STDOUT_BYTES,
+    TRANSPORT_STDOUT_BYTES_IN_FLIGHT,
+    TRANSPORT_STDOUT_DEPTH,
+    TRANSPORT_STDOUT_READER_STALL,
+)
+
+
+@dataclass
+class StdoutChannelStats:
+    depth: int
+    bytes_in_flight: int
+    peak_bytes_in_flight: int
+    items_total: int
+    bytes_total: int
+    stalls: int
+    stall_seconds: float
+
+
+class StdoutChannel:
+    # Carries CLI stdout chunks from a transport's reader to the message parser
+    # with a byte budget instead of an item count. Once the queued bytes reach
+    # high_watermark the reader waits until the parser has drained them to
+    # low_watermark, so memory stays bounded however large single chunks are
+    # and the socket is paused in bursts rather than per chunk. Time the reader
+    # spends waiting is a slow consumer (parser or persistence), never a slow
+    # sandbox.
+    #
+    # put_nowait bypasses the budget and is meant for control items such as
+    # the end-of-stream sentinel, which count as zero bytes.
+
+    def __init__(self, *, high_watermark: int, low_watermark: int, label: str) -> None:
+        self._high_watermark = max(high_watermark, 1)
+        self._low_watermark = min(max(low_watermark, 0), self._high_watermark)
+        self._items: deque[tuple[bytes | str | object, int]] = deque()
+        self._bytes = 0
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._peak_bytes = 0
+        self._items_total = 0
+        self._bytes_total = 0
+        self._stalls = 0
+        self._stall_seconds = 0.0
+        self._bytes_gauge = TRANSPORT_STDOUT_BYTES_IN_FLIGHT.labels(transport=label)
+        self._depth_gauge = TRANSPORT_STDOUT_DEPTH.labels(transport=label)
+        self._bytes_counter = TRANSPORT_STDOUT_BYTES.labels(transport=label)
+        self._stall_histogram = TRANSPORT_STDOUT_READER_STALL.labels(transport=label)
+
+    @property
+    def bytes_in_flight(self) -> int:
+        return self._bytes
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def stats(self) -> StdoutChannelStats:
+        return StdoutChannelStats(
+            depth=len(self._items),
+            bytes_in_flight=self._bytes,
+            peak_bytes_in_flight=self._peak_bytes,
+            items_total=self._items_total,
+            bytes_total=self._bytes_total,
+            stalls=self._stalls,
+            stall_seconds=self._stall_seconds,
+        )
+
+    async def put(self, item: bytes | str | object) -> None:
+        if not self._writable.is_set():
+            started = time.monotonic()
+            await self._writable.wait()
+            stalled = time.monotonic() - started
+            self._stalls += 1
+            self._stall_seconds += stalled
+            self._stall_histogram.observe(stalled)
+        self._append(item, self._size(item))
+
+    def put_nowait(self, item: object) -> None:
+        self._append(item, 0)
+
+    async def get(self) -> bytes | str | object:
+        while not self._items:
+            self._readable.clear()
+            await self._readable.wait()
+        item, size = self._items.popleft()
+        self._bytes -= size
+        self._depth_gauge.dec()
+        if size:
+            self._bytes_gauge.dec(size)
+        if not self._writable.is_set() and self._bytes <= self._low_watermark:
+            self._writable.set()
+        return item
+
+    def clear(self) -> None:
+        # Drops whatever the parser will no longer read and releases a waiting
+        # reader.
+        if self._items:
+            self._depth_gauge.dec(len(self._items))
+            self._bytes_gauge.dec(self._bytes)
+        self._items.clear()
+        self._bytes = 0
+        self._writable.set()
+
+    @staticmethod
+    def _size(item: bytes | str | object) -> int:
+        # E2B hands over decoded text, so str chunks are budgeted by their
+        # UTF-8 size like the raw bytes the other transports read.
+        if isinstance(item, bytes):
+            return len(item)
+        if isinstance(item, str):
+            return len(item.encode())
+        return 0
+
+    def _append(self, item: bytes | str | object, size: int) -> None:
+        self._items.append((item, size))
+        self._depth_gauge.inc()
+        self._items_total += 1
+        if size:
+            self._bytes += size
+            self._bytes_total += size
+            self._bytes_gauge.inc(size)
+            self._bytes_counter.inc(size)
+            self._peak_bytes = max(self._peak_bytes, self._bytes)
+            if self._bytes >= self._high_watermark:
+                self._writable.clear()
+        self._readable.set()
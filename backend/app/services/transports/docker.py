@@ -1,7 +1,12 @@
 import asyncio
+import io
 import logging
+import posixpath
 import select
 import socket
+import ssl
+import struct
+import tarfile
 from collections.abc import AsyncIterable
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
@@ -13,9 +18,20 @@ from claude_agent_sdk.types import ClaudeAgentOptions
 from app.constants import TERMINAL_TYPE
 from app.services.sandbox_providers.types import DockerConfig
 from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.launch_artifacts import stale_artifacts_command
 
 logger = logging.getLogger(__name__)
 
+# Header of a multiplexed exec stream frame: stream type, three padding bytes
+# and the payload size.
+DOCKER_FRAME_HEADER = struct.Struct(">BxxxL")
+DOCKER_FRAME_HEADER_SIZE = DOCKER_FRAME_HEADER.size
+
+
+def _resolve_future(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
 
 class DockerSandboxTransport(BaseSandboxTransport):
     def __init__(
@@ -25,14 +41,21 @@ class DockerSandboxTransport(BaseSandboxTransport):
         docker_config: DockerConfig,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        persistent: bool = False,
     ) -> None:
-        super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
+        super().__init__(
+            sandbox_id=sandbox_id,
+            prompt=prompt,
+            options=options,
+            persistent=persistent,
+        )
         self._docker_config = docker_config
         self._executor = ThreadPoolExecutor(max_workers=4)
         self._docker_client: Any = None
         self._container: Any = None
         self._exec_id: str | None = None
         self._socket: Any = None
+        self._raw_socket: socket.socket | None = None
         self._reader_task: asyncio.Task[None] | None = None
 
     def _get_logger(self) -> Any:
@@ -110,6 +133,7 @@ class DockerSandboxTransport(BaseSandboxTransport):
                 f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
             ) from exc
 
+        await self._prepare_launch_artifacts()
         command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
         envs["TERM"] = TERMINAL_TYPE
@@ -122,6 +146,7 @@ class DockerSandboxTransport(BaseSandboxTransport):
         except Exception as exc:
             raise CLIConnectionError(f"Failed to start Claude CLI: {exc}") from exc
 
+        self._raw_socket = self._get_raw_socket(loop)
         self._reader_task = loop.create_task(self._read_socket_data())
         self._monitor_task = loop.create_task(self._monitor_process())
         self._ready = True
@@ -129,6 +154,28 @@ class DockerSandboxTransport(BaseSandboxTransport):
     def _is_connection_ready(self) -> bool:
         return self._socket is not None
 
+    async def _write_launch_artifact(self, path: str, content: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self._executor, self._put_container_file, path, content
+        )
+
+    def _put_container_file(self, path: str, content: bytes) -> None:
+        parent_dir = posixpath.dirname(path)
+        self._container.exec_run(
+            ["mkdir", "-p", parent_dir], user=self._options.user or "user"
+        )
+        tar_stream = io.BytesIO()
+        with tarfile.open(fileobj=tar_stream, mode="w") as tar:
+            info = tarfile.TarInfo(name=posixpath.basename(path))
+            info.size = len(content)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(content))
+        self._container.put_archive(parent_dir, tar_stream.getvalue())
+        self._container.exec_run(
+            stale_artifacts_command(path), user=self._options.user or "user"
+        )
+
     def _send_signal_to_pid(self, pid: int, signal: str) -> None:
         try:
             self._container.exec_run(
@@ -169,6 +216,7 @@ class DockerSandboxTransport(BaseSandboxTransport):
 
         await self._kill_exec_process()
 
+        self._raw_socket = None
         if self._socket:
             with suppress(Exception):
                 self._socket.close()
@@ -185,6 +233,9 @@ class DockerSandboxTransport(BaseSandboxTransport):
 
     async def _send_data(self, data: str) -> None:
         loop = asyncio.get_running_loop()
+        if self._raw_socket is not None:
+            await loop.sock_sendall(self._raw_socket, data.encode("utf-8"))
+            return
         await loop.run_in_executor(
             self._executor, lambda: self._socket_send(data.encode("utf-8"))
         )
@@ -225,32 +276,148 @@ class DockerSandboxTransport(BaseSandboxTransport):
                 pass
         return None
 
-    def _recv_with_select(self, timeout: float) -> bytes | None:
+    def _get_raw_socket(self, loop: asyncio.AbstractEventLoop) -> socket.socket | None:
+        # Plain TCP/unix exec sockets are read straight from the event loop. TLS
+        # sockets buffer decrypted bytes the selector cannot see, and proactor
+        # loops have no add_reader, so those keep the executor reader.
+        raw = getattr(self._socket, "_sock", self._socket)
+        if not isinstance(raw, socket.socket) or isinstance(raw, ssl.SSLSocket):
+            return None
+        try:
+            loop.add_reader(raw.fileno(), lambda: None)
+            loop.remove_reader(raw.fileno())
+        except (NotImplementedError, OSError, ValueError):
+            return None
+        raw.setblocking(False)
+        return raw
+
+    async def _recv_into(self, buffer: bytearray, offset: int, timeout: float) -> int:
+        # Returns the number of bytes read, 0 when nothing arrived within the
+        # timeout, and raises EOFError once the socket is closed.
+        raw = self._raw_socket
+        loop = asyncio.get_running_loop()
+        if raw is None:
+            received = await loop.run_in_executor(
+                self._executor, self._recv_into_with_select, buffer, offset, timeout
+            )
+        else:
+            received = await self._recv_into_native(raw, buffer, offset, timeout)
+        if received is None:
+            raise EOFError
+        return received
+
+    async def _recv_into_native(
+        self, raw: socket.socket, buffer: bytearray, offset: int, timeout: float
+    ) -> int | None:
+        loop = asyncio.get_running_loop()
+        fd = raw.fileno()
+        waited = False
+        while True:
+            try:
+                received = raw.recv_into(memoryview(buffer)[offset:])
+                return received or None
+            except (BlockingIOError, InterruptedError):
+                if waited:
+                    return 0
+            except OSError:
+                return None
+            readable: asyncio.Future[None] = loop.create_future()
+            loop.add_reader(fd, _resolve_future, readable)
+            try:
+                await asyncio.wait_for(readable, timeout)
+            except TimeoutError:
+                waited = True
+            finally:
+                loop.remove_reader(fd)
+
+    def _recv_into_with_select(
+        self, buffer: bytearray, offset: int, timeout: float
+    ) -> int | None:
         fd = self._get_socket_fd()
         if fd is None:
             return None
         try:
             readable, _, _ = select.select([fd], [], [], timeout)
             if not readable:
-                return b""
-            return self._socket_recv(4096)
+                return 0
+            return self._socket_recv_into(memoryview(buffer)[offset:]) or None
         except Exception:
             return None
 
+    def _grow_read_buffer(
+        self, buffer: bytearray, start: int, end: int
+    ) -> tuple[bytearray, int, int]:
+        # Moves a partial frame to the front of the buffer, or allocates a
+        # larger one when a single frame does not fit.
+        pending = end - start
+        if start:
+            view = memoryview(buffer)
+            view[:pending] = view[start:end]
+            return buffer, 0, pending
+        size = len(buffer) * 2
+        if pending >= DOCKER_FRAME_HEADER_SIZE:
+            _, frame_size = DOCKER_FRAME_HEADER.unpack_from(buffer, 0)
+            size = max(size, DOCKER_FRAME_HEADER_SIZE + frame_size)
+        grown = bytearray(size)
+        grown[:pending] = buffer
+        return grown, 0, pending
+
+    async def _dispatch_frames(self, buffer: bytearray, start: int, end: int) -> int:
+        # Walks the multiplexed stream frames ([type, 0, 0, 0, size:uint32] +
+        # payload) in place and returns the offset of the first incomplete one.
+        # Consecutive stdout payloads are queued as a single chunk.
+        view = memoryview(buffer)
+        stdout_parts: list[memoryview] = []
+        while end - start >= DOCKER_FRAME_HEADER_SIZE:
+            stream_type, frame_size = DOCKER_FRAME_HEADER.unpack_from(buffer, start)
+            if frame_size > self._max_buffer_size:
+                start = end
+                break
+            frame_end = start + DOCKER_FRAME_HEADER_SIZE + frame_size
+            if frame_end > end:
+                break
+            payload = view[start + DOCKER_FRAME_HEADER_SIZE : frame_end]
+            start = frame_end
+
+            if stream_type == 1:
+                stdout_parts.append(payload)
+            elif stream_type == 2 and self._options.stderr:
+                try:
+                    self._options.stderr(str(payload, "utf-8", errors="replace"))
+                except Exception:
+                    pass
+        if stdout_parts:
+            await self._stdout_queue.put(b"".join(stdout_parts))
+        return start
+
+    async def _wait_for_exit_status(self) -> None:
+        # The exec socket closes before exec_inspect reports the exit code; give
+        # the monitor a moment so a failed run still surfaces its ProcessError.
+        task = self._monitor_task
+        if task is None or task.done():
+            return
+        with suppress(TimeoutError):
+            await asyncio.wait_for(asyncio.shield(task), timeout=2.0)
+
     async def _read_socket_data(self) -> None:
-        loop = asyncio.get_running_loop()
-        buffer = b""
+        buffer = bytearray(
+            max(self._docker_config.transport_read_size, DOCKER_FRAME_HEADER_SIZE)
+        )
+        start = end = 0
         drain_empty_count = 0
+        reached_eof = False
 
         try:
             while True:
+                if end == len(buffer):
+                    buffer, start, end = self._grow_read_buffer(buffer, start, end)
                 timeout = 5.0 if self._ready else 0.2
-                data = await loop.run_in_executor(
-                    self._executor, self._recv_with_select, timeout
-                )
-                if data is None:
+                try:
+                    received = await self._recv_into(buffer, end, timeout)
+                except EOFError:
+                    reached_eof = True
                     break
-                if len(data) == 0:
+                if received == 0:
                     if not self._ready:
                         drain_empty_count += 1
                         if drain_empty_count >= 5:
@@ -258,49 +425,29 @@ class DockerSandboxTransport(BaseSandboxTransport):
                     continue
                 drain_empty_count = 0
 
-                buffer += data
-
-                while len(buffer) >= 8:
-                    stream_type = buffer[0]
-                    frame_size = int.from_bytes(buffer[4:8], byteorder="big")
-
-                    if frame_size > self._max_buffer_size:
-                        buffer = b""
-                        break
-
-                    if len(buffer) < 8 + frame_size:
-                        break
-
-                    payload = buffer[8 : 8 + frame_size]
-                    buffer = buffer[8 + frame_size :]
-
-                    if stream_type == 1:
-                        decoded = payload.decode("utf-8", errors="replace")
-                        await self._stdout_queue.put(decoded)
-                    elif stream_type == 2 and self._options.stderr:
-                        try:
-                            self._options.stderr(
-                                payload.decode("utf-8", errors="replace")
-                            )
-                        except Exception:
-                            pass
+                end += received
+                start = await self._dispatch_frames(buffer, start, end)
+                if start == end:
+                    start = end = 0
         except asyncio.CancelledError:
             pass
         except Exception as e:
             logger.error("Socket reader error: %s", e)
         finally:
+            if reached_eof:
+                await self._wait_for_exit_status()
             await self._put_sentinel()
 
-    def _socket_recv(self, size: int) -> bytes:
+    def _socket_recv_into(self, view: memoryview) -> int:
         if not self._socket:
-            return b""
-        if hasattr(self._socket, "recv"):
-            return bytes(self._socket.recv(size))
-        if hasattr(self._socket, "read"):
-            return bytes(self._socket.read(size))
+            return 0
+        if hasattr(self._socket, "recv_into"):
+            return int(self._socket.recv_into(view))
+        if hasattr(self._socket, "readinto"):
+            return int(self._socket.readinto(view) or 0)
         if hasattr(self._socket, "_sock"):
-            return bytes(self._socket._sock.recv(size))
-        raise CLIConnectionError("Socket does not support recv/read")
+            return int(self._socket._sock.recv_into(view))
+        raise CLIConnectionError("Socket does not support recv_into/readinto")
 
     def _socket_send(self, payload: bytes) -> None:
         if not self._socket:
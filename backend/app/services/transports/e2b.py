@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import shlex
 from collections.abc import AsyncIterable
 from contextlib import suppress
 from typing import Any
@@ -12,6 +13,7 @@ from e2b.sandbox_async.commands.command_handle import AsyncCommandHandle
 
 from app.constants import SANDBOX_AUTO_PAUSE_TIMEOUT
 from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.launch_artifacts import stale_artifacts_command
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +26,14 @@ class E2BSandboxTransport(BaseSandboxTransport):
         api_key: str,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        persistent: bool = False,
     ) -> None:
-        super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
+        super().__init__(
+            sandbox_id=sandbox_id,
+            prompt=prompt,
+            options=options,
+            persistent=persistent,
+        )
         self._api_key = api_key
         self._sandbox: AsyncSandbox | None = None
         self._command: AsyncCommandHandle | None = None
@@ -49,6 +57,7 @@ class E2BSandboxTransport(BaseSandboxTransport):
                 f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
             ) from exc
 
+        await self._prepare_launch_artifacts()
         command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
 
@@ -83,6 +92,14 @@ class E2BSandboxTransport(BaseSandboxTransport):
     def _is_connection_ready(self) -> bool:
         return self._command is not None and self._sandbox is not None
 
+    async def _write_launch_artifact(self, path: str, content: bytes) -> None:
+        assert self._sandbox is not None
+        user = self._options.user or "user"
+        await self._sandbox.files.write(path, content, user=user)
+        await self._sandbox.commands.run(
+            shlex.join(stale_artifacts_command(path)), user=user
+        )
+
     async def _cleanup_resources(self) -> None:
         if self._command:
             with suppress(Exception):
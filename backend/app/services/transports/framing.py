@@ -0,0 +1,136 @@
+import json
+import re
+from typing import Any
+
+import orjson
+from claude_agent_sdk._errors import CLIJSONDecodeError
+
+ANSI_ESCAPE_BYTES_RE = re.compile(rb"\x1B\[[0-?]*[ -/]*[@-~]")
+JSON_WHITESPACE = " \t\n\r"
+LINE_STRIP_BYTES = b" \t\r\x0b\x0c"
+
+
+class CliOutputFramer:
+    # Splits Claude CLI stdout into JSON messages. The CLI writes one message per
+    # line, so bytes are only decoded once a newline arrives: a multi-megabyte
+    # tool result spread over thousands of socket frames is scanned once instead
+    # of being re-parsed from the start on every frame. _scan_offset remembers
+    # how far the unterminated tail has already been searched for a newline.
+    #
+    # Lines that are not a single JSON document fall back to raw_decode, which
+    # handles back-to-back objects ('{"a":1}{"b":2}') and objects a terminal
+    # split over several lines; an incomplete tail is kept in _pending and
+    # completed by the following lines.
+
+    def __init__(self, max_buffer_size: int) -> None:
+        self._max_buffer_size = max_buffer_size
+        self._buffer = bytearray()
+        self._scan_offset = 0
+        self._pending = ""
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: bytes | str) -> list[Any]:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        buffer = self._buffer
+        buffer += chunk
+
+        newline = buffer.find(b"\n", self._scan_offset)
+        if newline == -1:
+            self._scan_offset = len(buffer)
+            self._check_size(len(buffer))
+            return []
+
+        end = buffer.rfind(b"\n") + 1
+        messages: list[Any] = []
+        start = 0
+        while newline != -1 and newline < end:
+            self._decode_line(buffer[start:newline], messages)
+            start = newline + 1
+            newline = buffer.find(b"\n", start)
+        del buffer[:end]
+        self._scan_offset = len(buffer)
+        self._check_size(len(buffer))
+        return messages
+
+    def finish(self) -> list[Any]:
+        # Decodes whatever the CLI wrote after its last newline and raises if
+        # anything left over is not valid JSON.
+        messages: list[Any] = []
+        if self._buffer:
+            self._decode_line(bytes(self._buffer), messages)
+            self._buffer.clear()
+            self._scan_offset = 0
+        leftover, self._pending = self._pending, ""
+        if leftover.strip():
+            try:
+                json.loads(leftover)
+            except json.JSONDecodeError as exc:
+                raise CLIJSONDecodeError(leftover, exc) from exc
+        return messages
+
+    def reset(self) -> None:
+        self._buffer.clear()
+        self._scan_offset = 0
+        self._pending = ""
+
+    def _check_size(self, unterminated: int) -> None:
+        if unterminated + len(self._pending) <= self._max_buffer_size:
+            return
+        preview = self._pending or bytes(self._buffer[:1024]).decode(
+            "utf-8", errors="replace"
+        )
+        self.reset()
+        raise CLIJSONDecodeError(
+            preview,
+            ValueError(
+                f"CLI output exceeded max buffer size of {self._max_buffer_size}"
+            ),
+        )
+
+    def _decode_line(self, line: bytes | bytearray, messages: list[Any]) -> None:
+        # Strip ANSI escape codes (e.g., \x1B[32m for colors) that terminals
+        # inject; they break JSON parsing if not removed.
+        if b"\x1b" in line:
+            line = ANSI_ESCAPE_BYTES_RE.sub(b"", line)
+        if b"\r" in line:
+            line = line.replace(b"\r", b"")
+        line = line.strip(LINE_STRIP_BYTES)
+        if not line:
+            return
+
+        if not self._pending:
+            # Skip any non-JSON preamble the CLI prints before a message.
+            starts = [pos for pos in (line.find(b"{"), line.find(b"[")) if pos != -1]
+            if not starts:
+                return
+            first = min(starts)
+            if first:
+                line = line[first:]
+            try:
+                messages.append(orjson.loads(line))
+                return
+            except orjson.JSONDecodeError:
+                pass
+
+        text = self._pending + line.decode("utf-8", errors="replace")
+        self._pending, decoded = self._decode_concatenated(text)
+        messages.extend(decoded)
+
+    def _decode_concatenated(self, text: str) -> tuple[str, list[Any]]:
+        # raw_decode returns the offset where parsing stopped, so several
+        # objects on one line are read in place and any incomplete trailing
+        # data is returned for the next line.
+        messages: list[Any] = []
+        pos = 0
+        end = len(text)
+        while True:
+            while pos < end and text[pos] in JSON_WHITESPACE:
+                pos += 1
+            if pos >= end:
+                return "", messages
+            try:
+                data, pos = self._decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                return text[pos:], messages
+            messages.append(data)
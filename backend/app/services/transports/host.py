@@ -4,7 +4,7 @@ import logging
 import os
 import pwd
 import shlex
-from collections.abc import AsyncIterable
+from collections.abc import AsyncIterable, Awaitable, Callable
 from pathlib import Path
 from typing import Any
 
@@ -14,6 +14,7 @@ from claude_agent_sdk.types import ClaudeAgentOptions
 from app.constants import SANDBOX_HOME_DIR, TERMINAL_TYPE
 from app.core.config import get_settings
 from app.services.transports.base import BaseSandboxTransport
+from app.utils.fd_reader import FdReader
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -26,11 +27,20 @@ class HostSandboxTransport(BaseSandboxTransport):
         sandbox_id: str,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        persistent: bool = False,
     ) -> None:
-        super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
+        super().__init__(
+            sandbox_id=sandbox_id,
+            prompt=prompt,
+            options=options,
+            persistent=persistent,
+        )
         self._process: asyncio.subprocess.Process | None = None
         self._stdout_task: asyncio.Task[None] | None = None
         self._stderr_task: asyncio.Task[None] | None = None
+        self._stdout_fd: int | None = None
+        self._stderr_fd: int | None = None
+        self._launch_owner: tuple[int, int] | None = None
         host_base_dir = settings.get_host_sandbox_base_dir()
         self._sandbox_dir = Path(host_base_dir).expanduser().resolve() / sandbox_id
 
@@ -76,6 +86,33 @@ class HostSandboxTransport(BaseSandboxTransport):
 
         return _inner
 
+    def _launch_artifact_path(self, file_name: str) -> str:
+        # The CLI runs on the host, so it is given the host path of the file.
+        return str(self._resolve_cwd(super()._launch_artifact_path(file_name)))
+
+    async def _write_launch_artifact(self, path: str, content: bytes) -> None:
+        await asyncio.to_thread(self._write_owned_file, Path(path), content)
+
+    def _write_owned_file(self, path: Path, content: bytes) -> None:
+        # Directories created here would otherwise belong to the backend's user
+        # while the CLI runs as the sandbox user and needs to write ~/.claude.
+        created: list[Path] = []
+        parent = path.parent
+        while not parent.exists() and parent != self._sandbox_dir:
+            created.append(parent)
+            parent = parent.parent
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f"{path.suffix}.tmp")
+        temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+        for stale in path.parent.glob(f"*{path.suffix}"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        if self._launch_owner is not None:
+            uid, gid = self._launch_owner
+            for owned in (*created, path):
+                os.chown(owned, uid, gid)
+
     async def connect(self) -> None:
         if self._ready:
             return
@@ -86,25 +123,31 @@ class HostSandboxTransport(BaseSandboxTransport):
                 f"Host sandbox {self._sandbox_id} not found at {self._sandbox_dir}"
             )
 
+        envs, cwd, requested_user = self._prepare_environment()
+        run_user = self._resolve_run_user(requested_user)
+        self._launch_owner = run_user
+        await self._prepare_launch_artifacts()
         command_line = self._build_command()
         command_args = shlex.split(command_line)
-        envs, cwd, requested_user = self._prepare_environment()
         env = os.environ.copy()
         env.update(envs)
         env["HOME"] = str(self._sandbox_dir)
         env["USER"] = requested_user or env.get("USER", "user")
         env["TERM"] = TERMINAL_TYPE
         resolved_cwd = self._resolve_cwd(cwd)
-        run_user = self._resolve_run_user(requested_user)
 
+        # stdout and stderr are plain pipes read by FdReader rather than asyncio
+        # stream readers, so output is coalesced the same way as host terminals.
+        stdout_fd, stdout_child = os.pipe()
+        stderr_fd, stderr_child = os.pipe()
         try:
             self._process = await asyncio.create_subprocess_exec(
                 *command_args,
                 cwd=str(resolved_cwd),
                 env=env,
                 stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
+                stdout=stdout_child,
+                stderr=stderr_child,
                 preexec_fn=(
                     self._preexec_drop_privileges(run_user[0], run_user[1])
                     if run_user
@@ -112,7 +155,14 @@ class HostSandboxTransport(BaseSandboxTransport):
                 ),
             )
         except Exception as exc:
+            os.close(stdout_fd)
+            os.close(stderr_fd)
             raise CLIConnectionError(f"Failed to start Claude CLI: {exc}") from exc
+        finally:
+            os.close(stdout_child)
+            os.close(stderr_child)
+        self._stdout_fd = stdout_fd
+        self._stderr_fd = stderr_fd
 
         loop = asyncio.get_running_loop()
         self._stdout_task = loop.create_task(self._read_stdout())
@@ -128,6 +178,12 @@ class HostSandboxTransport(BaseSandboxTransport):
         await self._cancel_task(self._stderr_task)
         self._stdout_task = None
         self._stderr_task = None
+        for fd in (self._stdout_fd, self._stderr_fd):
+            if fd is not None:
+                with contextlib.suppress(OSError):
+                    os.close(fd)
+        self._stdout_fd = None
+        self._stderr_fd = None
 
         if self._process and self._process.returncode is None:
             self._process.terminate()
@@ -151,34 +207,38 @@ class HostSandboxTransport(BaseSandboxTransport):
         self._process.stdin.write_eof()
         await self._process.stdin.drain()
 
+    def _create_reader(
+        self, fd: int, on_data: Callable[[bytes], Awaitable[None]]
+    ) -> FdReader:
+        return FdReader(
+            fd,
+            on_data,
+            coalesce_ms=settings.HOST_OUTPUT_COALESCE_MS,
+            buffer_size=settings.HOST_OUTPUT_BUFFER_SIZE,
+        )
+
     async def _read_stdout(self) -> None:
-        if not self._process or not self._process.stdout:
+        if self._stdout_fd is None:
             return
         try:
-            while True:
-                chunk = await self._process.stdout.read(4096)
-                if not chunk:
-                    break
-                await self._stdout_queue.put(chunk.decode("utf-8", errors="replace"))
+            await self._create_reader(self._stdout_fd, self._stdout_queue.put).run()
         except asyncio.CancelledError:
             pass
         finally:
             await self._put_sentinel()
 
+    async def _forward_stderr(self, chunk: bytes) -> None:
+        if self._options.stderr:
+            try:
+                self._options.stderr(chunk.decode("utf-8", errors="replace"))
+            except Exception:
+                pass
+
     async def _read_stderr(self) -> None:
-        if not self._process or not self._process.stderr:
+        if self._stderr_fd is None:
             return
         try:
-            while True:
-                chunk = await self._process.stderr.read(4096)
-                if not chunk:
-                    break
-                text = chunk.decode("utf-8", errors="replace")
-                if self._options.stderr:
-                    try:
-                        self._options.stderr(text)
-                    except Exception:
-                        pass
+            await self._create_reader(self._stderr_fd, self._forward_stderr).run()
         except asyncio.CancelledError:
             pass
 
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import posixpath
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from claude_agent_sdk.types import ClaudeAgentOptions
+
+from app.constants import SANDBOX_HOME_DIR
+
+LAUNCH_ARTIFACT_DIR = f"{SANDBOX_HOME_DIR}/.claude/launch"
+SYSTEM_PROMPT_ARTIFACT = "system_prompt"
+MCP_CONFIG_ARTIFACT = "mcp_config"
+# The permission server carries a chat token minted for every turn; writing it
+# to a file would change the hash each time, so it always stays inline.
+INLINE_MCP_SERVERS = frozenset({"permission"})
+MAX_CACHED_ARTIFACTS = 4096
+
+
+@dataclass(frozen=True)
+class LaunchArtifact:
+    file_name: str
+    content: bytes
+
+
+def _artifact(content: str, extension: str) -> LaunchArtifact:
+    encoded = content.encode("utf-8")
+    digest = hashlib.sha256(encoded).hexdigest()[:32]
+    return LaunchArtifact(file_name=f"{digest}.{extension}", content=encoded)
+
+
+def stale_artifacts_command(path: str) -> list[str]:
+    # Removes the other launch files of the same kind as path. Only the latest
+    # of each is worth keeping, and older MCP configs may still hold secrets
+    # from server env settings the user has since changed.
+    directory, file_name = posixpath.split(path)
+    extension = posixpath.splitext(file_name)[1]
+    return [
+        "find",
+        directory,
+        "-maxdepth",
+        "1",
+        "-type",
+        "f",
+        "-name",
+        f"*{extension}",
+        "!",
+        "-name",
+        file_name,
+        "-delete",
+    ]
+
+
+def mcp_servers_for_cli(mcp_servers: dict[str, Any]) -> dict[str, Any]:
+    servers: dict[str, Any] = {}
+    for name, config in mcp_servers.items():
+        if isinstance(config, dict) and config.get("type") == "sdk":
+            servers[name] = {
+                key: value for key, value in config.items() if key != "instance"
+            }
+        else:
+            servers[name] = config
+    return servers
+
+
+def build_launch_artifacts(options: ClaudeAgentOptions) -> dict[str, LaunchArtifact]:
+    # The large, rarely changing parts of the CLI command line: the system
+    # prompt and every MCP server except the per-turn ones. File names are
+    # content hashes, so an unchanged config maps to a file already written.
+    artifacts: dict[str, LaunchArtifact] = {}
+
+    system_prompt = options.system_prompt
+    if isinstance(system_prompt, dict):
+        system_prompt = system_prompt.get("append")
+    if isinstance(system_prompt, str) and system_prompt:
+        artifacts[SYSTEM_PROMPT_ARTIFACT] = _artifact(system_prompt, "md")
+
+    if isinstance(options.mcp_servers, dict):
+        stable = {
+            name: config
+            for name, config in mcp_servers_for_cli(options.mcp_servers).items()
+            if name not in INLINE_MCP_SERVERS
+        }
+        if stable:
+            artifacts[MCP_CONFIG_ARTIFACT] = _artifact(
+                json.dumps({"mcpServers": stable}, sort_keys=True), "json"
+            )
+
+    return artifacts
+
+
+class LaunchArtifactCache:
+    # Artifacts this worker already wrote, keyed by transport kind, sandbox and
+    # file name. Entries are only ever skipped writes: writing a file prunes the
+    # older ones of its kind, so their entries go with it, and a sandbox that
+    # lost its files after being recorded is forgotten once a CLI launched
+    # against it fails, so the next launch writes them again.
+
+    _written: OrderedDict[tuple[str, str, str], None] = OrderedDict()
+
+    @classmethod
+    def contains(cls, key: tuple[str, str, str]) -> bool:
+        if key not in cls._written:
+            return False
+        cls._written.move_to_end(key)
+        return True
+
+    @classmethod
+    def add(cls, key: tuple[str, str, str]) -> None:
+        _, sandbox_id, file_name = key
+        extension = posixpath.splitext(file_name)[1]
+        for stale in [
+            written
+            for written in cls._written
+            if written[1] == sandbox_id
+            and written[2] != file_name
+            and posixpath.splitext(written[2])[1] == extension
+        ]:
+            del cls._written[stale]
+        cls._written[key] = None
+        cls._written.move_to_end(key)
+        while len(cls._written) > MAX_CACHED_ARTIFACTS:
+            cls._written.popitem(last=False)
+
+    @classmethod
+    def forget_sandbox(cls, sandbox_id: str) -> None:
+        for key in [key for key in cls._written if key[1] == sandbox_id]:
+            del cls._written[key]
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+import posixpath
 from collections.abc import AsyncIterable
 from contextlib import suppress
 from typing import Any
@@ -10,6 +11,7 @@ from claude_agent_sdk._errors import CLIConnectionError, ProcessError
 from claude_agent_sdk.types import ClaudeAgentOptions
 
 from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.launch_artifacts import stale_artifacts_command
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +24,14 @@ class ModalSandboxTransport(BaseSandboxTransport):
         api_key: str,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        persistent: bool = False,
     ) -> None:
-        super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
+        super().__init__(
+            sandbox_id=sandbox_id,
+            prompt=prompt,
+            options=options,
+            persistent=persistent,
+        )
         self._api_key = api_key
         self._sandbox: modal.Sandbox | None = None
         self._process: Any | None = None
@@ -53,6 +61,7 @@ class ModalSandboxTransport(BaseSandboxTransport):
                 f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
             ) from exc
 
+        await self._prepare_launch_artifacts()
         command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
 
@@ -79,6 +88,23 @@ class ModalSandboxTransport(BaseSandboxTransport):
     def _is_connection_ready(self) -> bool:
         return self._process is not None and self._sandbox is not None
 
+    async def _write_launch_artifact(self, path: str, content: bytes) -> None:
+        assert self._sandbox is not None
+        user = self._options.user or "user"
+        mkdir = await self._sandbox.exec.aio(
+            "runuser", "-u", user, "--", "mkdir", "-p", posixpath.dirname(path)
+        )
+        await mkdir.wait.aio()
+        handle = await self._sandbox.open.aio(path, "wb")
+        try:
+            await handle.write.aio(content)
+        finally:
+            await handle.close.aio()
+        prune = await self._sandbox.exec.aio(
+            "runuser", "-u", user, "--", *stale_artifacts_command(path)
+        )
+        await prune.wait.aio()
+
     async def _cleanup_resources(self) -> None:
         if hasattr(self, "_stdout_reader_task") and self._stdout_reader_task:
             self._stdout_reader_task.cancel()
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterable
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from claude_agent_sdk._errors import CLIConnectionError
+from claude_agent_sdk.types import ClaudeAgentOptions
+
+from app.services.transports.base import BaseSandboxTransport
+
+logger = logging.getLogger(__name__)
+
+# Lines of a recording that belong to the SDK handshake rather than the turn;
+# the replaying transport answers the live client's control requests itself.
+SKIPPED_LINE_TYPES = frozenset({"control_request", "control_response", "keep_alive"})
+# Optional key a recorder may add to each line: milliseconds since the turn's
+# user message. It is stripped before the line is replayed.
+REPLAY_OFFSET_KEY = "replay_offset_ms"
+
+ReplayTurn = tuple[tuple[float | None, bytes], ...]
+
+
+@lru_cache(maxsize=8)
+def load_transcript(path: str) -> tuple[ReplayTurn, ...]:
+    # Splits a recorded stream-json session into turns, each ending with its
+    # "result" line. Lines are re-encoded once here so replay only copies bytes.
+    turns: list[ReplayTurn] = []
+    current: list[tuple[float | None, bytes]] = []
+    for raw_line in Path(path).read_text(encoding="utf-8").splitlines():
+        raw_line = raw_line.strip()
+        if not raw_line.startswith("{"):
+            continue
+        data = json.loads(raw_line)
+        if data.get("type") in SKIPPED_LINE_TYPES:
+            continue
+        offset = data.pop(REPLAY_OFFSET_KEY, None)
+        current.append(
+            (
+                float(offset) if isinstance(offset, (int, float)) else None,
+                json.dumps(data).encode() + b"\n",
+            )
+        )
+        if data.get("type") == "result":
+            turns.append(tuple(current))
+            current = []
+    if current:
+        turns.append(tuple(current))
+    if not turns:
+        raise ValueError(f"Transcript {path} contains no messages")
+    return tuple(turns)
+
+
+class ReplaySandboxTransport(BaseSandboxTransport):
+    # Stands in for a sandboxed Claude CLI by replaying a recorded stream-json
+    # session, so the streaming pipeline can be measured without a model or a
+    # sandbox. Control requests from the SDK are answered immediately and each
+    # user message plays the next recorded turn, wrapping around at the end.
+    # speed scales the recorded replay_offset_ms delays; 0 replays as fast as
+    # the consumer reads. The turn cursor is shared per transcript, so one-shot
+    # transports created for successive chat turns walk through the session.
+
+    _turn_cursors: dict[str, int] = {}
+
+    def __init__(
+        self,
+        *,
+        sandbox_id: str,
+        transcript_path: str,
+        prompt: str | AsyncIterable[dict[str, Any]],
+        options: ClaudeAgentOptions,
+        speed: float = 0.0,
+        persistent: bool = False,
+    ) -> None:
+        super().__init__(
+            sandbox_id=sandbox_id,
+            prompt=prompt,
+            options=options,
+            persistent=persistent,
+        )
+        self._transcript_path = transcript_path
+        self._speed = max(speed, 0.0)
+        self._turns: tuple[ReplayTurn, ...] = ()
+        self._connected = False
+        self._replay_tasks: set[asyncio.Task[None]] = set()
+
+    def _get_logger(self) -> Any:
+        return logger
+
+    async def connect(self) -> None:
+        if self._ready:
+            return
+        self._stdin_closed = False
+        try:
+            self._turns = load_transcript(self._transcript_path)
+        except (OSError, ValueError) as exc:
+            raise CLIConnectionError(
+                f"Failed to load replay transcript {self._transcript_path}: {exc}"
+            ) from exc
+        self._connected = True
+        self._ready = True
+
+    def _is_connection_ready(self) -> bool:
+        return self._connected
+
+    async def _write_launch_artifact(self, path: str, content: bytes) -> None:
+        # Nothing is launched, so there is nothing to write.
+        return None
+
+    async def _cleanup_resources(self) -> None:
+        self._connected = False
+        for task in list(self._replay_tasks):
+            await self._cancel_task(task)
+        self._replay_tasks.clear()
+
+    async def _send_data(self, data: str) -> None:
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            message = json.loads(line)
+            message_type = message.get("type")
+            if message_type == "control_request":
+                await self._stdout_queue.put(self._control_success(message))
+            elif message_type == "user":
+                self._start_turn()
+
+    async def _send_eof(self) -> None:
+        if not self._replay_tasks:
+            await self._put_sentinel()
+
+    @staticmethod
+    def _control_success(request: dict[str, Any]) -> bytes:
+        response = {
+            "type": "control_response",
+            "response": {
+                "subtype": "success",
+                "request_id": request.get("request_id"),
+                "response": {},
+            },
+        }
+        return json.dumps(response).encode() + b"\n"
+
+    def _start_turn(self) -> None:
+        cursor = self._turn_cursors.get(self._transcript_path, 0)
+        self._turn_cursors[self._transcript_path] = cursor + 1
+        turn = self._turns[cursor % len(self._turns)]
+        task = asyncio.create_task(self._replay(turn))
+        self._replay_tasks.add(task)
+        task.add_done_callback(self._replay_tasks.discard)
+
+    async def _replay(self, turn: ReplayTurn) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for offset_ms, line in turn:
+            if self._speed and offset_ms is not None:
+                delay = started + offset_ms / 1000 / self._speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await self._stdout_queue.put(line)
+        if self._stdin_closed and not self._persistent:
+            await self._put_sentinel()
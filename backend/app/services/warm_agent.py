@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import suppress
+from typing import Any
+
+from claude_agent_sdk import (
+    AssistantMessage,
+    ClaudeAgentOptions,
+    ClaudeSDKClient,
+    ResultMessage,
+    SystemMessage,
+    UserMessage,
+)
+from claude_agent_sdk._errors import CLIConnectionError
+
+from app.core.config import get_settings
+from app.services.transports.base import BaseSandboxTransport
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CLOSE_TIMEOUT_SECONDS = 5.0
+REAPER_MAX_INTERVAL_SECONDS = 30.0
+
+# The messages StreamProcessor handles; partial-message stream events are not
+# forwarded.
+TurnMessage = AssistantMessage | UserMessage | ResultMessage | SystemMessage
+
+
+class _Turn:
+    __slots__ = ("prompt", "messages", "finished")
+
+    def __init__(self, prompt: dict[str, Any]) -> None:
+        self.prompt = prompt
+        self.messages: asyncio.Queue[TurnMessage | BaseException | None] = (
+            asyncio.Queue()
+        )
+        self.finished = False
+
+    def finish(self, item: BaseException | None = None) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self.messages.put_nowait(item)
+
+
+async def _single_message(message: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+    yield message
+
+
+class WarmAgentProcess:
+    # One Claude CLI kept running for a chat between turns. The SDK client's
+    # anyio task group has to be exited by the task that entered it, so a
+    # single owner task connects, serves every turn and disconnects; callers
+    # hand it turns and read the resulting messages back from a queue.
+
+    def __init__(
+        self,
+        *,
+        chat_id: str,
+        fingerprint: str,
+        transport: BaseSandboxTransport,
+        options: ClaudeAgentOptions,
+    ) -> None:
+        self.chat_id = chat_id
+        self.fingerprint = fingerprint
+        self.session_id: str | None = options.resume
+        self.started_at = time.monotonic()
+        self.last_used_at = self.started_at
+        self.busy = False
+        self.reusable = True
+        self._transport = transport
+        self._options = options
+        self._client: ClaudeSDKClient | None = None
+        self._turns: asyncio.Queue[_Turn | None] = asyncio.Queue()
+        self._current_turn: _Turn | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self._client is not None
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    def expired(self, now: float) -> bool:
+        max_age = max(settings.CLAUDE_WARM_PROCESS_MAX_AGE_SECONDS, 0)
+        return now - self.started_at >= max_age
+
+    async def start(self) -> None:
+        connected: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(connected))
+        await connected
+
+    async def _run(self, connected: asyncio.Future[None]) -> None:
+        try:
+            async with self._transport:
+                async with ClaudeSDKClient(
+                    options=self._options, transport=self._transport
+                ) as client:
+                    self._client = client
+                    connected.set_result(None)
+                    while (turn := await self._turns.get()) is not None:
+                        self._current_turn = turn
+                        await self._run_turn(client, turn)
+                        self._current_turn = None
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            if not connected.done():
+                connected.set_exception(exc)
+            else:
+                logger.warning(
+                    "Warm Claude CLI for chat %s stopped: %s", self.chat_id, exc
+                )
+        finally:
+            self._client = None
+            self.reusable = False
+            stopped = CLIConnectionError("Warm Claude CLI process stopped")
+            if not connected.done():
+                connected.set_exception(stopped)
+            if self._current_turn is not None:
+                self._current_turn.finish(stopped)
+            while not self._turns.empty():
+                pending = self._turns.get_nowait()
+                if pending is not None:
+                    pending.finish(stopped)
+
+    async def _run_turn(self, client: ClaudeSDKClient, turn: _Turn) -> None:
+        try:
+            await client.query(_single_message(turn.prompt))
+            async for message in client.receive_response():
+                if not isinstance(message, TurnMessage):
+                    continue
+                turn.messages.put_nowait(message)
+                if isinstance(message, ResultMessage):
+                    self.session_id = message.session_id
+                    turn.finish()
+                    return
+            raise CLIConnectionError("Claude CLI stopped before the turn finished")
+        except Exception as exc:
+            turn.finish(exc)
+            raise
+
+    async def stream_turn(self, prompt: dict[str, Any]) -> AsyncIterator[TurnMessage]:
+        if not self.alive:
+            raise CLIConnectionError("Warm Claude CLI process is not running")
+        turn = _Turn(prompt)
+        self._turns.put_nowait(turn)
+        while True:
+            item = await turn.messages.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def set_usage_handler(
+        self, handler: Callable[[dict[str, Any]], None] | None
+    ) -> None:
+        self._transport.usage_handler = handler
+
+    async def set_permission_mode(self, mode: str) -> None:
+        if self._client is None:
+            return
+        await self._client.set_permission_mode(mode)
+        # The CLI no longer runs with the mode its fingerprint was built from.
+        self.reusable = False
+
+    async def close(self) -> None:
+        self.reusable = False
+        task = self._task
+        if task is None or task.done():
+            return
+        if self._current_turn is None:
+            self._turns.put_nowait(None)
+        else:
+            task.cancel()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), CLOSE_TIMEOUT_SECONDS)
+        except (TimeoutError, asyncio.CancelledError):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+class WarmAgentPool:
+    # Warm CLI processes of this worker, one per chat. A process is handed out
+    # only when it is idle and was started with the same options and session
+    # the next turn would use; anything else goes back to a fresh CLI.
+
+    _processes: dict[str, WarmAgentProcess] = {}
+    _reaper_task: asyncio.Task[None] | None = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.CLAUDE_WARM_PROCESS_ENABLED
+
+    @classmethod
+    async def acquire(
+        cls, chat_id: str, fingerprint: str, session_id: str | None
+    ) -> WarmAgentProcess | None:
+        process = cls._processes.get(chat_id)
+        if process is None or process.busy:
+            return None
+        if (
+            process.alive
+            and process.reusable
+            and process.fingerprint == fingerprint
+            and process.session_id == session_id
+            and not process.expired(time.monotonic())
+        ):
+            process.busy = True
+            return process
+        await cls._discard(process)
+        return None
+
+    @classmethod
+    async def spawn(
+        cls,
+        *,
+        chat_id: str,
+        fingerprint: str,
+        transport_factory: Callable[[], BaseSandboxTransport],
+        options: ClaudeAgentOptions,
+    ) -> WarmAgentProcess | None:
+        if not await cls._make_room(chat_id):
+            return None
+        process = WarmAgentProcess(
+            chat_id=chat_id,
+            fingerprint=fingerprint,
+            transport=transport_factory(),
+            options=options,
+        )
+        process.busy = True
+        cls._processes[chat_id] = process
+        try:
+            await process.start()
+        except BaseException:
+            cls._processes.pop(chat_id, None)
+            raise
+        cls._ensure_reaper()
+        return process
+
+    @classmethod
+    async def release(cls, process: WarmAgentProcess, *, reusable: bool) -> None:
+        process.busy = False
+        process.last_used_at = time.monotonic()
+        if not reusable:
+            process.reusable = False
+        if not process.reusable or not process.alive:
+            await cls._discard(process)
+
+    @classmethod
+    async def discard(cls, process: WarmAgentProcess) -> None:
+        await cls._discard(process)
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        if cls._reaper_task is not None:
+            cls._reaper_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await cls._reaper_task
+            cls._reaper_task = None
+        processes = list(cls._processes.values())
+        cls._processes.clear()
+        await asyncio.gather(
+            *(process.close() for process in processes), return_exceptions=True
+        )
+
+    @classmethod
+    async def _discard(cls, process: WarmAgentProcess) -> None:
+        if cls._processes.get(process.chat_id) is process:
+            cls._processes.pop(process.chat_id, None)
+        try:
+            await process.close()
+        except Exception as exc:
+            logger.warning(
+                "Failed to close warm Claude CLI for chat %s: %s", process.chat_id, exc
+            )
+
+    @classmethod
+    async def _make_room(cls, chat_id: str) -> bool:
+        existing = cls._processes.get(chat_id)
+        if existing is not None:
+            if existing.busy:
+                return False
+            await cls._discard(existing)
+
+        limit = max(settings.CLAUDE_WARM_PROCESSES_MAX, 0)
+        while len(cls._processes) >= limit:
+            idle = [process for process in cls._processes.values() if not process.busy]
+            if not idle:
+                return False
+            await cls._discard(min(idle, key=lambda process: process.last_used_at))
+        return True
+
+    @classmethod
+    def _ensure_reaper(cls) -> None:
+        if cls._reaper_task is None or cls._reaper_task.done():
+            cls._reaper_task = asyncio.create_task(cls._reap_idle())
+
+    @classmethod
+    async def _reap_idle(cls) -> None:
+        idle_seconds = max(settings.CLAUDE_WARM_PROCESS_IDLE_SECONDS, 1)
+        interval = min(idle_seconds, REAPER_MAX_INTERVAL_SECONDS)
+        while cls._processes:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for process in list(cls._processes.values()):
+                if process.busy:
+                    continue
+                if (
+                    now - process.last_used_at >= idle_seconds
+                    or process.expired(now)
+                    or not process.alive
+                ):
+                    await cls._discard(process)
@@ -0,0 +1,131 @@
+import asyncio
+import os
+from collections.abc import Awaitable, Callable
+
+DEFAULT_READ_BUFFER_SIZE = 64 * 1024
+MAX_POOLED_BUFFERS = 64
+
+
+class _BufferPool:
+    # Read buffers outlive a single terminal: closing one hands its buffer to
+    # the next reader instead of allocating a fresh one.
+
+    def __init__(self, max_buffers: int) -> None:
+        self._max_buffers = max_buffers
+        self._free: dict[int, list[bytearray]] = {}
+
+    def acquire(self, size: int) -> bytearray:
+        free = self._free.get(size)
+        if free:
+            return free.pop()
+        return bytearray(size)
+
+    def release(self, buffer: bytearray) -> None:
+        free = self._free.setdefault(len(buffer), [])
+        if len(free) < self._max_buffers:
+            free.append(buffer)
+
+
+_buffer_pool = _BufferPool(MAX_POOLED_BUFFERS)
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+async def _wait_fd(fd: int, *, writable: bool, timeout: float | None) -> bool:
+    loop = asyncio.get_running_loop()
+    ready: asyncio.Future[None] = loop.create_future()
+    if writable:
+        loop.add_writer(fd, _resolve, ready)
+    else:
+        loop.add_reader(fd, _resolve, ready)
+    try:
+        await asyncio.wait_for(ready, timeout)
+        return True
+    except TimeoutError:
+        return False
+    finally:
+        if writable:
+            loop.remove_writer(fd)
+        else:
+            loop.remove_reader(fd)
+
+
+async def write_fd(fd: int, data: bytes) -> None:
+    # Writes all of data to a non-blocking fd, waiting on the selector whenever
+    # the kernel buffer is full.
+    view = memoryview(data)
+    while view:
+        try:
+            written = os.write(fd, view)
+        except (BlockingIOError, InterruptedError):
+            await _wait_fd(fd, writable=True, timeout=None)
+            continue
+        view = view[written:]
+
+
+class FdReader:
+    # Reads a file descriptor from the event loop's selector instead of a
+    # thread per fd. Output that arrives within coalesce_ms of the first byte
+    # is gathered into one pooled buffer and handed to on_data as a single
+    # chunk, so a busy terminal wakes its consumer once per interval rather
+    # than once per read. The caller owns the fd and closes it.
+
+    def __init__(
+        self,
+        fd: int,
+        on_data: Callable[[bytes], Awaitable[None]],
+        *,
+        coalesce_ms: float = 0.0,
+        buffer_size: int = DEFAULT_READ_BUFFER_SIZE,
+    ) -> None:
+        self._fd = fd
+        self._on_data = on_data
+        self._coalesce = max(coalesce_ms, 0.0) / 1000
+        self._buffer_size = max(buffer_size, 1024)
+        os.set_blocking(fd, False)
+
+    def _read_into(self, buffer: bytearray, offset: int) -> int | None:
+        # Returns the bytes read, None when the fd has nothing available yet,
+        # and 0 at end of file. A PTY master reports EIO once its slave closes.
+        try:
+            return os.readv(self._fd, [memoryview(buffer)[offset:]])
+        except (BlockingIOError, InterruptedError):
+            return None
+        except OSError:
+            return 0
+
+    async def run(self) -> None:
+        # Returns at end of file. Cancelling it stops reading without
+        # delivering the partial batch.
+        loop = asyncio.get_running_loop()
+        buffer = _buffer_pool.acquire(self._buffer_size)
+        try:
+            eof = False
+            while not eof:
+                received = self._read_into(buffer, 0)
+                if received is None:
+                    await _wait_fd(self._fd, writable=False, timeout=None)
+                    continue
+                if received == 0:
+                    break
+                filled = received
+                deadline = loop.time() + self._coalesce
+                while filled < len(buffer):
+                    received = self._read_into(buffer, filled)
+                    if received is None:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0 or not await _wait_fd(
+                            self._fd, writable=False, timeout=remaining
+                        ):
+                            break
+                        continue
+                    if received == 0:
+                        eof = True
+                        break
+                    filled += received
+                await self._on_data(bytes(memoryview(buffer)[:filled]))
+        finally:
+            _buffer_pool.release(buffer)
@@ -1,7 +1,8 @@
 import json
+import zlib
 from typing import cast
 
-from app.models.types import JSONDict
+from app.models.types import ArchivedEventDict, JSONDict
 
 
 def _parse_event_log(content: str) -> list[JSONDict]:
@@ -34,3 +35,13 @@ def extract_user_prompt(message_content: str) -> str:
 
     user_prompt = "".join(user_text_parts)
     return user_prompt or message_content
+
+
+def pack_archived_events(events: list[ArchivedEventDict]) -> bytes:
+    return zlib.compress(
+        json.dumps(events, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    )
+
+
+def unpack_archived_events(data: bytes) -> list[ArchivedEventDict]:
+    return cast(list[ArchivedEventDict], json.loads(zlib.decompress(data)))
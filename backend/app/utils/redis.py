@@ -2,7 +2,6 @@ import logging
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from redis.asyncio import Redis
-from redis.asyncio.client import PubSub
 
 from app.core.config import get_settings
 
@@ -20,20 +19,3 @@ async def redis_connection() -> "AsyncIterator[Redis[str]]":
             await redis.close()
         except Exception as e:
             logger.warning("Error closing Redis connection: %s", e)
-
-
-@asynccontextmanager
-async def redis_pubsub(redis: "Redis[str]", channel: str) -> AsyncIterator[PubSub]:
-    pubsub = redis.pubsub()
-    await pubsub.subscribe(channel)
-    try:
-        yield pubsub
-    finally:
-        try:
-            await pubsub.unsubscribe(channel)
-        except Exception as e:
-            logger.warning("Error unsubscribing from channel %s: %s", channel, e)
-        try:
-            await pubsub.close()
-        except Exception as e:
-            logger.warning("Error closing pubsub: %s", e)
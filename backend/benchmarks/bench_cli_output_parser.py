@@ -0,0 +1,102 @@
+"""Cost of framing large Claude CLI messages delivered in small socket frames.
+
+Compares the previous parser, which appended every fragment to a string buffer
+and re-ran raw_decode from its start, against CliOutputFramer, which buffers
+bytes and decodes each message once when its terminating newline arrives.
+
+Run from backend/: python -m benchmarks.bench_cli_output_parser [--sizes-mb 1 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from app.services.transports.base import DEFAULT_MAX_BUFFER_SIZE
+from app.services.transports.framing import CliOutputFramer
+
+FRAME_SIZE = 4096
+
+
+def _tool_result_line(size: int) -> bytes:
+    row = "    return {'status': 'ok', 'items': [item for item in items]}\n"
+    content = (row * (size // len(row) + 1))[:size]
+    message = {
+        "type": "user",
+        "message": {
+            "role": "user",
+            "content": [
+                {"type": "tool_result", "tool_use_id": "toolu_01", "content": content}
+            ],
+        },
+    }
+    return json.dumps(message).encode() + b"\n"
+
+
+def _frames(payload: bytes) -> Iterator[bytes]:
+    for offset in range(0, len(payload), FRAME_SIZE):
+        yield payload[offset : offset + FRAME_SIZE]
+
+
+def legacy_parse(frames: Iterator[bytes]) -> list[Any]:
+    # The string-buffer loop _parse_cli_output used before the framer.
+    decoder = json.JSONDecoder()
+    messages: list[Any] = []
+    json_buffer = ""
+    for frame in frames:
+        for json_line in frame.decode("utf-8", errors="replace").split("\n"):
+            json_line = json_line.strip()
+            if not json_line:
+                continue
+            json_buffer += json_line
+            working = json_buffer
+            while working:
+                working = working.lstrip()
+                try:
+                    data, offset = decoder.raw_decode(working)
+                except json.JSONDecodeError:
+                    break
+                messages.append(data)
+                working = working[offset:]
+            json_buffer = working
+    return messages
+
+
+def framer_parse(frames: Iterator[bytes]) -> list[Any]:
+    framer = CliOutputFramer(DEFAULT_MAX_BUFFER_SIZE * 4)
+    messages: list[Any] = []
+    for frame in frames:
+        messages.extend(framer.feed(frame))
+    messages.extend(framer.finish())
+    return messages
+
+
+def _best_of(parse: Callable[[Iterator[bytes]], list[Any]], payload: bytes) -> float:
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        messages = parse(_frames(payload))
+        best = min(best, time.perf_counter() - started)
+        assert len(messages) == 1
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[0.25, 1, 4])
+    args = parser.parse_args()
+
+    print(f"frame={FRAME_SIZE} bytes")
+    print(f"{'message MB':<12}{'before ms':>14}{'after ms':>14}{'speedup':>10}")
+    for size_mb in args.sizes_mb:
+        payload = _tool_result_line(int(size_mb * 1024 * 1024))
+        before = _best_of(legacy_parse, payload) * 1e3
+        after = _best_of(framer_parse, payload) * 1e3
+        print(f"{size_mb:<12}{before:>14.1f}{after:>14.1f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Throughput of the Docker transport stdout pipeline.
+
+Feeds multiplexed exec-stream frames through a socket pair into
+DockerSandboxTransport._read_socket_data and drains the stdout queue, comparing
+the previous reader (4 KB recv per executor hop, bytes concatenation and
+re-slicing per frame) against the event-loop reader that fills a reusable
+buffer with recv_into and walks frames by offset.
+
+Run from backend/: python -m benchmarks.bench_docker_stream_reader [--megabytes N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import select
+import socket
+import struct
+import threading
+import time
+
+from claude_agent_sdk.types import ClaudeAgentOptions
+
+from app.services.sandbox_providers.types import DockerConfig
+from app.services.transports.docker import DockerSandboxTransport
+
+
+class LegacyDockerTransport(DockerSandboxTransport):
+    # The reader as it was before recv_into and loop.add_reader.
+
+    def _recv_with_select(self, timeout: float) -> bytes | None:
+        fd = self._get_socket_fd()
+        if fd is None:
+            return None
+        try:
+            readable, _, _ = select.select([fd], [], [], timeout)
+            if not readable:
+                return b""
+            return bytes(self._socket.recv(4096))
+        except Exception:
+            return None
+
+    async def _read_socket_data(self) -> None:
+        loop = asyncio.get_running_loop()
+        buffer = b""
+        drain_empty_count = 0
+        try:
+            while True:
+                timeout = 5.0 if self._ready else 0.2
+                data = await loop.run_in_executor(
+                    self._executor, self._recv_with_select, timeout
+                )
+                if data is None:
+                    break
+                if len(data) == 0:
+                    if not self._ready:
+                        drain_empty_count += 1
+                        if drain_empty_count >= 5:
+                            break
+                    continue
+                drain_empty_count = 0
+                buffer += data
+                while len(buffer) >= 8:
+                    stream_type = buffer[0]
+                    frame_size = int.from_bytes(buffer[4:8], byteorder="big")
+                    if len(buffer) < 8 + frame_size:
+                        break
+                    payload = buffer[8 : 8 + frame_size]
+                    buffer = buffer[8 + frame_size :]
+                    if stream_type == 1:
+                        await self._stdout_queue.put(
+                            payload.decode("utf-8", errors="replace")
+                        )
+        finally:
+            await self._put_sentinel()
+
+
+def _build_stream(total_bytes: int, frame_payload: int) -> bytes:
+    line = (
+        json.dumps(
+            {
+                "type": "stream_event",
+                "event": {
+                    "type": "content_block_delta",
+                    "delta": {"type": "text_delta", "text": "lorem ipsum " * 20},
+                },
+            }
+        ).encode()
+        + b"\n"
+    )
+    stdout = (line * (total_bytes // len(line) + 1))[:total_bytes]
+    frames = bytearray()
+    for offset in range(0, len(stdout), frame_payload):
+        payload = stdout[offset : offset + frame_payload]
+        frames += struct.pack(">BxxxL", 1, len(payload)) + payload
+    return bytes(frames)
+
+
+async def _measure(
+    transport_cls: type[DockerSandboxTransport],
+    stream: bytes,
+    expected: int,
+    read_size: int,
+) -> float:
+    reader, writer = socket.socketpair()
+    transport = transport_cls(
+        sandbox_id="bench",
+        docker_config=DockerConfig(transport_read_size=read_size),
+        prompt="",
+        options=ClaudeAgentOptions(),
+    )
+    transport._socket = reader
+    loop = asyncio.get_running_loop()
+    if transport_cls is DockerSandboxTransport:
+        transport._raw_socket = transport._get_raw_socket(loop)
+
+    def write_all() -> None:
+        writer.sendall(stream)
+        writer.close()
+
+    started = time.perf_counter()
+    task = loop.create_task(transport._read_socket_data())
+    thread = threading.Thread(target=write_all)
+    thread.start()
+    received = 0
+    while True:
+        chunk = await transport._stdout_queue.get()
+        if chunk is transport._SENTINEL:
+            break
+        assert isinstance(chunk, (bytes, str))
+        received += len(chunk)
+    elapsed = time.perf_counter() - started
+    assert received == expected, (received, expected)
+    thread.join()
+    await task
+    reader.close()
+    transport._executor.shutdown(wait=True)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=int, default=64)
+    parser.add_argument("--frame-bytes", type=int, default=16 * 1024)
+    parser.add_argument("--read-size", type=int, default=256 * 1024)
+    args = parser.parse_args()
+
+    total = args.megabytes * 1024 * 1024
+    stream = _build_stream(total, args.frame_bytes)
+    print(
+        f"stdout={args.megabytes} MB frame={args.frame_bytes} B "
+        f"read_size={args.read_size} B"
+    )
+    for label, transport_cls in (
+        ("before", LegacyDockerTransport),
+        ("after", DockerSandboxTransport),
+    ):
+        elapsed = min(
+            asyncio.run(_measure(transport_cls, stream, total, args.read_size))
+            for _ in range(3)
+        )
+        throughput = args.megabytes / elapsed
+        print(f"{label:<8}{elapsed * 1e3:>10.1f} ms{throughput:>10.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
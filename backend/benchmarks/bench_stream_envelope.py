@@ -0,0 +1,102 @@
+"""Per-event CPU cost of building SSE stream envelopes.
+
+Compares the previous delivery path, where every viewer and every replay
+rebuilt the envelope and re-encoded it with json.dumps, against serializing
+it once with orjson at append time and reusing the text.
+
+Run from backend/: python -m benchmarks.bench_stream_envelope [--viewers N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+from functools import partial
+from uuid import uuid4
+
+from app.services.streaming.types import StreamEnvelope
+
+CHAT_ID = uuid4()
+MESSAGE_ID = uuid4()
+STREAM_ID = uuid4()
+
+PAYLOADS: dict[str, dict[str, object]] = {
+    "assistant_text": {"text": "Sure — here is the updated function. "},
+    "tool_started": {
+        "tool": {
+            "id": "toolu_01",
+            "name": "Read",
+            "input": {"file_path": "/home/user/project/src/app.py"},
+            "status": "started",
+        }
+    },
+    "tool_completed": {
+        "tool": {
+            "id": "toolu_01",
+            "name": "Read",
+            "status": "completed",
+            "result": "\n".join(
+                f"{line:>5}\tdef handler_{line}(request): return {{'ok': True}}"
+                for line in range(400)
+            ),
+        }
+    },
+}
+
+
+def _build(seq: int, kind: str, payload: dict[str, object]) -> dict[str, object]:
+    return StreamEnvelope.build(
+        chat_id=CHAT_ID,
+        message_id=MESSAGE_ID,
+        stream_id=STREAM_ID,
+        seq=seq,
+        kind=kind,
+        payload=payload,
+    )
+
+
+def per_viewer_json(kind: str, payload: dict[str, object], viewers: int) -> None:
+    for _ in range(viewers):
+        json.dumps(_build(1, kind, payload), ensure_ascii=False)
+
+
+def serialize_once_orjson(kind: str, payload: dict[str, object], viewers: int) -> None:
+    data = StreamEnvelope.dumps(_build(1, kind, payload))
+    for _ in range(viewers):
+        _ = data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--viewers", type=int, default=4)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"viewers={args.viewers} iterations={args.number}")
+    print(f"{'kind':<16}{'before us/event':>18}{'after us/event':>18}{'speedup':>10}")
+    for kind, payload in PAYLOADS.items():
+        before = min(
+            timeit.repeat(
+                partial(per_viewer_json, kind, payload, args.viewers),
+                number=args.number,
+                repeat=5,
+            )
+        )
+        after = min(
+            timeit.repeat(
+                partial(serialize_once_orjson, kind, payload, args.viewers),
+                number=args.number,
+                repeat=5,
+            )
+        )
+        before_us = before / args.number * 1e6
+        after_us = after / args.number * 1e6
+        print(
+            f"{kind:<16}{before_us:>18.2f}{after_us:>18.2f}"
+            f"{before_us / after_us:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
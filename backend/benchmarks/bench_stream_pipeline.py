@@ -0,0 +1,269 @@
+"""End-to-end throughput of the chat streaming pipeline on a replayed session.
+
+Drives ChatStreamRuntime.execute_chat with the Claude CLI replaced by
+ReplaySandboxTransport, so every run persists, publishes and delivers the same
+recorded turn without a model or a sandbox. Events are read back through the
+SSE endpoint of a running API server, and the runtime's own SQL statements are
+counted on the engine of this process.
+
+Reports events/sec, p50/p99 time-to-client (SSE arrival minus the envelope's
+ts, so both processes need the same clock) and DB statements per event.
+
+Needs a migrated database (alembic upgrade head), Redis and the API server
+(granian --interface asgi app.main:app --port 8080) using the same
+DATABASE_URL and REDIS_URL. The transcript is the CLI's stream-json stdout,
+one message per line; lines may carry replay_offset_ms to be paced with
+--speed.
+
+Run from backend/: python -m benchmarks.bench_stream_pipeline --transcript F
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+from sqlalchemy import delete, event
+
+from app.core.config import get_settings
+from app.core.security import get_password_hash
+from app.core.user_manager import get_jwt_strategy
+from app.db.session import SessionLocal, engine
+from app.models.db_models import Chat, Message, User, UserSettings
+from app.models.db_models.enums import MessageRole, MessageStreamStatus
+from app.models.schemas.settings import ProviderType
+from app.services.streaming.runtime import ChatStreamRuntime
+from app.services.streaming.types import ChatStreamRequest
+
+settings = get_settings()
+
+MODEL_ID = "claude-sonnet-4-5"
+TERMINAL_KINDS = frozenset({"cancelled", "complete", "error"})
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *_: Any) -> None:
+        self.count += 1
+
+
+async def _create_user() -> User:
+    unique_id = uuid.uuid4().hex[:8]
+    async with SessionLocal() as db:
+        user = User(
+            id=uuid.uuid4(),
+            email=f"bench_{unique_id}@example.com",
+            username=f"bench_{unique_id}",
+            hashed_password=get_password_hash(uuid.uuid4().hex),
+            is_active=True,
+            is_verified=True,
+        )
+        db.add(user)
+        db.add(
+            UserSettings(
+                id=uuid.uuid4(),
+                user_id=user.id,
+                custom_providers=[
+                    {
+                        "id": "anthropic",
+                        "name": "Anthropic",
+                        "provider_type": ProviderType.ANTHROPIC.value,
+                        "base_url": "https://api.anthropic.com",
+                        "auth_token": "bench_token",
+                        "enabled": True,
+                        "models": [
+                            {"model_id": MODEL_ID, "name": MODEL_ID, "enabled": True}
+                        ],
+                    }
+                ],
+            )
+        )
+        await db.commit()
+        await db.refresh(user)
+        return user
+
+
+async def _create_turn(user: User, prompt: str) -> tuple[Chat, Message]:
+    async with SessionLocal() as db:
+        chat = Chat(
+            id=uuid.uuid4(),
+            title="Stream pipeline benchmark",
+            user_id=user.id,
+            sandbox_id="replay",
+        )
+        db.add(chat)
+        await db.flush()
+        db.add(
+            Message(
+                id=uuid.uuid4(),
+                chat_id=chat.id,
+                content_text=prompt,
+                role=MessageRole.USER,
+                stream_status=MessageStreamStatus.COMPLETED,
+            )
+        )
+        assistant = Message(
+            id=uuid.uuid4(),
+            chat_id=chat.id,
+            content_text="",
+            role=MessageRole.ASSISTANT,
+            model_id=MODEL_ID,
+            stream_status=MessageStreamStatus.IN_PROGRESS,
+        )
+        db.add(assistant)
+        await db.commit()
+        await db.refresh(chat)
+        await db.refresh(assistant)
+        return chat, assistant
+
+
+async def _read_stream(
+    client: httpx.AsyncClient,
+    chat_id: str,
+    headers: dict[str, str],
+    subscribed: asyncio.Event,
+) -> list[float]:
+    latencies: list[float] = []
+    url = f"{settings.API_V1_STR}/chat/chats/{chat_id}/stream"
+    async with client.stream(
+        "GET", url, params={"after_seq": 0}, headers=headers
+    ) as response:
+        response.raise_for_status()
+        subscribed.set()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            arrived = datetime.now(timezone.utc)
+            try:
+                envelope = json.loads(line[5:].strip())
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(envelope, dict) or "ts" not in envelope:
+                continue
+            sent = datetime.fromisoformat(envelope["ts"])
+            latencies.append((arrived - sent).total_seconds())
+            if envelope.get("kind") in TERMINAL_KINDS:
+                break
+    return latencies
+
+
+async def _run_once(
+    client: httpx.AsyncClient,
+    user: User,
+    headers: dict[str, str],
+    prompt: str,
+    counter: StatementCounter,
+) -> tuple[int, float, int, list[float]]:
+    chat, assistant = await _create_turn(user, prompt)
+    subscribed = asyncio.Event()
+    reader = asyncio.create_task(
+        _read_stream(client, str(chat.id), headers, subscribed)
+    )
+    await subscribed.wait()
+
+    request = ChatStreamRequest(
+        prompt=prompt,
+        system_prompt="",
+        custom_instructions=None,
+        chat_data={
+            "id": str(chat.id),
+            "user_id": str(user.id),
+            "title": chat.title,
+            "sandbox_id": chat.sandbox_id,
+            "session_id": None,
+        },
+        model_id=MODEL_ID,
+        permission_mode="auto",
+        session_id=None,
+        assistant_message_id=str(assistant.id),
+        thinking_mode=None,
+        attachments=None,
+    )
+    statements_before = counter.count
+    started = time.perf_counter()
+    # No sandbox service: checkpoints are skipped, which is sandbox work anyway.
+    await ChatStreamRuntime.execute_chat(
+        request=request,
+        sandbox_service=None,  # type: ignore[arg-type]
+        session_factory=SessionLocal,
+    )
+    latencies = await asyncio.wait_for(reader, timeout=60)
+    elapsed = time.perf_counter() - started
+    return len(latencies), elapsed, counter.count - statements_before, latencies
+
+
+def _percentile(values: list[float], percentile: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    settings.CLAUDE_REPLAY_TRANSCRIPT = str(args.transcript.resolve())
+    settings.CLAUDE_REPLAY_SPEED = args.speed
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+
+    user = await _create_user()
+    token = await get_jwt_strategy().write_token(user)
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        async with httpx.AsyncClient(
+            base_url=args.base_url, timeout=httpx.Timeout(60, read=None)
+        ) as client:
+            total_events = 0
+            total_seconds = 0.0
+            total_statements = 0
+            latencies: list[float] = []
+            for run in range(args.warmup + args.runs):
+                events, seconds, statements, run_latencies = await _run_once(
+                    client, user, headers, args.prompt, counter
+                )
+                if run < args.warmup:
+                    continue
+                total_events += events
+                total_seconds += seconds
+                total_statements += statements
+                latencies.extend(run_latencies)
+                print(
+                    f"run {run - args.warmup + 1}: events={events} "
+                    f"seconds={seconds:.3f} statements={statements}"
+                )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"runs={args.runs} events={total_events} speed={args.speed}")
+    print(f"events/sec             {total_events / max(total_seconds, 1e-9):>10.1f}")
+    print(f"p50 time-to-client ms  {_percentile(latencies, 50) * 1000:>10.2f}")
+    print(f"p99 time-to-client ms  {_percentile(latencies, 99) * 1000:>10.2f}")
+    print(f"statements/event       {total_statements / max(total_events, 1):>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcript", type=Path, required=True)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=0.0)
+    parser.add_argument("--prompt", default="Replay the recorded turn")
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""CPU cost of turning Claude CLI messages into stream events and audit payloads.
+
+Replays a session transcript through StreamProcessor.emit_events_for_message and
+StreamEnvelope.sanitize_payload, comparing the previous code (a DOTALL regex
+search on every assistant text block, every payload key lowercased and matched
+against SENSITIVE_KEY_PARTS) against the tag pre-check and the memoized key
+classification.
+
+A transcript is the CLI's stream-json stdout, one message per line, e.g. the
+output of `claude -p --output-format stream-json --verbose`. Without
+--transcript a built-in session of text, thinking and tool round trips is used.
+
+Run from backend/: python -m benchmarks.bench_stream_processor [--transcript F]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+from collections.abc import Callable, Iterable
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+from claude_agent_sdk._internal.message_parser import parse_message
+from claude_agent_sdk.types import Message
+
+from app.services.streaming.processor import (
+    PROMPT_SUGGESTIONS_PATTERN,
+    StreamProcessor,
+)
+from app.services.streaming.types import (
+    MAX_AUDIT_STRING_LENGTH,
+    SENSITIVE_KEY_PARTS,
+    StreamEnvelope,
+    StreamEvent,
+    StreamEventType,
+)
+from app.services.tool_handler import ToolHandlerRegistry
+
+
+class LegacyStreamProcessor(StreamProcessor):
+    # _emit_text_block as it was before the tag pre-check.
+
+    def _emit_text_block(
+        self, text: str | None, *, event_type: StreamEventType
+    ) -> Iterable[StreamEvent]:
+        if not text:
+            return
+
+        suggestions: list[str] | None = None
+
+        if event_type == "assistant_text":
+            match = PROMPT_SUGGESTIONS_PATTERN.search(text)
+            if match:
+                try:
+                    parsed = json.loads(match.group(1))
+                    if isinstance(parsed, list):
+                        suggestions = [
+                            s.strip()
+                            for s in parsed
+                            if isinstance(s, str) and s.strip()
+                        ]
+                        if suggestions:
+                            text = PROMPT_SUGGESTIONS_PATTERN.sub("", text).strip()
+                except json.JSONDecodeError:
+                    pass
+
+        if text:
+            event: StreamEvent = {"type": event_type, "text": text}
+            yield event
+
+        if suggestions:
+            suggestions_event: StreamEvent = {
+                "type": "prompt_suggestions",
+                "suggestions": suggestions,
+            }
+            yield suggestions_event
+
+
+def legacy_sanitize(value: Any) -> Any:
+    if isinstance(value, dict):
+        redacted: dict[str, Any] = {}
+        for key, nested in value.items():
+            lower = key.lower()
+            if any(part in lower for part in SENSITIVE_KEY_PARTS):
+                redacted[key] = "[REDACTED]"
+                continue
+            redacted[key] = legacy_sanitize(nested)
+        return redacted
+    if isinstance(value, list):
+        return [legacy_sanitize(item) for item in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "[BINARY_OMITTED]"
+    if isinstance(value, str):
+        if len(value) > MAX_AUDIT_STRING_LENGTH:
+            digest = sha256(value.encode("utf-8", errors="ignore")).hexdigest()
+            return {
+                "value": value[:MAX_AUDIT_STRING_LENGTH],
+                "truncated": True,
+                "sha256": digest,
+                "original_length": len(value),
+            }
+        return value
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _assistant(content: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "type": "assistant",
+        "message": {"model": "claude-sonnet-4-5", "content": content},
+        "parent_tool_use_id": None,
+    }
+
+
+def _builtin_transcript(turns: int) -> list[dict[str, Any]]:
+    source = "\n".join(
+        f"    def handler_{line}(self, request):\n        return {{'ok': True}}"
+        for line in range(60)
+    )
+    lines: list[dict[str, Any]] = [
+        {"type": "system", "subtype": "init", "session_id": "bench-session"}
+    ]
+    for turn in range(turns):
+        tool_id = f"toolu_{turn:04d}"
+        lines.append(
+            _assistant(
+                [
+                    {
+                        "type": "thinking",
+                        "thinking": "I should read the handler module first. " * 8,
+                        "signature": "sig",
+                    }
+                ]
+            )
+        )
+        lines.append(
+            _assistant(
+                [
+                    {"type": "text", "text": "Let me look at the handlers. " * 6},
+                    {
+                        "type": "tool_use",
+                        "id": tool_id,
+                        "name": "Bash" if turn % 3 == 0 else "Read",
+                        "input": {
+                            "command": "pytest -q tests/test_handlers.py",
+                            "description": "Run the handler tests",
+                            "timeout": 120000,
+                        }
+                        if turn % 3 == 0
+                        else {"file_path": f"/home/user/project/app/h{turn}.py"},
+                    },
+                ]
+            )
+        )
+        lines.append(
+            {
+                "type": "user",
+                "message": {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "tool_result",
+                            "tool_use_id": tool_id,
+                            "content": source,
+                        }
+                    ],
+                },
+                "parent_tool_use_id": None,
+            }
+        )
+    lines.append(
+        _assistant(
+            [
+                {
+                    "type": "text",
+                    "text": "Done. The handlers now return early.\n"
+                    '<prompt_suggestions>["Add tests", "Refactor"]'
+                    "</prompt_suggestions>",
+                }
+            ]
+        )
+    )
+    lines.append(
+        {
+            "type": "result",
+            "subtype": "success",
+            "duration_ms": 1,
+            "duration_api_ms": 1,
+            "is_error": False,
+            "num_turns": turns,
+            "session_id": "bench-session",
+            "total_cost_usd": 0.1,
+        }
+    )
+    return lines
+
+
+def _load_transcript(path: Path | None, turns: int) -> list[Message]:
+    if path is None:
+        raw = _builtin_transcript(turns)
+    else:
+        raw = [
+            json.loads(line)
+            for line in path.read_text(encoding="utf-8").splitlines()
+            if line.strip().startswith("{")
+        ]
+    messages: list[Message] = []
+    for data in raw:
+        try:
+            messages.append(parse_message(data))
+        except Exception:
+            # stream_event, control and other lines the processor never sees.
+            continue
+    return messages
+
+
+def _emit_all(
+    processor_cls: type[StreamProcessor], messages: list[Message]
+) -> list[StreamEvent]:
+    processor = processor_cls(tool_registry=ToolHandlerRegistry())
+    events: list[StreamEvent] = []
+    for message in messages:
+        events.extend(event for event in processor.emit_events_for_message(message))
+    return events
+
+
+def _sanitize_all(
+    sanitize: Callable[[Any], Any], payloads: list[dict[str, Any]]
+) -> None:
+    for payload in payloads:
+        sanitize(payload)
+
+
+def _per_message_us(func: Callable[[], object], number: int, count: int) -> float:
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return best / number / max(count, 1) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcript", type=Path)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    messages = _load_transcript(args.transcript, args.turns)
+    events = _emit_all(StreamProcessor, messages)
+    assert len(events) == len(_emit_all(LegacyStreamProcessor, messages))
+    payloads = [dict(event) for event in events]
+    for payload in payloads:
+        assert StreamEnvelope.sanitize_payload(payload) == legacy_sanitize(payload)
+
+    print(f"messages={len(messages)} events={len(events)} iterations={args.number}")
+    print(f"{'stage':<12}{'before us/item':>18}{'after us/item':>18}{'speedup':>10}")
+    rows = (
+        (
+            "processor",
+            lambda: _emit_all(LegacyStreamProcessor, messages),
+            lambda: _emit_all(StreamProcessor, messages),
+            len(messages),
+        ),
+        (
+            "sanitize",
+            lambda: _sanitize_all(legacy_sanitize, payloads),
+            lambda: _sanitize_all(StreamEnvelope.sanitize_payload, payloads),
+            len(payloads),
+        ),
+    )
+    for stage, before_fn, after_fn, count in rows:
+        before = _per_message_us(before_fn, args.number, count)
+        after = _per_message_us(after_fn, args.number, count)
+        print(f"{stage:<12}{before:>18.2f}{after:>18.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
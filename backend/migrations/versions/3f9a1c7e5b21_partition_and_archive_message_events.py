@@ -0,0 +1,151 @@
+"""partition_and_archive_message_events
+
+Revision ID: 3f9a1c7e5b21
+Revises: cd67425061c4
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.db.types import GUID
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7e5b21'
+down_revision: Union[str, None] = 'cd67425061c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_SCHEMA = 'message_event_partitions'
+PARTITIONS_AHEAD = 2
+
+EVENT_COLUMNS = (
+    'id, message_id, chat_id, stream_id, seq, event_type, render_payload, '
+    'audit_payload, created_at, updated_at'
+)
+
+
+def _add_month(value: datetime) -> datetime:
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def upgrade() -> None:
+    op.drop_index('uq_message_events_stream_seq', table_name='message_events')
+    op.drop_index('idx_message_events_message_id_seq', table_name='message_events')
+    op.drop_index('idx_message_events_chat_id_stream_id_seq', table_name='message_events')
+    op.drop_index('idx_message_events_chat_id_created_at', table_name='message_events')
+    op.rename_table('message_events', 'message_events_legacy')
+    op.execute('ALTER TABLE message_events_legacy RENAME CONSTRAINT message_events_pkey TO message_events_legacy_pkey')
+
+    op.execute(f'CREATE SCHEMA IF NOT EXISTS {PARTITION_SCHEMA}')
+    op.create_table('message_events',
+    sa.Column('id', GUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+    sa.Column('message_id', GUID(), nullable=False),
+    sa.Column('chat_id', GUID(), nullable=False),
+    sa.Column('stream_id', GUID(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('render_payload', sa.JSON(), nullable=False),
+    sa.Column('audit_payload', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('idx_message_events_chat_id_seq', 'message_events', ['chat_id', 'seq'], unique=False)
+    op.create_index('idx_message_events_chat_id_stream_id_seq', 'message_events', ['chat_id', 'stream_id', 'seq'], unique=False)
+    op.create_index('idx_message_events_message_id_seq', 'message_events', ['message_id', 'seq'], unique=False)
+
+    # Monthly partitions cover every existing row plus a few months ahead, so the
+    # default partition stays empty and never blocks creating new ranges.
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text('SELECT min(created_at) FROM message_events_legacy')).scalar()
+    now = datetime.now(timezone.utc)
+    month = _month_start(oldest or now)
+    last_month = _month_start(now)
+    for _ in range(PARTITIONS_AHEAD):
+        last_month = _add_month(last_month)
+    while month <= last_month:
+        next_month = _add_month(month)
+        op.execute(
+            f'CREATE TABLE {PARTITION_SCHEMA}.message_events_p{month:%Y%m} '
+            f"PARTITION OF message_events FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+    op.execute(f'CREATE TABLE {PARTITION_SCHEMA}.message_events_default PARTITION OF message_events DEFAULT')
+
+    op.execute(
+        f'INSERT INTO message_events ({EVENT_COLUMNS}) '
+        f'SELECT {EVENT_COLUMNS} FROM message_events_legacy'
+    )
+    op.drop_table('message_events_legacy')
+
+    op.create_table('message_event_archives',
+    sa.Column('id', GUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+    sa.Column('message_id', GUID(), nullable=False),
+    sa.Column('chat_id', GUID(), nullable=False),
+    sa.Column('first_seq', sa.BigInteger(), nullable=False),
+    sa.Column('last_seq', sa.BigInteger(), nullable=False),
+    sa.Column('event_count', sa.Integer(), nullable=False),
+    sa.Column('events', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_message_event_archives_chat_id_last_seq', 'message_event_archives', ['chat_id', 'last_seq'], unique=False)
+    op.create_index('uq_message_event_archives_message_id', 'message_event_archives', ['message_id'], unique=True)
+
+
+def downgrade() -> None:
+    # Archived events are zlib-compressed by the application and cannot be
+    # expanded in SQL, so only events still in message_events survive.
+    op.drop_index('uq_message_event_archives_message_id', table_name='message_event_archives')
+    op.drop_index('idx_message_event_archives_chat_id_last_seq', table_name='message_event_archives')
+    op.drop_table('message_event_archives')
+
+    op.create_table('message_events_unpartitioned',
+    sa.Column('id', GUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+    sa.Column('message_id', GUID(), nullable=False),
+    sa.Column('chat_id', GUID(), nullable=False),
+    sa.Column('stream_id', GUID(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('render_payload', sa.JSON(), nullable=False),
+    sa.Column('audit_payload', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name='message_events_unpartitioned_pkey')
+    )
+    op.execute(
+        f'INSERT INTO message_events_unpartitioned ({EVENT_COLUMNS}) '
+        f'SELECT {EVENT_COLUMNS} FROM message_events'
+    )
+    op.drop_index('idx_message_events_message_id_seq', table_name='message_events')
+    op.drop_index('idx_message_events_chat_id_stream_id_seq', table_name='message_events')
+    op.drop_index('idx_message_events_chat_id_seq', table_name='message_events')
+    op.drop_table('message_events')
+    op.execute(f'DROP SCHEMA IF EXISTS {PARTITION_SCHEMA} CASCADE')
+
+    op.rename_table('message_events_unpartitioned', 'message_events')
+    op.execute('ALTER TABLE message_events RENAME CONSTRAINT message_events_unpartitioned_pkey TO message_events_pkey')
+    op.create_index('idx_message_events_chat_id_created_at', 'message_events', ['chat_id', 'created_at'], unique=False)
+    op.create_index('idx_message_events_chat_id_stream_id_seq', 'message_events', ['chat_id', 'stream_id', 'seq'], unique=False)
+    op.create_index('idx_message_events_message_id_seq', 'message_events', ['message_id', 'seq'], unique=False)
+    op.create_index('uq_message_events_stream_seq', 'message_events', ['stream_id', 'seq'], unique=True)
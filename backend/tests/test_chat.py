@@ -4,15 +4,29 @@ import io
 import json
 import uuid
 import zipfile
+from datetime import datetime, timezone
+from typing import Any, Callable
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants import MESSAGE_EVENT_PARTITION_SCHEMA
 from app.core.security import get_password_hash
-from app.models.db_models import Chat, Message, MessageAttachment, User
+from app.models.db_models import (
+    Chat,
+    Message,
+    MessageAttachment,
+    MessageEvent,
+    MessageEventArchive,
+    User,
+)
 from app.models.db_models.enums import AttachmentType, MessageRole, MessageStreamStatus
+from app.services.message import MessageService
+from app.services.message_retention import MessageRetentionService
 from app.services.sandbox import SandboxService
+from app.utils.message_events import pack_archived_events
 from tests.conftest import (
     STREAMING_TEST_TIMEOUT,
     read_sandbox_file,
@@ -341,6 +355,135 @@ class TestGetMessages:
         assert "has_more" in data
         assert isinstance(data["items"], list)
 
+    async def test_get_messages_rebuilds_in_progress_render_from_events(
+        self,
+        async_client: AsyncClient,
+        integration_chat_fixture: tuple[User, Chat, SandboxService],
+        auth_headers: dict[str, str],
+        db_session: AsyncSession,
+    ) -> None:
+        _, chat, _ = integration_chat_fixture
+
+        stream_id = uuid.uuid4()
+        message = Message(
+            id=uuid.uuid4(),
+            chat_id=chat.id,
+            content_text="",
+            content_render={"events": []},
+            role=MessageRole.ASSISTANT,
+            stream_status=MessageStreamStatus.IN_PROGRESS,
+            last_seq=4,
+            active_stream_id=stream_id,
+        )
+        db_session.add(message)
+        await db_session.flush()
+
+        context_usage = {"context_usage": {"tokens_used": 10}, "chat_id": str(chat.id)}
+        events = [
+            ("stream_started", {"status": "started"}, False),
+            ("assistant_text", {"text": "Hello "}, True),
+            ("system", context_usage, False),
+            ("assistant_text", {"text": "world"}, True),
+            ("assistant_text", {"text": " (not flushed yet)"}, True),
+        ]
+        for seq, (event_type, payload, in_snapshot) in enumerate(events, start=1):
+            db_session.add(
+                MessageEvent(
+                    chat_id=chat.id,
+                    message_id=message.id,
+                    stream_id=stream_id,
+                    seq=seq,
+                    event_type=event_type,
+                    render_payload=payload,
+                    in_snapshot=in_snapshot,
+                )
+            )
+        await db_session.flush()
+
+        response = await async_client.get(
+            f"/api/v1/chat/chats/{chat.id}/messages",
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        item = next(i for i in response.json()["items"] if i["id"] == str(message.id))
+        assert item["last_seq"] == 4
+        assert item["content_text"] == "Hello world"
+        assert item["content_render"] == {
+            "events": [
+                {"type": "assistant_text", "text": "Hello "},
+                {"type": "assistant_text", "text": "world"},
+            ]
+        }
+
+    async def test_get_message_events_reads_archived_and_live_events(
+        self,
+        async_client: AsyncClient,
+        integration_chat_fixture: tuple[User, Chat, SandboxService],
+        auth_headers: dict[str, str],
+        db_session: AsyncSession,
+    ) -> None:
+        _, chat, _ = integration_chat_fixture
+
+        stream_id = uuid.uuid4()
+        message = Message(
+            id=uuid.uuid4(),
+            chat_id=chat.id,
+            content_text="Hello world",
+            content_render={"events": []},
+            role=MessageRole.ASSISTANT,
+            stream_status=MessageStreamStatus.COMPLETED,
+            last_seq=3,
+        )
+        db_session.add(message)
+        await db_session.flush()
+
+        archived = [
+            {
+                "id": str(uuid.uuid4()),
+                "stream_id": str(stream_id),
+                "seq": seq,
+                "event_type": "assistant_text",
+                "render_payload": {"text": text},
+                "audit_payload": None,
+                "created_at": "2026-01-01T00:00:00+00:00",
+            }
+            for seq, text in ((1, "Hello "), (2, "world"))
+        ]
+        db_session.add(
+            MessageEventArchive(
+                message_id=message.id,
+                chat_id=chat.id,
+                first_seq=1,
+                last_seq=2,
+                event_count=2,
+                events=pack_archived_events(archived),
+            )
+        )
+        db_session.add(
+            MessageEvent(
+                chat_id=chat.id,
+                message_id=message.id,
+                stream_id=stream_id,
+                seq=3,
+                event_type="complete",
+                render_payload={"status": "completed"},
+            )
+        )
+        await db_session.flush()
+
+        response = await async_client.get(
+            f"/api/v1/chat/messages/{message.id}/events",
+            params={"after_seq": 1},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [event["seq"] for event in data] == [2, 3]
+        assert data[0]["render_payload"] == {"text": "world"}
+        assert data[1]["event_type"] == "complete"
+
 
 class TestContextUsage:
     async def test_get_context_usage(
@@ -1138,3 +1281,109 @@ Execute the chat test command."""
         content = await read_sandbox_file(sandbox_service, sandbox_id, command_path)
         assert content is not None
         assert "chat-test-command" in content
+
+
+class TestMessageEventCursor:
+    async def test_terminal_event_does_not_reopen_completed_message(
+        self,
+        db_session: AsyncSession,
+        session_factory: Callable[[], Any],
+        sample_chat: Chat,
+    ) -> None:
+        stream_id = uuid.uuid4()
+        message = Message(
+            id=uuid.uuid4(),
+            chat_id=sample_chat.id,
+            content_text="Hello world",
+            content_render={"events": []},
+            role=MessageRole.ASSISTANT,
+            stream_status=MessageStreamStatus.COMPLETED,
+            last_seq=2,
+            active_stream_id=None,
+        )
+        db_session.add(message)
+        await db_session.flush()
+
+        last_seq = await MessageService(
+            session_factory=session_factory
+        ).append_events_batch(
+            chat_id=sample_chat.id,
+            message_id=message.id,
+            stream_id=stream_id,
+            events=[("complete", {"status": "completed"}, None, False)],
+            seqs=[3],
+        )
+
+        await db_session.refresh(message)
+        assert last_seq == 3
+        assert message.last_seq == 3
+        assert message.active_stream_id is None
+
+
+class TestMessageEventRetention:
+    async def test_expired_partition_is_kept_until_its_events_are_archived(
+        self,
+        db_session: AsyncSession,
+        session_factory: Callable[[], Any],
+        sample_chat: Chat,
+    ) -> None:
+        partition = "message_events_p200001"
+        await db_session.execute(
+            text(
+                f"CREATE TABLE {MESSAGE_EVENT_PARTITION_SCHEMA}.{partition} "
+                "PARTITION OF message_events FOR VALUES "
+                "FROM ('2000-01-01T00:00:00+00:00') TO ('2000-02-01T00:00:00+00:00')"
+            )
+        )
+        messages = {
+            status: Message(
+                id=uuid.uuid4(),
+                chat_id=sample_chat.id,
+                content_text="",
+                role=MessageRole.ASSISTANT,
+                stream_status=status,
+                last_seq=1,
+            )
+            for status in (
+                MessageStreamStatus.COMPLETED,
+                MessageStreamStatus.IN_PROGRESS,
+            )
+        }
+        db_session.add_all(messages.values())
+        await db_session.flush()
+        for seq, message in enumerate(messages.values(), start=1):
+            db_session.add(
+                MessageEvent(
+                    chat_id=sample_chat.id,
+                    message_id=message.id,
+                    stream_id=uuid.uuid4(),
+                    seq=seq,
+                    event_type="assistant_text",
+                    render_payload={"text": "old"},
+                    created_at=datetime(2000, 1, 15, tzinfo=timezone.utc),
+                )
+            )
+        await db_session.flush()
+        service = MessageRetentionService(session_factory=session_factory)
+
+        # The in-progress message cannot be compacted yet, so its events keep
+        # the partition alive even though the month is past retention.
+        assert partition not in await service.drop_expired_partitions()
+        archived = await db_session.scalars(
+            select(MessageEventArchive.message_id).where(
+                MessageEventArchive.chat_id == sample_chat.id
+            )
+        )
+        assert list(archived) == [messages[MessageStreamStatus.COMPLETED].id]
+
+        in_progress = messages[MessageStreamStatus.IN_PROGRESS]
+        in_progress.stream_status = MessageStreamStatus.COMPLETED
+        await db_session.flush()
+
+        assert partition in await service.drop_expired_partitions()
+        archived = await db_session.scalars(
+            select(MessageEventArchive.message_id).where(
+                MessageEventArchive.chat_id == sample_chat.id
+            )
+        )
+        assert set(archived) == {message.id for message in messages.values()}
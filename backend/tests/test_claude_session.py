@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from claude_agent_sdk.types import ClaudeAgentOptions
+
+from app.services import claude_agent as claude_agent_module
+from app.services.claude_agent import ClaudeAgentService
+
+
+def write_transcript(path: Path, *texts: str) -> None:
+    lines: list[dict[str, Any]] = []
+    for text in texts:
+        lines.append(
+            {
+                "type": "assistant",
+                "message": {
+                    "role": "assistant",
+                    "model": "claude-test",
+                    "content": [{"type": "text", "text": text}],
+                },
+                "parent_tool_use_id": None,
+                "session_id": "session-1",
+            }
+        )
+        lines.append(
+            {
+                "type": "result",
+                "subtype": "success",
+                "duration_ms": 1,
+                "duration_api_ms": 1,
+                "is_error": False,
+                "num_turns": 1,
+                "session_id": "session-1",
+                "total_cost_usd": 0.0,
+            }
+        )
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+
+class FakeUserService:
+    # Settings lookups without a database.
+
+    def __init__(self, **kwargs: Any) -> None:
+        pass
+
+    async def get_user_settings(self, user_id: Any) -> Any:
+        return SimpleNamespace(sandbox_provider="docker")
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> ClaudeAgentService:
+    transcript = tmp_path / "session.jsonl"
+    write_transcript(transcript, "first answer", "second answer")
+    monkeypatch.setattr(
+        claude_agent_module.settings, "CLAUDE_REPLAY_TRANSCRIPT", str(transcript)
+    )
+    monkeypatch.setattr(
+        claude_agent_module.settings, "CLAUDE_WARM_PROCESS_ENABLED", False
+    )
+    monkeypatch.setattr(
+        claude_agent_module.settings, "CLAUDE_FOLLOW_UP_WINDOW_SECONDS", 600
+    )
+    monkeypatch.setattr(claude_agent_module, "UserService", FakeUserService)
+
+    service = ClaudeAgentService(session_factory=lambda: None)
+
+    async def build_options(**kwargs: Any) -> ClaudeAgentOptions:
+        return ClaudeAgentOptions()
+
+    monkeypatch.setattr(service, "_build_claude_options", build_options)
+    return service
+
+
+def texts(events: list[Any]) -> list[str]:
+    return [
+        event["text"]
+        for event in events
+        if event.get("type") == "assistant_text" and event.get("text")
+    ]
+
+
+class TestColdSession:
+    async def test_follow_up_runs_on_the_same_cli(
+        self, service: ClaudeAgentService
+    ) -> None:
+        chat = SimpleNamespace(id=uuid.uuid4(), sandbox_id="sandbox-1")
+        user = SimpleNamespace(id=uuid.uuid4())
+
+        first = [
+            event
+            async for event in service.get_ai_stream(
+                prompt="hello",
+                system_prompt="",
+                custom_instructions=None,
+                user=user,  # type: ignore[arg-type]
+                chat=chat,  # type: ignore[arg-type]
+                model_id="claude-test",
+            )
+        ]
+        assert texts(first) == ["first answer"]
+        assert service.can_continue_session(
+            model_id="claude-test",
+            permission_mode="auto",
+            thinking_mode=None,
+            system_prompt="",
+        )
+        transport = service._active_transport
+        assert transport is not None
+
+        second = [event async for event in service.get_follow_up_stream("again", None)]
+        assert texts(second) == ["second answer"]
+        assert service._active_transport is transport
+
+        await service.end_session()
+        assert service._active_transport is None
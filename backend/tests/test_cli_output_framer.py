@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+from claude_agent_sdk._errors import CLIJSONDecodeError
+
+from app.services.transports.framing import CliOutputFramer
+
+
+class TestCliOutputFramer:
+    def test_line_split_across_chunks(self) -> None:
+        framer = CliOutputFramer(max_buffer_size=1024)
+
+        assert framer.feed(b'{"type": "assis') == []
+        assert framer.feed(b'tant", "n": ') == []
+        assert framer.feed(b"1}\n") == [{"type": "assistant", "n": 1}]
+
+    def test_several_lines_in_one_chunk(self) -> None:
+        framer = CliOutputFramer(max_buffer_size=1024)
+
+        messages = framer.feed(b'{"n": 1}\n{"n": 2}\r\n{"n": ')
+
+        assert messages == [{"n": 1}, {"n": 2}]
+        assert framer.feed("3}\n") == [{"n": 3}]
+
+    def test_preamble_and_ansi_codes_are_skipped(self) -> None:
+        framer = CliOutputFramer(max_buffer_size=1024)
+
+        messages = framer.feed(b'Starting\n\x1b[32mlog: {"n": 1}\x1b[0m\n')
+
+        assert messages == [{"n": 1}]
+
+    def test_raw_decode_fallback(self) -> None:
+        framer = CliOutputFramer(max_buffer_size=1024)
+
+        # Back-to-back objects on one line, then an object a terminal wrapped
+        # over two lines.
+        assert framer.feed(b'{"a": 1}{"b": 2}\n') == [{"a": 1}, {"b": 2}]
+        assert framer.feed(b'{"c":\n') == []
+        assert framer.feed(b'"wrapped"}\n') == [{"c": "wrapped"}]
+
+    def test_overflow_raises_and_resets(self) -> None:
+        framer = CliOutputFramer(max_buffer_size=16)
+
+        with pytest.raises(CLIJSONDecodeError) as exc_info:
+            framer.feed(b'{"text": "' + b"x" * 32)
+        assert "max buffer size of 16" in str(exc_info.value.original_error)
+
+        assert framer.feed(b'{"n": 1}\n') == [{"n": 1}]
+
+    def test_finish_decodes_trailing_line(self) -> None:
+        framer = CliOutputFramer(max_buffer_size=1024)
+
+        assert framer.feed(b'{"n": 1}\n{"n": 2}') == [{"n": 1}]
+        assert framer.finish() == [{"n": 2}]
+        assert framer.finish() == []
+
+    def test_finish_raises_on_incomplete_message(self) -> None:
+        framer = CliOutputFramer(max_buffer_size=1024)
+
+        assert framer.feed(b'{"n": 1}\n{"n": ') == [{"n": 1}]
+        with pytest.raises(CLIJSONDecodeError):
+            framer.finish()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import struct
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from app.services.sandbox_providers.docker_engine import (
+    DockerEngineClient,
+    DockerEngineError,
+)
+
+CONTAINER_ID = "c0ffee"
+
+
+class FakeEngine:
+    # Just enough of the Docker Engine API, served over a unix socket.
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.archives: dict[str, bytes] = {}
+        self.exec_commands: list[list[str]] = []
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                headers = {
+                    name.strip().lower(): value.strip()
+                    for name, _, value in (
+                        line.partition(":") for line in lines[1:] if line
+                    )
+                }
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                path, _, query = target.partition("?")
+                keep_open = await self.route(
+                    method, path, query, headers, body, reader, writer
+                )
+                await writer.drain()
+                if not keep_open:
+                    return
+        finally:
+            writer.close()
+
+    async def route(
+        self,
+        method: str,
+        path: str,
+        query: str,
+        headers: dict[str, str],
+        body: bytes,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> bool:
+        # Returns False when the response ends with the connection.
+        if method == "GET" and path == f"/containers/{CONTAINER_ID}/json":
+            self.respond(writer, 200, {"Id": CONTAINER_ID})
+        elif method == "POST" and path == f"/containers/{CONTAINER_ID}/exec":
+            self.exec_commands.append(json.loads(body)["Cmd"])
+            self.respond(writer, 201, {"Id": f"exec{len(self.exec_commands)}"})
+        elif method == "GET" and path.startswith("/exec/"):
+            self.respond(writer, 200, {"ExitCode": 3})
+        elif method == "POST" and path.startswith("/exec/"):
+            if headers.get("upgrade") == "tcp":
+                writer.write(b"HTTP/1.1 101 UPGRADED\r\nUpgrade: tcp\r\n\r\n")
+                await writer.drain()
+                while data := await reader.read(1024):
+                    writer.write(data.upper())
+                    await writer.drain()
+                return False
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: raw\r\n\r\n")
+            for stream_id, payload in ((1, b"out-1 "), (2, b"err"), (1, b"out-2")):
+                writer.write(struct.pack(">BxxxI", stream_id, len(payload)) + payload)
+            return False
+        elif path == f"/containers/{CONTAINER_ID}/archive":
+            if method == "PUT":
+                self.archives[query] = body
+                self.respond(writer, 200, None)
+            else:
+                self.respond(writer, 200, self.archives.get(query, b""))
+        else:
+            self.respond(writer, 404, {"message": f"No such container: {path}"})
+        return True
+
+    @staticmethod
+    def respond(writer: asyncio.StreamWriter, status: int, body: object) -> None:
+        if not isinstance(body, bytes):
+            body = b"" if body is None else json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {status} X\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+
+
+@pytest_asyncio.fixture
+async def engine(
+    tmp_path: Path,
+) -> AsyncIterator[tuple[FakeEngine, DockerEngineClient]]:
+    fake = FakeEngine()
+    socket_path = tmp_path / "docker.sock"
+    server = await asyncio.start_unix_server(fake.handle, path=str(socket_path))
+    client = DockerEngineClient(f"unix://{socket_path}", max_connections=4)
+    try:
+        yield fake, client
+    finally:
+        await client.aclose()
+        server.close()
+        await server.wait_closed()
+
+
+class TestDockerEngineClient:
+    async def test_requests_reuse_pooled_connection(
+        self, engine: tuple[FakeEngine, DockerEngineClient]
+    ) -> None:
+        fake, client = engine
+        for _ in range(5):
+            attrs = await client.inspect_container(CONTAINER_ID)
+            assert attrs["Id"] == CONTAINER_ID
+        assert fake.connections == 1
+
+    async def test_error_carries_status_and_message(
+        self, engine: tuple[FakeEngine, DockerEngineClient]
+    ) -> None:
+        _, client = engine
+        with pytest.raises(DockerEngineError) as exc_info:
+            await client.inspect_container("missing")
+        assert exc_info.value.status_code == 404
+        assert "No such container" in exc_info.value.message
+
+    async def test_exec_run_demultiplexes_output(
+        self, engine: tuple[FakeEngine, DockerEngineClient]
+    ) -> None:
+        fake, client = engine
+        exit_code, stdout, stderr = await client.exec_run(
+            CONTAINER_ID, ["bash", "-c", "true"]
+        )
+        assert (exit_code, stdout, stderr) == (3, b"out-1 out-2", b"err")
+        assert fake.exec_commands == [["bash", "-c", "true"]]
+
+    async def test_exec_stream_yields_stdout_only(
+        self, engine: tuple[FakeEngine, DockerEngineClient]
+    ) -> None:
+        _, client = engine
+        chunks = [
+            chunk
+            async for chunk in client.exec_stream(
+                CONTAINER_ID, ["zip", "-q", "-"], ok_exit_codes=(0, 3)
+            )
+        ]
+        assert chunks == [b"out-1 ", b"out-2"]
+
+    async def test_exec_stream_raises_on_failed_exit(
+        self, engine: tuple[FakeEngine, DockerEngineClient]
+    ) -> None:
+        _, client = engine
+        chunks: list[bytes] = []
+        with pytest.raises(DockerEngineError) as exc_info:
+            async for chunk in client.exec_stream(CONTAINER_ID, ["zip", "-q", "-"]):
+                chunks.append(chunk)
+        assert chunks == [b"out-1 ", b"out-2"]
+        assert exc_info.value.message == "err"
+
+    async def test_archive_round_trip(
+        self, engine: tuple[FakeEngine, DockerEngineClient]
+    ) -> None:
+        _, client = engine
+        await client.put_archive(CONTAINER_ID, "/home/user", b"tar-bytes")
+        assert await client.get_archive(CONTAINER_ID, "/home/user") == b"tar-bytes"
+
+    async def test_exec_attach_streams_both_ways(
+        self, engine: tuple[FakeEngine, DockerEngineClient]
+    ) -> None:
+        _, client = engine
+        exec_id = await client.exec_create(CONTAINER_ID, ["bash"], tty=True, stdin=True)
+        stream = await client.exec_attach(exec_id)
+        try:
+            await stream.write(b"echo hi\n")
+            assert await asyncio.wait_for(stream.read(1024), 5) == b"ECHO HI\n"
+        finally:
+            stream.close()
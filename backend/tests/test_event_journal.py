@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import pytest
+
+from app.services.streaming import journal as journal_module
+from app.services.streaming.journal import EventJournal
+from app.services.streaming.live import LiveEntry, LiveEventStream
+
+
+class FakeMessageService:
+    # Records every append_events call and fails the ones touching a broken chat.
+
+    def __init__(self) -> None:
+        self.calls: list[list[tuple[str, int]]] = []
+        self.broken: set[str] = set()
+
+    async def append_events(self, events: list[dict[str, Any]]) -> None:
+        self.calls.append([(event["chat_id"], event["seq"]) for event in events])
+        if any(event["chat_id"] in self.broken for event in events):
+            raise RuntimeError("insert failed")
+
+
+@asynccontextmanager
+async def fake_redis_connection() -> AsyncIterator[None]:
+    yield None
+
+
+def session_factory() -> Any:
+    raise AssertionError("the fake message service never opens a session")
+
+
+def make_batch(
+    chat_id: str, *seqs: int
+) -> tuple[str, list[dict[str, Any]], list[LiveEntry]]:
+    events = [{"chat_id": chat_id, "seq": seq} for seq in seqs]
+    entries = [LiveEntry(seq=seq, kind="assistant_text", data=str(seq)) for seq in seqs]
+    return chat_id, events, entries
+
+
+@pytest.fixture
+def published(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, list[int]]]:
+    published: list[tuple[str, list[int]]] = []
+
+    async def publish(redis: object, chat_id: str, entries: list[LiveEntry]) -> None:
+        if entries:
+            published.append((chat_id, [entry.seq for entry in entries]))
+
+    monkeypatch.setattr(journal_module, "redis_connection", fake_redis_connection)
+    monkeypatch.setattr(LiveEventStream, "publish", publish)
+    return published
+
+
+@pytest.fixture
+def message_service(monkeypatch: pytest.MonkeyPatch) -> FakeMessageService:
+    fake = FakeMessageService()
+    monkeypatch.setattr(journal_module, "MessageService", lambda **kwargs: fake)
+    return fake
+
+
+class TestEventJournal:
+    async def test_streams_share_one_group_commit(
+        self,
+        message_service: FakeMessageService,
+        published: list[tuple[str, list[int]]],
+    ) -> None:
+        journal = EventJournal(session_factory)
+        first = await journal.submit(*make_batch("chat-a", 1, 2))
+        second = await journal.submit(*make_batch("chat-b", 7))
+
+        await asyncio.wait_for(asyncio.gather(first, second), 5)
+
+        assert message_service.calls == [[("chat-a", 1), ("chat-a", 2), ("chat-b", 7)]]
+        assert published == [("chat-a", [1, 2]), ("chat-b", [7])]
+        await journal._drain()
+
+    async def test_failed_group_commit_is_retried_per_item(
+        self,
+        message_service: FakeMessageService,
+        published: list[tuple[str, list[int]]],
+    ) -> None:
+        message_service.broken.add("chat-b")
+        journal = EventJournal(session_factory)
+        commits = [
+            await journal.submit(*make_batch(chat_id, 1))
+            for chat_id in ("chat-a", "chat-b", "chat-c")
+        ]
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*commits, return_exceptions=True), 5
+        )
+
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], RuntimeError)
+        assert message_service.calls[1:] == [
+            [("chat-a", 1)],
+            [("chat-b", 1)],
+            [("chat-c", 1)],
+        ]
+        # Events that never became durable are not published live.
+        assert published == [("chat-a", [1]), ("chat-c", [1])]
+        await journal._drain()
+
+    async def test_shutdown_drains_pending_events(
+        self,
+        message_service: FakeMessageService,
+        published: list[tuple[str, list[int]]],
+    ) -> None:
+        journal = EventJournal.get(session_factory)
+        commit = await journal.submit(*make_batch("chat-a", 1))
+        assert not commit.done()
+
+        await asyncio.wait_for(EventJournal.shutdown(), 5)
+
+        assert commit.done() and commit.exception() is None
+        assert message_service.calls == [[("chat-a", 1)]]
+        assert EventJournal.get(session_factory) is not journal
+        await EventJournal.shutdown()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+from app.services.streaming.sequence import EventSeqAllocator
+
+CHAT_ID = uuid.uuid4()
+
+
+class FakeSeqStore:
+    # Stands in for the chats.last_event_seq counter behind MessageService.
+
+    def __init__(self, last_event_seq: int = 0) -> None:
+        self.last_event_seq = last_event_seq
+        self.reservations: list[int] = []
+
+    async def reserve_event_seqs(self, chat_id: uuid.UUID, count: int) -> int:
+        await asyncio.sleep(0)
+        self.last_event_seq += count
+        self.reservations.append(count)
+        return self.last_event_seq
+
+    async def release_event_seqs(
+        self, chat_id: uuid.UUID, *, reserved_end: int, last_used: int
+    ) -> bool:
+        if self.last_event_seq != reserved_end:
+            return False
+        self.last_event_seq = last_used
+        return True
+
+
+def make_allocator(store: FakeSeqStore, block_size: int) -> EventSeqAllocator:
+    return EventSeqAllocator(
+        store,  # type: ignore[arg-type]
+        CHAT_ID,
+        block_size=block_size,
+    )
+
+
+class TestEventSeqAllocator:
+    async def test_allocations_reuse_the_reserved_block(self) -> None:
+        store = FakeSeqStore(last_event_seq=40)
+        allocator = make_allocator(store, block_size=10)
+
+        assert await allocator.allocate(3) == [41, 42, 43]
+        assert await allocator.allocate(4) == [44, 45, 46, 47]
+        assert store.reservations == [10]
+
+        # The rest of the block is used before the next one is reserved.
+        assert await allocator.allocate(5) == [48, 49, 50, 51, 52]
+        assert store.reservations == [10, 10]
+
+    async def test_large_batch_reserves_what_it_needs(self) -> None:
+        store = FakeSeqStore()
+        allocator = make_allocator(store, block_size=4)
+
+        assert await allocator.allocate(6) == [1, 2, 3, 4, 5, 6]
+        assert store.reservations == [6]
+
+    async def test_concurrent_allocations_do_not_overlap(self) -> None:
+        store = FakeSeqStore()
+        allocator = make_allocator(store, block_size=4)
+
+        batches = await asyncio.gather(*(allocator.allocate(3) for _ in range(20)))
+
+        seqs = [seq for batch in batches for seq in batch]
+        assert sorted(seqs) == list(range(1, 61))
+        assert all(batch == sorted(batch) for batch in batches)
+        assert store.last_event_seq == 60
+
+    async def test_release_returns_unused_tail(self) -> None:
+        store = FakeSeqStore()
+        allocator = make_allocator(store, block_size=10)
+        assert await allocator.allocate(3) == [1, 2, 3]
+
+        await allocator.release()
+
+        assert store.last_event_seq == 3
+        next_allocator = make_allocator(store, block_size=10)
+        assert await next_allocator.allocate(1) == [4]
+
+    async def test_release_keeps_tail_after_a_later_reservation(self) -> None:
+        store = FakeSeqStore()
+        allocator = make_allocator(store, block_size=10)
+        assert await allocator.allocate(3) == [1, 2, 3]
+        other = make_allocator(store, block_size=10)
+        assert await other.allocate(1) == [11]
+
+        await allocator.release()
+
+        assert store.last_event_seq == 20
+        assert await allocator.allocate(2) == [4, 5]
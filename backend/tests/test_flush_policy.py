@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services.streaming import flush_policy
+from app.services.streaming.flush_policy import (
+    AdaptiveFlushPolicy,
+    FixedFlushPolicy,
+    create_flush_policy,
+)
+
+
+def _policy() -> AdaptiveFlushPolicy:
+    return AdaptiveFlushPolicy(
+        base_interval_ms=200,
+        base_events=24,
+        min_interval_ms=50,
+        max_interval_ms=1000,
+        max_events=256,
+        latency_factor=4.0,
+        burst_rate=100.0,
+    )
+
+
+def _feed_events(policy: AdaptiveFlushPolicy, *, per_second: float, count: int) -> None:
+    now = 1000.0
+    for _ in range(count):
+        policy.observe_event(now)
+        now += 1.0 / per_second
+
+
+class TestAdaptiveFlushPolicy:
+    def test_window_widens_under_slow_commits(self) -> None:
+        policy = _policy()
+        windows = []
+        for _ in range(10):
+            policy.observe_flush(24, 150.0)
+            windows.append(policy.window_ms)
+
+        assert windows == sorted(windows)
+        assert windows[-1] > policy.base_interval_ms
+        # Wider windows also raise the event budget, so slow commits take
+        # larger batches instead of queueing more of them.
+        assert not policy.should_flush(24, 0.0)
+        assert policy.should_flush(policy.max_events, 0.0)
+
+    def test_window_narrows_once_commits_are_fast_again(self) -> None:
+        policy = _policy()
+        for _ in range(20):
+            policy.observe_flush(24, 200.0)
+        widened = policy.window_ms
+
+        for _ in range(20):
+            policy.observe_flush(24, 2.0)
+
+        assert policy.window_ms < widened
+        assert policy.window_ms == pytest.approx(policy.base_interval_ms)
+
+    def test_window_widens_under_event_bursts(self) -> None:
+        policy = _policy()
+        _feed_events(policy, per_second=10, count=20)
+        assert policy.window_ms == pytest.approx(policy.base_interval_ms)
+
+        _feed_events(policy, per_second=400, count=40)
+        assert policy.window_ms > policy.base_interval_ms
+
+    def test_window_stays_within_bounds(self) -> None:
+        policy = _policy()
+        for _ in range(50):
+            policy.observe_flush(24, 10_000.0)
+        _feed_events(policy, per_second=10_000, count=50)
+        assert policy.window_ms == policy.max_interval_ms
+        assert policy._event_budget() <= policy.max_events
+
+        quiet = AdaptiveFlushPolicy(
+            base_interval_ms=10,
+            base_events=24,
+            min_interval_ms=50,
+            max_interval_ms=1000,
+            max_events=256,
+            latency_factor=4.0,
+            burst_rate=100.0,
+        )
+        for _ in range(50):
+            quiet.observe_flush(24, 0.0)
+        assert quiet.window_ms == quiet.min_interval_ms
+        assert quiet.idle_delay_ms() == quiet.min_interval_ms
+
+    def test_nothing_pending_never_flushes(self) -> None:
+        policy = _policy()
+        assert not policy.should_flush(0, 10_000.0)
+        assert policy.should_flush(1, policy.window_ms)
+
+
+class TestCreateFlushPolicy:
+    def test_selects_policy_from_settings(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(
+            flush_policy.settings, "CHAT_SNAPSHOT_FLUSH_POLICY", "adaptive"
+        )
+        assert isinstance(create_flush_policy(), AdaptiveFlushPolicy)
+
+        monkeypatch.setattr(
+            flush_policy.settings, "CHAT_SNAPSHOT_FLUSH_POLICY", "fixed"
+        )
+        assert isinstance(create_flush_policy(), FixedFlushPolicy)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services.streaming import hub as hub_module
+from app.services.streaming.hub import LiveEventHub
+from app.services.streaming.live import LiveEntry, LiveEventStream
+
+CHAT_ID = "chat-1"
+
+
+class FakeLiveStream:
+    # Hands out whatever batches a test pushes, one per XREAD.
+
+    def __init__(self) -> None:
+        self.batches: asyncio.Queue[list[LiveEntry]] = asyncio.Queue()
+        self.connections = 0
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[None]:
+        self.connections += 1
+        yield None
+
+    async def read(
+        self, redis: object, chat_id: str, after_seq: int, **kwargs: object
+    ) -> list[LiveEntry]:
+        return await self.batches.get()
+
+    def push(self, *seqs: int) -> None:
+        self.batches.put_nowait(
+            [LiveEntry(seq=seq, kind="assistant_text", data=str(seq)) for seq in seqs]
+        )
+
+
+@pytest.fixture
+def live_stream(monkeypatch: pytest.MonkeyPatch) -> FakeLiveStream:
+    fake = FakeLiveStream()
+    monkeypatch.setattr(hub_module, "redis_connection", fake.connection)
+    monkeypatch.setattr(LiveEventStream, "read", fake.read)
+    return fake
+
+
+async def wait_for_seq(seq: int) -> None:
+    async def reached() -> None:
+        while LiveEventHub._channels[CHAT_ID].last_seq < seq:
+            await asyncio.sleep(0)
+
+    await asyncio.wait_for(reached(), 5)
+
+
+class TestLiveEventHub:
+    async def test_subscribers_share_one_reader(
+        self, live_stream: FakeLiveStream
+    ) -> None:
+        async with (
+            LiveEventHub.subscribe(CHAT_ID, 0) as first,
+            LiveEventHub.subscribe(CHAT_ID, 0) as second,
+        ):
+            assert first.take_resync_seq() == 0
+            assert second.take_resync_seq() == 0
+            live_stream.push(1, 2)
+            await wait_for_seq(2)
+
+            for subscription in (first, second):
+                assert [(await subscription.get()).seq for _ in range(2)] == [1, 2]
+        assert live_stream.connections == 1
+
+    async def test_last_unsubscribe_stops_reader(
+        self, live_stream: FakeLiveStream
+    ) -> None:
+        async with LiveEventHub.subscribe(CHAT_ID, 0):
+            channel = LiveEventHub._channels[CHAT_ID]
+            async with LiveEventHub.subscribe(CHAT_ID, 0):
+                pass
+            assert LiveEventHub._channels[CHAT_ID] is channel
+            assert channel.task is not None and not channel.task.done()
+
+        assert CHAT_ID not in LiveEventHub._channels
+        with pytest.raises(asyncio.CancelledError):
+            await channel.task
+
+        async with LiveEventHub.subscribe(CHAT_ID, 0):
+            assert LiveEventHub._channels[CHAT_ID] is not channel
+        assert CHAT_ID not in LiveEventHub._channels
+
+    async def test_slow_subscriber_resyncs_after_overflow(
+        self, live_stream: FakeLiveStream, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(hub_module.settings, "CHAT_STREAM_HUB_QUEUE_SIZE", 2)
+        async with LiveEventHub.subscribe(CHAT_ID, 0) as subscription:
+            assert subscription.take_resync_seq() == 0
+            live_stream.push(1, 2, 3, 4)
+            await wait_for_seq(4)
+
+            # Entries past the queue bound are dropped, and the resync point is
+            # only handed out once the buffered entries have been drained.
+            assert subscription.take_resync_seq() is None
+            assert [(await subscription.get()).seq for _ in range(2)] == [1, 2]
+            assert subscription.take_resync_seq() == 4
+            assert subscription.take_resync_seq() is None
+
+            live_stream.push(5)
+            await wait_for_seq(5)
+            assert (await subscription.get()).seq == 5
+
+    async def test_reader_failure_stops_subscribers(
+        self, live_stream: FakeLiveStream, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        async def failing_read(*args: object, **kwargs: object) -> list[LiveEntry]:
+            raise ConnectionError("redis went away")
+
+        monkeypatch.setattr(LiveEventStream, "read", failing_read)
+        async with LiveEventHub.subscribe(CHAT_ID, 0) as subscription:
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(subscription.get(), 5)
+            assert CHAT_ID not in LiveEventHub._channels
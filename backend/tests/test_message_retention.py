@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+import pytest
+
+from app.constants import MESSAGE_EVENT_PARTITION_SCHEMA
+from app.models.types import ArchivedEventDict
+from app.services import message_retention
+from app.services.message_retention import MessageRetentionService
+from app.utils.message_events import pack_archived_events, unpack_archived_events
+
+
+class FakeSession:
+    # Records the SQL it is asked to run; statements naming a partition in
+    # `failing` raise like Postgres does when default-partition rows overlap.
+
+    def __init__(self, failing: set[str]) -> None:
+        self.failing = failing
+        self.statements: list[str] = []
+        self.commits = 0
+
+    async def __aenter__(self) -> FakeSession:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    @asynccontextmanager
+    async def begin_nested(self) -> AsyncIterator[None]:
+        yield
+
+    async def execute(self, statement: Any, *args: Any) -> None:
+        sql = str(statement)
+        if any(name in sql for name in self.failing):
+            raise RuntimeError("partition would overlap the default partition")
+        self.statements.append(sql)
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+
+def _partition(month: datetime) -> str:
+    return f"message_events_p{month:%Y%m}"
+
+
+def _months_from_now(count: int) -> list[datetime]:
+    month = datetime.now(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    months = []
+    for _ in range(count):
+        months.append(month)
+        month = (
+            month.replace(year=month.year + 1, month=1)
+            if month.month == 12
+            else month.replace(month=month.month + 1)
+        )
+    return months
+
+
+@pytest.fixture
+def session() -> FakeSession:
+    return FakeSession(failing=set())
+
+
+@pytest.fixture
+def service(
+    monkeypatch: pytest.MonkeyPatch, session: FakeSession
+) -> MessageRetentionService:
+    monkeypatch.setattr(message_retention.settings, "CHAT_EVENT_PARTITIONS_AHEAD", 2)
+    monkeypatch.setattr(
+        message_retention.settings, "CHAT_EVENT_PARTITION_RETENTION_DAYS", 90
+    )
+    return MessageRetentionService(session_factory=lambda: session)
+
+
+def _set_partitions(monkeypatch: pytest.MonkeyPatch, names: set[str]) -> None:
+    async def list_partitions(db: Any) -> set[str]:
+        return set(names)
+
+    monkeypatch.setattr(
+        MessageRetentionService, "_list_partitions", staticmethod(list_partitions)
+    )
+
+
+class TestEnsurePartitions:
+    async def test_creates_current_and_upcoming_months(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: MessageRetentionService,
+        session: FakeSession,
+    ) -> None:
+        current, *ahead = _months_from_now(3)
+        _set_partitions(monkeypatch, {_partition(current)})
+
+        created = await service.ensure_partitions()
+
+        assert created == [_partition(month) for month in ahead]
+        assert len(session.statements) == 2
+        assert all(
+            f"{MESSAGE_EVENT_PARTITION_SCHEMA}.message_events_p" in sql
+            for sql in session.statements
+        )
+        assert session.commits == 1
+
+    async def test_failed_create_does_not_stop_later_months(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: MessageRetentionService,
+        session: FakeSession,
+    ) -> None:
+        months = _months_from_now(3)
+        _set_partitions(monkeypatch, set())
+        session.failing.add(_partition(months[1]))
+
+        created = await service.ensure_partitions()
+
+        assert created == [_partition(months[0]), _partition(months[2])]
+        assert session.commits == 1
+
+
+class TestDropExpiredPartitions:
+    async def test_keeps_partition_with_unarchived_events(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: MessageRetentionService,
+        session: FakeSession,
+    ) -> None:
+        current = _months_from_now(1)[0]
+        _set_partitions(
+            monkeypatch,
+            {
+                "message_events_p200001",
+                "message_events_p200002",
+                _partition(current),
+                "message_events_default",
+            },
+        )
+        compacted: list[datetime] = []
+
+        async def compact_month(month: datetime) -> None:
+            compacted.append(month)
+
+        async def has_events_in_month(db: Any, month: datetime) -> bool:
+            # January still holds events of an in-progress message.
+            return month.month == 1
+
+        monkeypatch.setattr(service, "_compact_month", compact_month)
+        monkeypatch.setattr(
+            MessageRetentionService,
+            "_has_events_in_month",
+            staticmethod(has_events_in_month),
+        )
+
+        dropped = await service.drop_expired_partitions()
+
+        assert dropped == ["message_events_p200002"]
+        assert compacted == [
+            datetime(2000, 1, 1, tzinfo=timezone.utc),
+            datetime(2000, 2, 1, tzinfo=timezone.utc),
+        ]
+        assert session.statements == [
+            f"DROP TABLE {MESSAGE_EVENT_PARTITION_SCHEMA}.message_events_p200002"
+        ]
+        assert session.commits == 1
+
+    async def test_recent_partitions_are_not_compacted(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        service: MessageRetentionService,
+        session: FakeSession,
+    ) -> None:
+        _set_partitions(monkeypatch, {_partition(m) for m in _months_from_now(3)})
+
+        async def compact_month(month: datetime) -> None:
+            raise AssertionError("recent months must not be compacted")
+
+        monkeypatch.setattr(service, "_compact_month", compact_month)
+
+        assert await service.drop_expired_partitions() == []
+        assert session.statements == []
+
+
+class TestArchivedEvents:
+    def test_pack_round_trip_keeps_integer_seqs(self) -> None:
+        events: list[ArchivedEventDict] = [
+            {
+                "id": "7b0c5c3e-0000-4000-8000-000000000001",
+                "stream_id": "7b0c5c3e-0000-4000-8000-000000000002",
+                "seq": seq,
+                "event_type": "assistant_text",
+                "render_payload": {"text": "hi"},
+                "audit_payload": None,
+                "envelope": None,
+                "created_at": "2000-01-15T00:00:00+00:00",
+            }
+            for seq in (1, 2)
+        ]
+
+        unpacked = unpack_archived_events(pack_archived_events(events))
+
+        assert unpacked == events
+        assert [event["seq"] for event in unpacked] == [1, 2]
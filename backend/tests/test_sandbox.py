@@ -51,6 +51,46 @@ class TestSandboxFiles:
         assert "files" in data
         assert isinstance(data["files"], list)
 
+    async def test_get_files_metadata_since_token(
+        self,
+        sandbox_test_context: SandboxTestContext,
+    ) -> None:
+        ctx = sandbox_test_context
+        url = f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files/metadata"
+        first = await ctx.client.get(url, headers=ctx.auth_headers)
+        assert first.status_code == 200
+        token = first.json()["token"]
+        assert token
+
+        test_filename = f"since_token_{ctx.provider}.txt"
+        await ctx.client.put(
+            f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files",
+            json={"file_path": f"/home/user/{test_filename}", "content": "changed"},
+            headers=ctx.auth_headers,
+        )
+        second = await ctx.client.get(
+            url, params={"since": token}, headers=ctx.auth_headers
+        )
+
+        assert second.status_code == 200
+        data = second.json()
+        assert data["incremental"] is True
+        assert data["token"] != token
+        assert test_filename in [f["path"] for f in data["files"]]
+
+    async def test_get_files_metadata_rejects_path_outside_home(
+        self,
+        sandbox_test_context: SandboxTestContext,
+    ) -> None:
+        ctx = sandbox_test_context
+        response = await ctx.client.get(
+            f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files/metadata",
+            params={"path": "../../etc"},
+            headers=ctx.auth_headers,
+        )
+
+        assert response.status_code == 400
+
     async def test_write_file(
         self,
         sandbox_test_context: SandboxTestContext,
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services.sandbox_providers import registry as registry_module
+from app.services.sandbox_providers.registry import SandboxProviderRegistry
+from app.services.sandbox_providers.types import SandboxProviderType
+
+
+class FakeProvider:
+    # Records how often it was cleaned up.
+
+    def __init__(self, provider_type: SandboxProviderType, api_key: str | None) -> None:
+        self.provider_type = provider_type
+        self.api_key = api_key
+        self.cleanups = 0
+        self.fail_cleanup = False
+
+    async def cleanup(self) -> None:
+        self.cleanups += 1
+        if self.fail_cleanup:
+            raise RuntimeError("cleanup failed")
+
+
+@pytest.fixture
+def created(monkeypatch: pytest.MonkeyPatch) -> list[FakeProvider]:
+    created: list[FakeProvider] = []
+
+    def create_sandbox_provider(
+        provider_type: SandboxProviderType, api_key: str | None = None
+    ) -> FakeProvider:
+        provider = FakeProvider(provider_type, api_key)
+        created.append(provider)
+        return provider
+
+    monkeypatch.setattr(SandboxProviderRegistry, "_providers", {})
+    monkeypatch.setattr(
+        registry_module, "create_sandbox_provider", create_sandbox_provider
+    )
+    return created
+
+
+class TestSandboxProviderRegistry:
+    async def test_shared_provider_is_reused_and_never_torn_down(
+        self, created: list[FakeProvider]
+    ) -> None:
+        first = SandboxProviderRegistry.acquire(SandboxProviderType.DOCKER)
+        second = SandboxProviderRegistry.acquire("docker")
+
+        assert first is second
+        assert len(created) == 1
+        assert SandboxProviderRegistry.is_shared(first)
+
+        await SandboxProviderRegistry.release(first)
+        await SandboxProviderRegistry.release(second)
+        assert created[0].cleanups == 0
+        assert SandboxProviderRegistry.acquire(SandboxProviderType.DOCKER) is first
+
+    async def test_per_use_provider_is_cleaned_up_on_release(
+        self, created: list[FakeProvider]
+    ) -> None:
+        first = SandboxProviderRegistry.acquire(SandboxProviderType.E2B, "key-1")
+        second = SandboxProviderRegistry.acquire(SandboxProviderType.E2B, "key-2")
+
+        assert first is not second
+        assert [provider.api_key for provider in created] == ["key-1", "key-2"]
+        assert not SandboxProviderRegistry.is_shared(first)
+
+        await SandboxProviderRegistry.release(first)
+        assert created[0].cleanups == 1
+        assert created[1].cleanups == 0
+
+    async def test_shutdown_cleans_up_shared_providers_once(
+        self, created: list[FakeProvider]
+    ) -> None:
+        docker = SandboxProviderRegistry.acquire(SandboxProviderType.DOCKER)
+        host = SandboxProviderRegistry.acquire(SandboxProviderType.HOST)
+        created[0].fail_cleanup = True
+
+        await SandboxProviderRegistry.shutdown()
+
+        # A failing cleanup does not stop the others.
+        assert [provider.cleanups for provider in created] == [1, 1]
+        assert not SandboxProviderRegistry.is_shared(docker)
+        assert not SandboxProviderRegistry.is_shared(host)
+
+        await SandboxProviderRegistry.shutdown()
+        assert [provider.cleanups for provider in created] == [1, 1]
+        assert SandboxProviderRegistry.acquire(SandboxProviderType.DOCKER) is not docker
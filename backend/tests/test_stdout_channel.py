@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.services.transports.channel import StdoutChannel
+
+SENTINEL = object()
+
+
+def make_channel(high_watermark: int = 8, low_watermark: int = 4) -> StdoutChannel:
+    return StdoutChannel(
+        high_watermark=high_watermark, low_watermark=low_watermark, label="test"
+    )
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestStdoutChannel:
+    async def test_writer_blocks_at_high_watermark_until_low_watermark(
+        self,
+    ) -> None:
+        channel = make_channel()
+        await channel.put(b"abcd")
+        await channel.put(b"efgh")
+        assert channel.bytes_in_flight == 8
+
+        writer = asyncio.create_task(channel.put(b"ijkl"))
+        await settle()
+        assert not writer.done()
+
+        # Draining to the low watermark lets the writer through.
+        assert await channel.get() == b"abcd"
+        await asyncio.wait_for(writer, 5)
+
+        assert channel.bytes_in_flight == 8
+        stats = channel.stats()
+        assert stats.stalls == 1
+        assert stats.peak_bytes_in_flight == 8
+        assert [await channel.get() for _ in range(2)] == [b"efgh", b"ijkl"]
+        assert channel.empty()
+
+    async def test_writer_stays_blocked_above_low_watermark(self) -> None:
+        channel = make_channel(high_watermark=6, low_watermark=2)
+        for chunk in (b"aa", b"bb", b"cc"):
+            await channel.put(chunk)
+
+        writer = asyncio.create_task(channel.put(b"dd"))
+        assert await channel.get() == b"aa"
+        await settle()
+        assert not writer.done()
+
+        assert await channel.get() == b"bb"
+        await asyncio.wait_for(writer, 5)
+        assert channel.bytes_in_flight == 4
+
+    async def test_clear_releases_stalled_writer(self) -> None:
+        channel = make_channel()
+        await channel.put(b"x" * 8)
+        writer = asyncio.create_task(channel.put(b"y"))
+        await settle()
+        assert not writer.done()
+
+        channel.clear()
+        await asyncio.wait_for(writer, 5)
+
+        assert channel.qsize() == 1
+        assert channel.bytes_in_flight == 1
+        assert await channel.get() == b"y"
+
+    async def test_sentinel_bypasses_budget(self) -> None:
+        channel = make_channel()
+        await channel.put(b"x" * 8)
+
+        channel.put_nowait(SENTINEL)
+
+        assert channel.qsize() == 2
+        assert channel.bytes_in_flight == 8
+        assert await channel.get() == b"x" * 8
+        assert await channel.get() is SENTINEL
+        assert channel.bytes_in_flight == 0
+
+    async def test_str_chunks_count_encoded_bytes(self) -> None:
+        channel = make_channel()
+
+        await channel.put("ééé")
+
+        assert channel.bytes_in_flight == 6
+        assert channel.stats().bytes_total == 6
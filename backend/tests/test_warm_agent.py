@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from claude_agent_sdk import AssistantMessage, ClaudeAgentOptions, TextBlock
+
+from app.services import warm_agent as warm_agent_module
+from app.services.transports import ReplaySandboxTransport
+from app.services.warm_agent import WarmAgentPool, WarmAgentProcess
+
+SESSION_ID = "session-1"
+
+
+def write_transcript(path: Path, *texts: str) -> None:
+    lines: list[dict[str, Any]] = []
+    for text in texts:
+        lines.append(
+            {
+                "type": "assistant",
+                "message": {
+                    "role": "assistant",
+                    "model": "claude-test",
+                    "content": [{"type": "text", "text": text}],
+                },
+                "parent_tool_use_id": None,
+                "session_id": SESSION_ID,
+            }
+        )
+        lines.append(
+            {
+                "type": "result",
+                "subtype": "success",
+                "duration_ms": 1,
+                "duration_api_ms": 1,
+                "is_error": False,
+                "num_turns": 1,
+                "session_id": SESSION_ID,
+                "total_cost_usd": 0.0,
+            }
+        )
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+
+async def no_prompt() -> AsyncIterator[dict[str, Any]]:
+    return
+    yield
+
+
+def prompt(text: str) -> dict[str, Any]:
+    return {
+        "type": "user",
+        "message": {"role": "user", "content": text},
+        "parent_tool_use_id": None,
+        "session_id": None,
+    }
+
+
+async def texts(process: WarmAgentProcess, text: str) -> list[str]:
+    return [
+        block.text
+        async for message in process.stream_turn(prompt(text))
+        if isinstance(message, AssistantMessage)
+        for block in message.content
+        if isinstance(block, TextBlock)
+    ]
+
+
+@pytest.fixture
+def transcript(tmp_path: Path) -> str:
+    path = tmp_path / "session.jsonl"
+    write_transcript(path, "first answer", "second answer")
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+async def pool(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[None]:
+    monkeypatch.setattr(warm_agent_module.settings, "CLAUDE_WARM_PROCESSES_MAX", 2)
+    monkeypatch.setattr(
+        warm_agent_module.settings, "CLAUDE_WARM_PROCESS_IDLE_SECONDS", 300
+    )
+    monkeypatch.setattr(
+        warm_agent_module.settings, "CLAUDE_WARM_PROCESS_MAX_AGE_SECONDS", 1800
+    )
+    yield
+    await WarmAgentPool.shutdown()
+
+
+async def spawn(
+    chat_id: str, transcript: str, fingerprint: str = "fp"
+) -> WarmAgentProcess | None:
+    options = ClaudeAgentOptions()
+    return await WarmAgentPool.spawn(
+        chat_id=chat_id,
+        fingerprint=fingerprint,
+        transport_factory=lambda: ReplaySandboxTransport(
+            sandbox_id="sandbox-1",
+            transcript_path=transcript,
+            prompt=no_prompt(),
+            options=options,
+            persistent=True,
+        ),
+        options=options,
+    )
+
+
+class TestWarmAgentProcess:
+    async def test_turns_run_on_one_cli(self, transcript: str) -> None:
+        process = await spawn("chat-a", transcript)
+        assert process is not None and process.alive
+
+        assert await texts(process, "hello") == ["first answer"]
+        assert process.session_id == SESSION_ID
+        assert await texts(process, "again") == ["second answer"]
+
+    async def test_queued_turns_are_served_in_order(self, transcript: str) -> None:
+        process = await spawn("chat-a", transcript)
+        assert process is not None
+
+        first, second = await asyncio.wait_for(
+            asyncio.gather(texts(process, "hello"), texts(process, "again")), 5
+        )
+
+        assert (first, second) == (["first answer"], ["second answer"])
+
+
+class TestWarmAgentPool:
+    async def test_acquire_reuses_matching_idle_process(self, transcript: str) -> None:
+        process = await spawn("chat-a", transcript)
+        assert process is not None
+        await texts(process, "hello")
+
+        # A busy process is never handed out twice.
+        assert await WarmAgentPool.acquire("chat-a", "fp", SESSION_ID) is None
+
+        await WarmAgentPool.release(process, reusable=True)
+        assert await WarmAgentPool.acquire("chat-a", "fp", SESSION_ID) is process
+
+    async def test_acquire_discards_mismatched_process(self, transcript: str) -> None:
+        process = await spawn("chat-a", transcript)
+        assert process is not None
+        await texts(process, "hello")
+        await WarmAgentPool.release(process, reusable=True)
+
+        assert await WarmAgentPool.acquire("chat-a", "other-fp", SESSION_ID) is None
+
+        assert "chat-a" not in WarmAgentPool._processes
+        assert not process.alive
+
+    async def test_release_of_unusable_process_discards_it(
+        self, transcript: str
+    ) -> None:
+        process = await spawn("chat-a", transcript)
+        assert process is not None
+
+        await WarmAgentPool.release(process, reusable=False)
+
+        assert "chat-a" not in WarmAgentPool._processes
+        assert not process.alive
+
+    async def test_spawn_evicts_least_recently_used_idle_process(
+        self, transcript: str
+    ) -> None:
+        older = await spawn("chat-a", transcript)
+        newer = await spawn("chat-b", transcript)
+        assert older is not None and newer is not None
+        await WarmAgentPool.release(older, reusable=True)
+        await WarmAgentPool.release(newer, reusable=True)
+        older.last_used_at -= 60
+
+        third = await spawn("chat-c", transcript)
+
+        assert third is not None
+        assert set(WarmAgentPool._processes) == {"chat-b", "chat-c"}
+        assert not older.alive
+
+    async def test_spawn_gives_up_when_every_process_is_busy(
+        self, transcript: str
+    ) -> None:
+        assert await spawn("chat-a", transcript) is not None
+        assert await spawn("chat-b", transcript) is not None
+
+        assert await spawn("chat-c", transcript) is None
+        # A chat whose own process is mid-turn does not get a second one.
+        assert await spawn("chat-a", transcript) is None
+
+    async def test_reaper_evicts_idle_processes(
+        self, transcript: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(warm_agent_module, "REAPER_MAX_INTERVAL_SECONDS", 0.01)
+        process = await spawn("chat-a", transcript)
+        assert process is not None
+        await WarmAgentPool.release(process, reusable=True)
+
+        process.last_used_at = time.monotonic() - 600
+
+        async def reaped() -> None:
+            while "chat-a" in WarmAgentPool._processes:
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(reaped(), 5)
+        assert not process.alive